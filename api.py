@@ -0,0 +1,126 @@
+"""
+Headless HTTP API for Smart Health Companion
+
+Serves the same model and helpers as the Streamlit app without a browser
+session per user. Each worker process keeps one warm model from the
+registry; prediction handlers are synchronous, so FastAPI runs them on
+its thread pool and the event loop stays free for other requests.
+
+    uvicorn api:app --host 0.0.0.0 --port 8000 --workers 4
+"""
+
+from contextlib import asynccontextmanager
+from typing import List, Optional, Union
+
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+
+from model.registry import get_prediction_cache, get_registry
+from utils.helpers import extract_symptoms_from_text
+from utils.hospitals import get_nearby_hospitals
+from utils.instrumentation import export_on_exit, get_metrics
+from utils.prediction import iter_predictions
+from utils.triage import get_triage_engine, split_clauses
+
+MAX_BATCH_SIZE = 10000
+
+
+class PredictRequest(BaseModel):
+    symptoms: str = Field(..., min_length=1, description="Free-text symptom description")
+    top_k: int = Field(3, ge=1, le=50)
+
+
+class BatchPredictRequest(BaseModel):
+    texts: List[str] = Field(..., max_length=MAX_BATCH_SIZE)
+    top_k: int = Field(1, ge=1, le=50)
+
+
+class TriageRequest(BaseModel):
+    symptoms: Union[str, List[str]] = Field(..., description="Free text or a list of symptoms")
+
+
+def _ranked(pairs):
+    return [{'disease': disease, 'confidence': confidence} for disease, confidence in pairs]
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load the model before accepting traffic so no request pays the cold start
+    get_registry().get()
+    export_on_exit()
+    yield
+
+
+app = FastAPI(title="Smart Health Companion API", lifespan=lifespan)
+
+
+@app.get("/health")
+def health():
+    bundle = get_registry().get()
+    status = {'status': 'ok', 'diseases': len(bundle.diseases), 'loaded_at': bundle.loaded_at,
+              'prediction_cache': get_prediction_cache().stats()}
+    if bundle.cascade_margin is not None:
+        status['cascade'] = dict(bundle.cascade_stats(), margin=bundle.cascade_margin)
+    return status
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Stage latency histograms; empty unless INSTRUMENTATION=1
+    return PlainTextResponse(get_metrics().prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/predict")
+def predict(request: PredictRequest):
+    bundle = get_registry().get()
+    ranked, symptoms = bundle.predict_text(request.symptoms, top_k=request.top_k, return_symptoms=True)
+    if not ranked:
+        raise HTTPException(status_code=422, detail="No recognized symptoms in the description")
+    return {
+        'symptoms': symptoms,
+        'predicted_disease': ranked[0][0],
+        'confidence': ranked[0][1],
+        'top_k': _ranked(ranked),
+    }
+
+
+@app.post("/predict/batch")
+def predict_batch(request: BatchPredictRequest):
+    bundle = get_registry().get()
+    results = [
+        {**result, 'top_k': _ranked(result['top_k'])}
+        for result in iter_predictions(request.texts, bundle.engine, model=bundle.model, top_k=request.top_k,
+                                       cascade_margin=bundle.cascade_margin)
+    ]
+    return {'results': results}
+
+
+@app.post("/triage")
+def triage(request: TriageRequest):
+    # Rules see the raw clauses so negations and modifiers count; the
+    # extracted symptom names are only reported back
+    if isinstance(request.symptoms, str):
+        clauses = split_clauses(request.symptoms)
+        symptoms = extract_symptoms_from_text(request.symptoms)
+    else:
+        clauses = [symptom.strip().lower() for symptom in request.symptoms if symptom.strip()]
+        symptoms = clauses
+
+    result = get_triage_engine().evaluate(clauses)
+    return {
+        'symptoms': symptoms,
+        'severity': result['severity'],
+        'priority': result['priority'],
+        'matched': result['matched'],
+    }
+
+
+@app.get("/hospitals")
+def hospitals(location: str = Query(..., min_length=3), k: int = Query(5, ge=1, le=100),
+              radius_km: Optional[float] = Query(None, gt=0),
+              sort_by: str = Query('distance', pattern='^(distance|rating)$')):
+    results = get_nearby_hospitals(location, k=k, radius_km=radius_km, sort_by=sort_by)
+    if not results:
+        raise HTTPException(status_code=404, detail="No hospitals found")
+    return {'hospitals': results}
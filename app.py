@@ -1,28 +1,32 @@
+"""
+Smart Health Companion - Streamlit app
+
+Only Streamlit is imported up front. Each page imports the modules it
+needs when it is rendered, so light pages such as Health Tips never load
+the model, NumPy or the map libraries. `python benchmark.py
+--import-profile` reports where import time goes.
+"""
+
 import streamlit as st
-import pandas as pd
-import numpy as np
-import pickle
-import os
 from datetime import datetime
-import folium
-from streamlit_folium import folium_static
-import requests
-import json
-from dotenv import load_dotenv
+from functools import lru_cache
 
-# Load environment variables
-load_dotenv()
+from utils.instrumentation import configure_from_env, timed
 
-# Page configuration
-st.set_page_config(
-    page_title="Smart Health Companion",
-    page_icon="🏥",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+@lru_cache(maxsize=1)
+def load_environment():
+    """Load variables from .env once per process"""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return False
+    loaded = load_dotenv()
+    # Instrumentation read its flags at import, before .env was loaded
+    configure_from_env()
+    return loaded
 
 # Custom CSS for better styling
-st.markdown("""
+PAGE_CSS = """
 <style>
     .main-header {
         font-size: 3rem;
@@ -52,115 +56,31 @@ st.markdown("""
         margin: 1rem 0;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+def configure_page():
+    """Page configuration and styling; must be the first Streamlit call of every run"""
+    st.set_page_config(
+        page_title="Smart Health Companion",
+        page_icon="🏥",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    st.markdown(PAGE_CSS, unsafe_allow_html=True)
+    load_environment()
 
 # Load the disease prediction model and data
-@st.cache_resource
 def load_model_and_data():
     """Load the trained model and symptom data"""
     try:
-        # Create sample data for demonstration
-        symptoms_data = {
-            'fever': [1, 1, 1, 0, 0, 0, 0, 0, 0, 0],
-            'headache': [1, 0, 1, 1, 0, 0, 0, 0, 0, 0],
-            'fatigue': [1, 1, 0, 0, 1, 0, 0, 0, 0, 0],
-            'cough': [0, 1, 0, 0, 0, 1, 1, 0, 0, 0],
-            'sore_throat': [0, 1, 0, 0, 0, 1, 0, 0, 0, 0],
-            'runny_nose': [0, 1, 0, 0, 0, 1, 0, 0, 0, 0],
-            'body_pain': [1, 0, 0, 0, 0, 0, 0, 1, 0, 0],
-            'nausea': [0, 0, 0, 0, 0, 0, 0, 0, 1, 0],
-            'vomiting': [0, 0, 0, 0, 0, 0, 0, 0, 1, 0],
-            'diarrhea': [0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-            'abdominal_pain': [0, 0, 0, 0, 0, 0, 0, 0, 0, 1]
-        }
+        from model.registry import get_registry
         
-        diseases = ['Dengue', 'Common Cold', 'Migraine', 'Tension Headache', 
-                   'Chronic Fatigue', 'Bronchitis', 'Pneumonia', 'Fibromyalgia', 
-                   'Food Poisoning', 'Gastroenteritis']
-        
-        return symptoms_data, diseases
+        # The registry keeps one warm model per process, shared by all
+        # sessions, and swaps in new versions when the files change
+        return get_registry().get()
     except Exception as e:
         st.error(f"Error loading model: {e}")
-        return None, None
-
-# Disease information database
-disease_info = {
-    'Dengue': {
-        'description': 'A viral infection transmitted by mosquitoes',
-        'symptoms': ['High fever', 'Severe headache', 'Body pain', 'Fatigue', 'Nausea'],
-        'first_aid': [
-            'Rest and stay hydrated',
-            'Take acetaminophen for fever and pain',
-            'Avoid aspirin and ibuprofen',
-            'Monitor for severe symptoms',
-            'Seek immediate medical attention if symptoms worsen'
-        ],
-        'diet': [
-            'Drink plenty of fluids (water, coconut water, oral rehydration solutions)',
-            'Eat light, easily digestible foods',
-            'Include fruits rich in vitamin C',
-            'Avoid fried and spicy foods',
-            'Consume protein-rich foods for recovery'
-        ],
-        'emergency_signs': [
-            'Severe abdominal pain',
-            'Persistent vomiting',
-            'Bleeding from gums or nose',
-            'Difficulty breathing',
-            'Cold, clammy skin'
-        ]
-    },
-    'Common Cold': {
-        'description': 'A viral infection of the upper respiratory tract',
-        'symptoms': ['Runny nose', 'Sore throat', 'Cough', 'Congestion', 'Mild fever'],
-        'first_aid': [
-            'Rest and get plenty of sleep',
-            'Stay hydrated with warm fluids',
-            'Use saline nasal drops',
-            'Gargle with warm salt water',
-            'Take over-the-counter medications for symptoms'
-        ],
-        'diet': [
-            'Drink warm fluids (tea, soup, broth)',
-            'Eat vitamin C rich foods',
-            'Include honey for sore throat',
-            'Avoid dairy if it increases mucus',
-            'Eat light, nutritious meals'
-        ],
-        'emergency_signs': [
-            'High fever above 103°F',
-            'Severe headache',
-            'Difficulty breathing',
-            'Chest pain',
-            'Symptoms lasting more than 10 days'
-        ]
-    },
-    'Migraine': {
-        'description': 'A neurological condition causing severe headaches',
-        'symptoms': ['Intense headache', 'Nausea', 'Sensitivity to light', 'Aura', 'Dizziness'],
-        'first_aid': [
-            'Rest in a quiet, dark room',
-            'Apply cold or warm compress to head/neck',
-            'Stay hydrated',
-            'Practice relaxation techniques',
-            'Take prescribed medications if available'
-        ],
-        'diet': [
-            'Stay hydrated with water',
-            'Eat regular meals to avoid low blood sugar',
-            'Avoid trigger foods (chocolate, caffeine, aged cheese)',
-            'Include magnesium-rich foods',
-            'Eat ginger for nausea relief'
-        ],
-        'emergency_signs': [
-            'Worst headache of your life',
-            'Headache with fever and stiff neck',
-            'Headache with confusion or difficulty speaking',
-            'Headache after head injury',
-            'Headache with vision problems'
-        ]
-    }
-}
+        return None
 
 # Diet suggestions for general health
 general_diet_tips = {
@@ -174,328 +94,339 @@ general_diet_tips = {
     'Regular Meals': 'Eat at regular intervals to maintain blood sugar'
 }
 
-def predict_disease(symptoms_input, symptoms_data, diseases):
+@timed('predict_disease')
+def predict_disease(symptoms_input, bundle, top_k=None):
     """Predict disease based on symptoms"""
-    if not symptoms_data or not diseases:
-        return "Common Cold", 0.8  # Default fallback
-    
-    # Convert symptoms to feature vector
-    feature_vector = []
-    available_symptoms = list(symptoms_data.keys())
-    
-    for symptom in available_symptoms:
-        if symptom.replace('_', ' ') in symptoms_input.lower():
-            feature_vector.append(1)
-        else:
-            feature_vector.append(0)
-    
-    # Simple rule-based prediction (in real app, use trained ML model)
-    if sum(feature_vector) == 0:
-        return "Common Cold", 0.6
+    from utils.executor import get_prediction_executor
     
-    # Calculate similarity scores
-    scores = []
-    for i in range(len(diseases)):
-        score = sum([feature_vector[j] * symptoms_data[symptom][i] 
-                    for j, symptom in enumerate(available_symptoms)])
-        scores.append(score)
+    executor = get_prediction_executor()
+    if executor is not None:
+        # PREDICTION_WORKERS is set: score in a worker process, off this process's GIL
+        return executor.predict(symptoms_input, top_k=top_k)
     
-    max_score = max(scores)
-    predicted_disease = diseases[scores.index(max_score)]
-    confidence = min(max_score / len(available_symptoms), 0.95)
+    if bundle is None:
+        # No model to score with; load_model_and_data has already reported why
+        return [] if top_k else None
     
-    return predicted_disease, confidence
+    return bundle.predict_text(symptoms_input, top_k=top_k)
 
 def get_nearby_hospitals(location):
-    """Get nearby hospitals using Google Maps API"""
+    """Get nearby hospitals for a location"""
     try:
-        # For demonstration, return sample hospital data
-        # In production, use Google Maps API
-        sample_hospitals = [
-            {
-                'name': 'City General Hospital',
-                'address': '123 Main Street, Downtown',
-                'distance': '0.5 km',
-                'rating': 4.5,
-                'phone': '+1-555-0123',
-                'lat': 40.7128,
-                'lng': -74.0060
-            },
-            {
-                'name': 'Community Medical Center',
-                'address': '456 Oak Avenue, Midtown',
-                'distance': '1.2 km',
-                'rating': 4.2,
-                'phone': '+1-555-0456',
-                'lat': 40.7589,
-                'lng': -73.9851
-            },
-            {
-                'name': 'Emergency Care Hospital',
-                'address': '789 Pine Street, Uptown',
-                'distance': '2.1 km',
-                'rating': 4.7,
-                'phone': '+1-555-0789',
-                'lat': 40.7505,
-                'lng': -73.9934
-            }
-        ]
-        return sample_hospitals
+        from utils.hospitals import get_nearby_hospitals as find_nearby_hospitals
+        
+        return find_nearby_hospitals(location)
     except Exception as e:
         st.error(f"Error fetching hospitals: {e}")
         return []
 
-def send_emergency_alert(contact_info, location, symptoms):
-    """Send emergency alert via SMS/Email"""
+@timed('send_emergency_alert')
+def send_emergency_alert(contact_name, contact_phone, contact_email, location, symptoms):
+    """Queue an emergency alert to the contact via SMS/Email"""
     try:
-        # For demonstration, show alert message
-        # In production, integrate with Twilio for SMS or smtplib for email
-        st.success(f"🚨 Emergency alert sent to {contact_info}")
-        st.info(f"Location: {location}")
-        st.info(f"Symptoms: {symptoms}")
+        from utils.alerts import get_dispatcher, queue_emergency_alert
+        from utils.geocoding import geocode
+        from utils.helpers import extract_symptoms_from_text, format_emergency_message
+        
+        place = geocode(location) if location else None
+        if place:
+            location = f"{location} ({place['lat']:.5f}, {place['lng']:.5f})"
+        symptom_list = (extract_symptoms_from_text(symptoms) or [symptoms.strip()]) if symptoms else []
+        message = format_emergency_message({}, symptom_list, location, description=symptoms or '')
+        
+        dispatcher = get_dispatcher()
+        if not dispatcher.transports:
+            # No SMS/email credentials configured: show what would be sent
+            st.warning(f"Emergency alert prepared for {contact_name} ({contact_phone or contact_email}) but NOT sent: "
+                       "no SMS or email delivery is configured. Contact them directly.")
+            st.info(f"Location: {location}")
+            st.info(f"Symptoms: {symptoms}")
+            return True
+        
+        queued = queue_emergency_alert(message, phone=contact_phone, email=contact_email, dispatcher=dispatcher)
+        if not queued:
+            st.error("No delivery channel is configured for this contact.")
+            return False
+        for channel, alert_id in queued.items():
+            if alert_id is None:
+                st.info(f"An identical {channel} alert was already sent to {contact_name} recently.")
+            else:
+                st.success(f"🚨 Emergency {channel} alert queued for delivery to {contact_name}")
         return True
     except Exception as e:
         st.error(f"Error sending alert: {e}")
         return False
 
-def main():
-    # Header
-    st.markdown('<h1 class="main-header">🏥 Smart Health Companion</h1>', unsafe_allow_html=True)
-    st.markdown("### Your AI-powered personal health advisor")
+def render_health_assessment():
+    """Symptom checker page"""
+    from utils.diseases import get_disease_info
     
-    # Load model and data
-    symptoms_data, diseases = load_model_and_data()
+    bundle = load_model_and_data()
     
-    # Sidebar for navigation
-    st.sidebar.title("Navigation")
-    page = st.sidebar.selectbox(
-        "Choose a feature:",
-        ["Health Assessment", "Nearby Hospitals", "Diet & Nutrition", "Emergency Help", "Health Tips"]
+    st.markdown('<h2 class="sub-header">🔍 Health Assessment</h2>', unsafe_allow_html=True)
+    
+    # Symptom input
+    st.write("### Describe your symptoms:")
+    symptoms_input = st.text_area(
+        "Enter your symptoms (e.g., fever, headache, fatigue, cough):",
+        height=100,
+        placeholder="Describe how you're feeling..."
     )
     
-    if page == "Health Assessment":
-        st.markdown('<h2 class="sub-header">🔍 Health Assessment</h2>', unsafe_allow_html=True)
-        
-        # Symptom input
-        st.write("### Describe your symptoms:")
-        symptoms_input = st.text_area(
-            "Enter your symptoms (e.g., fever, headache, fatigue, cough):",
-            height=100,
-            placeholder="Describe how you're feeling..."
-        )
-        
-        if st.button("🔬 Analyze Symptoms", type="primary"):
-            if symptoms_input.strip():
-                with st.spinner("Analyzing your symptoms..."):
-                    # Predict disease
-                    predicted_disease, confidence = predict_disease(symptoms_input, symptoms_data, diseases)
+    if st.button("🔬 Analyze Symptoms", type="primary"):
+        if symptoms_input.strip():
+            with st.spinner("Analyzing your symptoms..."):
+                # Predict disease
+                differential = predict_disease(symptoms_input, bundle, top_k=3)
+                if bundle is None and not differential:
+                    st.error("Symptom analysis is unavailable because the prediction model could not be loaded.")
+                    return
+                if not differential:
+                    st.warning("We couldn't recognize any symptoms in your description. Please describe how "
+                               "you feel in a few words, e.g. fever, headache, sore throat.")
+                    return
+                predicted_disease, confidence = differential[0]
+                
+                # Display results
+                st.markdown('<div class="info-box">', unsafe_allow_html=True)
+                st.write(f"**Predicted Condition:** {predicted_disease}")
+                st.write(f"**Confidence:** {confidence:.1%}")
+                if len(differential) > 1:
+                    st.write("**Other possibilities:** " + ", ".join(
+                        f"{disease} ({probability:.0%})" for disease, probability in differential[1:]))
+                st.markdown('</div>', unsafe_allow_html=True)
+                
+                # Show disease information
+                info = get_disease_info(predicted_disease)
+                if info:
                     
-                    # Display results
-                    st.markdown('<div class="info-box">', unsafe_allow_html=True)
-                    st.write(f"**Predicted Condition:** {predicted_disease}")
-                    st.write(f"**Confidence:** {confidence:.1%}")
-                    st.markdown('</div>', unsafe_allow_html=True)
+                    col1, col2 = st.columns(2)
                     
-                    # Show disease information
-                    if predicted_disease in disease_info:
-                        info = disease_info[predicted_disease]
+                    with col1:
+                        st.subheader("📋 Description")
+                        st.write(info['description'])
                         
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            st.subheader("📋 Description")
-                            st.write(info['description'])
-                            
-                            st.subheader("🚨 Emergency Signs")
-                            for sign in info['emergency_signs']:
-                                st.write(f"• {sign}")
-                        
-                        with col2:
-                            st.subheader("⚕️ First Aid Steps")
-                            for step in info['first_aid']:
-                                st.write(f"• {step}")
-                            
-                            st.subheader("🍎 Diet Recommendations")
-                            for diet in info['diet']:
-                                st.write(f"• {diet}")
-                    else:
-                        st.info("General health advice will be provided based on your symptoms.")
-                        
-                        st.subheader("⚕️ General First Aid")
-                        st.write("• Rest and stay hydrated")
-                        st.write("• Monitor your symptoms")
-                        st.write("• Seek medical attention if symptoms worsen")
+                        st.subheader("🚨 Emergency Signs")
+                        for sign in info['emergency_signs']:
+                            st.write(f"• {sign}")
+                    
+                    with col2:
+                        st.subheader("⚕️ First Aid Steps")
+                        for step in info['first_aid']:
+                            st.write(f"• {step}")
                         
-                        st.subheader("🍎 General Diet Tips")
-                        for tip, advice in general_diet_tips.items():
-                            st.write(f"• **{tip}:** {advice}")
-            else:
-                st.warning("Please enter your symptoms to get started.")
+                        st.subheader("🍎 Diet Recommendations")
+                        for diet in info['diet']:
+                            st.write(f"• {diet}")
+                else:
+                    st.info("General health advice will be provided based on your symptoms.")
+                    
+                    st.subheader("⚕️ General First Aid")
+                    st.write("• Rest and stay hydrated")
+                    st.write("• Monitor your symptoms")
+                    st.write("• Seek medical attention if symptoms worsen")
+                    
+                    st.subheader("🍎 General Diet Tips")
+                    for tip, advice in general_diet_tips.items():
+                        st.write(f"• **{tip}:** {advice}")
+        else:
+            st.warning("Please enter your symptoms to get started.")
+
+def render_nearby_hospitals():
+    """Hospital search page"""
+    import streamlit.components.v1 as components
+    from utils.geocoding import geocode
+    from utils.maps import MAP_HEIGHT, get_map_renderer
     
-    elif page == "Nearby Hospitals":
-        st.markdown('<h2 class="sub-header">🏥 Nearby Hospitals</h2>', unsafe_allow_html=True)
-        
-        # Location input
-        location = st.text_input("Enter your location (city, address, or coordinates):", 
-                                placeholder="e.g., New York, NY or 40.7128, -74.0060")
-        
-        if st.button("🔍 Find Hospitals"):
-            if location:
-                with st.spinner("Finding nearby hospitals..."):
-                    hospitals = get_nearby_hospitals(location)
+    st.markdown('<h2 class="sub-header">🏥 Nearby Hospitals</h2>', unsafe_allow_html=True)
+    
+    # Location input
+    location = st.text_input("Enter your location (city, address, or coordinates):", 
+                            placeholder="e.g., New York, NY or 40.7128, -74.0060")
+    
+    if st.button("🔍 Find Hospitals"):
+        if location:
+            with st.spinner("Finding nearby hospitals..."):
+                place = geocode(location)
+                hospitals = get_nearby_hospitals(location) if place else []
+                
+                if place is None:
+                    st.warning("Could not find that location. Try a city name or 'lat, lng' coordinates.")
+                elif hospitals:
+                    st.caption(f"Showing hospitals near {place['label']}")
+                    # Render the map off the request path while the list is drawn
+                    map_slot = st.empty()
+                    rendered_map = get_map_renderer().submit(hospitals)
                     
-                    if hospitals:
-                        # Create map
-                        map_center = [hospitals[0]['lat'], hospitals[0]['lng']]
-                        m = folium.Map(location=map_center, zoom_start=12)
-                        
-                        for hospital in hospitals:
-                            folium.Marker(
-                                location=[hospital['lat'], hospital['lng']],
-                                popup=f"<b>{hospital['name']}</b><br>{hospital['address']}<br>Phone: {hospital['phone']}",
-                                icon=folium.Icon(color='red', icon='info-sign')
-                            ).add_to(m)
-                        
-                        folium_static(m)
-                        
-                        # Display hospital list
-                        st.subheader("📋 Hospital Details")
-                        for i, hospital in enumerate(hospitals, 1):
-                            with st.expander(f"{i}. {hospital['name']}"):
-                                st.write(f"**Address:** {hospital['address']}")
-                                st.write(f"**Distance:** {hospital['distance']}")
-                                st.write(f"**Rating:** {hospital['rating']} ⭐")
-                                st.write(f"**Phone:** {hospital['phone']}")
-                    else:
-                        st.warning("No hospitals found in your area.")
-            else:
-                st.warning("Please enter your location to find nearby hospitals.")
+                    # Display hospital list
+                    st.subheader("📋 Hospital Details")
+                    for i, hospital in enumerate(hospitals, 1):
+                        with st.expander(f"{i}. {hospital['name']}"):
+                            st.write(f"**Address:** {hospital['address']}")
+                            st.write(f"**Distance:** {hospital['distance']}")
+                            st.write(f"**Rating:** {hospital['rating']} ⭐")
+                            st.write(f"**Phone:** {hospital['phone']}")
+                    
+                    with map_slot.container():
+                        components.html(rendered_map.result(), height=MAP_HEIGHT)
+                else:
+                    st.warning("No hospitals found in your area.")
+        else:
+            st.warning("Please enter your location to find nearby hospitals.")
+
+def render_diet_and_nutrition():
+    """Diet recommendations page"""
+    from utils.diseases import get_content_store, get_disease_info
+    
+    st.markdown('<h2 class="sub-header">🍎 Diet & Nutrition</h2>', unsafe_allow_html=True)
+    
+    # Diet recommendations based on condition
+    condition = st.selectbox(
+        "Select your health condition (optional):",
+        ["General Health"] + get_content_store().names()
+    )
     
-    elif page == "Diet & Nutrition":
-        st.markdown('<h2 class="sub-header">🍎 Diet & Nutrition</h2>', unsafe_allow_html=True)
+    if condition == "General Health":
+        st.subheader("🌱 General Nutrition Guidelines")
+        col1, col2 = st.columns(2)
         
-        # Diet recommendations based on condition
-        condition = st.selectbox(
-            "Select your health condition (optional):",
-            ["General Health", "Dengue", "Common Cold", "Migraine", "Diabetes", "Hypertension"]
-        )
+        with col1:
+            st.write("**Daily Recommendations:**")
+            for tip, advice in general_diet_tips.items():
+                st.write(f"• **{tip}:** {advice}")
         
-        if condition == "General Health":
-            st.subheader("🌱 General Nutrition Guidelines")
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.write("**Daily Recommendations:**")
-                for tip, advice in general_diet_tips.items():
-                    st.write(f"• **{tip}:** {advice}")
-            
-            with col2:
-                st.write("**Healthy Meal Ideas:**")
-                st.write("• **Breakfast:** Oatmeal with berries and nuts")
-                st.write("• **Lunch:** Grilled chicken salad with vegetables")
-                st.write("• **Dinner:** Salmon with quinoa and steamed vegetables")
-                st.write("• **Snacks:** Greek yogurt, fruits, or mixed nuts")
+        with col2:
+            st.write("**Healthy Meal Ideas:**")
+            st.write("• **Breakfast:** Oatmeal with berries and nuts")
+            st.write("• **Lunch:** Grilled chicken salad with vegetables")
+            st.write("• **Dinner:** Salmon with quinoa and steamed vegetables")
+            st.write("• **Snacks:** Greek yogurt, fruits, or mixed nuts")
+    else:
+        info = get_disease_info(condition)
+        if info:
+            st.subheader(f"🍎 Diet Recommendations for {condition}")
+            for diet in info['diet']:
+                st.write(f"• {diet}")
         else:
-            if condition in disease_info:
-                info = disease_info[condition]
-                st.subheader(f"🍎 Diet Recommendations for {condition}")
-                for diet in info['diet']:
-                    st.write(f"• {diet}")
-            else:
-                st.info("General diet recommendations:")
-                for tip, advice in list(general_diet_tips.items())[:4]:
-                    st.write(f"• **{tip}:** {advice}")
+            st.info("General diet recommendations:")
+            for tip, advice in list(general_diet_tips.items())[:4]:
+                st.write(f"• **{tip}:** {advice}")
+
+def render_emergency_help():
+    """Emergency contacts and alerts page"""
+    st.markdown('<h2 class="sub-header">🚨 Emergency Help</h2>', unsafe_allow_html=True)
     
-    elif page == "Emergency Help":
-        st.markdown('<h2 class="sub-header">🚨 Emergency Help</h2>', unsafe_allow_html=True)
-        
-        st.warning("⚠️ This feature is for demonstration purposes. In a real emergency, call your local emergency number immediately.")
-        
-        # Emergency contact setup
-        st.subheader("📞 Emergency Contact Setup")
-        contact_name = st.text_input("Emergency Contact Name:")
-        contact_phone = st.text_input("Emergency Contact Phone:")
-        contact_email = st.text_input("Emergency Contact Email:")
-        
-        # Current symptoms for emergency alert
-        emergency_symptoms = st.text_area("Current symptoms (for emergency alert):")
-        current_location = st.text_input("Your current location:")
-        
-        if st.button("🚨 SEND EMERGENCY ALERT", type="primary"):
-            if contact_name and (contact_phone or contact_email):
-                if send_emergency_alert(f"{contact_name} ({contact_phone or contact_email})", 
-                                     current_location, emergency_symptoms):
-                    st.success("Emergency alert sent successfully!")
-                    st.info("Your emergency contact has been notified with your location and symptoms.")
-            else:
-                st.error("Please provide at least one contact method (phone or email).")
-        
-        # Emergency numbers
-        st.subheader("📞 Important Emergency Numbers")
-        emergency_numbers = {
-            "United States": "911",
-            "United Kingdom": "999",
-            "Canada": "911",
-            "Australia": "000",
-            "India": "112",
-            "Germany": "112",
-            "France": "112",
-            "Japan": "119"
-        }
-        
-        for country, number in emergency_numbers.items():
-            st.write(f"**{country}:** {number}")
+    st.warning("⚠️ This feature is for demonstration purposes. In a real emergency, call your local emergency number immediately.")
     
-    elif page == "Health Tips":
-        st.markdown('<h2 class="sub-header">💡 Health Tips</h2>', unsafe_allow_html=True)
-        
-        # Daily health tips
-        st.subheader("🌅 Daily Health Tips")
-        
-        tips = [
-            "Start your day with a glass of warm water with lemon",
-            "Take regular breaks from screen time to reduce eye strain",
-            "Practice deep breathing exercises for stress relief",
-            "Stay hydrated throughout the day",
-            "Get at least 7-8 hours of quality sleep",
-            "Include physical activity in your daily routine",
-            "Eat a rainbow of fruits and vegetables",
-            "Practice good posture while sitting and standing",
-            "Limit processed foods and added sugars",
-            "Maintain regular health check-ups"
-        ]
-        
-        for i, tip in enumerate(tips, 1):
-            st.write(f"{i}. {tip}")
-        
-        # Seasonal health advice
-        st.subheader("🌤️ Seasonal Health Advice")
-        current_month = datetime.now().month
-        
-        if current_month in [12, 1, 2]:  # Winter
-            st.write("**Winter Health Tips:**")
-            st.write("• Stay warm and layer clothing")
-            st.write("• Boost immunity with vitamin C")
-            st.write("• Moisturize skin to prevent dryness")
-            st.write("• Exercise indoors when weather is extreme")
-        elif current_month in [3, 4, 5]:  # Spring
-            st.write("**Spring Health Tips:**")
-            st.write("• Manage seasonal allergies")
-            st.write("• Get outdoors for vitamin D")
-            st.write("• Spring clean your living space")
-            st.write("• Start outdoor exercise routines")
-        elif current_month in [6, 7, 8]:  # Summer
-            st.write("**Summer Health Tips:**")
-            st.write("• Stay hydrated in hot weather")
-            st.write("• Protect skin from UV rays")
-            st.write("• Exercise during cooler hours")
-            st.write("• Eat light, refreshing foods")
-        else:  # Fall
-            st.write("**Fall Health Tips:**")
-            st.write("• Prepare for flu season")
-            st.write("• Maintain regular sleep schedule")
-            st.write("• Eat seasonal fruits and vegetables")
-            st.write("• Stay active as days get shorter")
+    # Emergency contact setup
+    st.subheader("📞 Emergency Contact Setup")
+    contact_name = st.text_input("Emergency Contact Name:")
+    contact_phone = st.text_input("Emergency Contact Phone:")
+    contact_email = st.text_input("Emergency Contact Email:")
+    
+    # Current symptoms for emergency alert
+    emergency_symptoms = st.text_area("Current symptoms (for emergency alert):")
+    current_location = st.text_input("Your current location:")
+    
+    if st.button("🚨 SEND EMERGENCY ALERT", type="primary"):
+        if contact_name and (contact_phone or contact_email):
+            # send_emergency_alert reports whether the alert was queued or only prepared
+            send_emergency_alert(contact_name, contact_phone, contact_email, current_location, emergency_symptoms)
+        else:
+            st.error("Please provide at least one contact method (phone or email).")
+    
+    # Emergency numbers
+    st.subheader("📞 Important Emergency Numbers")
+    emergency_numbers = {
+        "United States": "911",
+        "United Kingdom": "999",
+        "Canada": "911",
+        "Australia": "000",
+        "India": "112",
+        "Germany": "112",
+        "France": "112",
+        "Japan": "119"
+    }
+    
+    for country, number in emergency_numbers.items():
+        st.write(f"**{country}:** {number}")
+
+def render_health_tips():
+    """Daily and seasonal health tips page"""
+    st.markdown('<h2 class="sub-header">💡 Health Tips</h2>', unsafe_allow_html=True)
+    
+    # Daily health tips
+    st.subheader("🌅 Daily Health Tips")
+    
+    tips = [
+        "Start your day with a glass of warm water with lemon",
+        "Take regular breaks from screen time to reduce eye strain",
+        "Practice deep breathing exercises for stress relief",
+        "Stay hydrated throughout the day",
+        "Get at least 7-8 hours of quality sleep",
+        "Include physical activity in your daily routine",
+        "Eat a rainbow of fruits and vegetables",
+        "Practice good posture while sitting and standing",
+        "Limit processed foods and added sugars",
+        "Maintain regular health check-ups"
+    ]
+    
+    for i, tip in enumerate(tips, 1):
+        st.write(f"{i}. {tip}")
+    
+    # Seasonal health advice
+    st.subheader("🌤️ Seasonal Health Advice")
+    current_month = datetime.now().month
+    
+    if current_month in [12, 1, 2]:  # Winter
+        st.write("**Winter Health Tips:**")
+        st.write("• Stay warm and layer clothing")
+        st.write("• Boost immunity with vitamin C")
+        st.write("• Moisturize skin to prevent dryness")
+        st.write("• Exercise indoors when weather is extreme")
+    elif current_month in [3, 4, 5]:  # Spring
+        st.write("**Spring Health Tips:**")
+        st.write("• Manage seasonal allergies")
+        st.write("• Get outdoors for vitamin D")
+        st.write("• Spring clean your living space")
+        st.write("• Start outdoor exercise routines")
+    elif current_month in [6, 7, 8]:  # Summer
+        st.write("**Summer Health Tips:**")
+        st.write("• Stay hydrated in hot weather")
+        st.write("• Protect skin from UV rays")
+        st.write("• Exercise during cooler hours")
+        st.write("• Eat light, refreshing foods")
+    else:  # Fall
+        st.write("**Fall Health Tips:**")
+        st.write("• Prepare for flu season")
+        st.write("• Maintain regular sleep schedule")
+        st.write("• Eat seasonal fruits and vegetables")
+        st.write("• Stay active as days get shorter")
+
+# Sidebar pages; each one imports only what it needs when it is shown
+PAGES = {
+    "Health Assessment": render_health_assessment,
+    "Nearby Hospitals": render_nearby_hospitals,
+    "Diet & Nutrition": render_diet_and_nutrition,
+    "Emergency Help": render_emergency_help,
+    "Health Tips": render_health_tips,
+}
+
+def main():
+    configure_page()
+    
+    # Header
+    st.markdown('<h1 class="main-header">🏥 Smart Health Companion</h1>', unsafe_allow_html=True)
+    st.markdown("### Your AI-powered personal health advisor")
+    
+    # Sidebar for navigation
+    st.sidebar.title("Navigation")
+    page = st.sidebar.selectbox(
+        "Choose a feature:",
+        list(PAGES)
+    )
+    
+    PAGES[page]()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
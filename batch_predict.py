@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Batch disease prediction for Smart Health Companion
+
+Streams a CSV or JSONL file of free-text complaints through the symptom
+extractor and the prediction engine, writing one JSON result per line.
+
+    python batch_predict.py intake.csv --text-column symptoms -o results.jsonl
+"""
+
+import argparse
+import csv
+import json
+import sys
+from collections import Counter, deque
+
+from model.registry import DEFAULT_CASCADE_MARGIN, DEFAULT_MAPPING_PATH, SERVING_CASCADE_MARGIN, ModelRegistry
+from utils.executor import PredictionExecutor
+from utils.prediction import PredictionEngine, iter_predictions
+
+
+def iter_records(filepath, file_format=None):
+    """
+    Lazily yield dict records from a CSV or JSONL file ('-' reads stdin).
+    JSONL lines that are not objects are skipped with a note on stderr.
+    """
+    if file_format is None:
+        file_format = 'jsonl' if filepath.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+    f = sys.stdin if filepath == '-' else open(filepath, newline='', encoding='utf-8')
+    try:
+        if file_format == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if isinstance(record, dict):
+                    yield record
+                else:
+                    print(f"Skipping line {line_number}: expected a JSON object, got {type(record).__name__}",
+                          file=sys.stderr)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Predict diseases for a file of symptom descriptions")
+    parser.add_argument('input', help="CSV or JSONL file of complaints ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='-', help="JSONL output file (default: stdout)")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="Input format (default: from extension)")
+    parser.add_argument('--text-column', default='symptoms', help="Field holding the free text")
+    parser.add_argument('--id-column', help="Field copied into each result to identify the record")
+    parser.add_argument('--data', default='data/symptoms.csv', help="Symptom x disease dataset")
+    parser.add_argument('--model', help="Score with a trained model (e.g. model/disease_model.pkl)")
+    parser.add_argument('--mapping', default=DEFAULT_MAPPING_PATH, help="Symptom mapping saved with the model")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="Records scored per matrix multiply")
+    parser.add_argument('--top-k', type=int, default=1, help="Number of ranked diseases per record")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Score chunks in this many worker processes (default: in this process)")
+    parser.add_argument('--cascade-margin', type=float, nargs='?', const=DEFAULT_CASCADE_MARGIN,
+                        help="With --model, run the model only when the matrix engine's top two "
+                             f"diseases are closer than this ({DEFAULT_CASCADE_MARGIN} if given without a "
+                             f"value, {SERVING_CASCADE_MARGIN} if omitted, as served by the app)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Run batch prediction from the command line
+    """
+    args = parse_args(argv)
+    if args.model and args.cascade_margin is None:
+        args.cascade_margin = SERVING_CASCADE_MARGIN
+
+    # Keep only the id of each record in memory while its chunk is scored
+    ids = deque()
+
+    def texts():
+        for record in iter_records(args.input, args.format):
+            if args.id_column:
+                ids.append(record.get(args.id_column))
+            yield record.get(args.text_column) or ''
+
+    executor = None
+    if args.workers > 1:
+        # Chunks are scored in worker processes, each with its own copy of the model
+        executor = PredictionExecutor(workers=args.workers, model_path=args.model, mapping_path=args.mapping,
+                                      data_path=args.data, cascade_margin=args.cascade_margin)
+        results = executor.iter_predictions(texts(), chunk_size=args.chunk_size, top_k=args.top_k)
+    else:
+        if args.model:
+            bundle = ModelRegistry(model_path=args.model, mapping_path=args.mapping, data_path=args.data).get()
+            engine, model = bundle.engine, bundle.model
+        else:
+            engine, model = PredictionEngine.from_dataset(args.data), None
+        results = iter_predictions(texts(), engine, model=model, chunk_size=args.chunk_size,
+                                   top_k=args.top_k, cascade_margin=args.cascade_margin)
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    count = 0
+    tiers = Counter()
+    try:
+        for result in results:
+            tiers[result.get('tier')] += 1
+            if args.id_column:
+                result = {args.id_column: ids.popleft(), **result}
+            out.write(json.dumps(result) + '\n')
+            count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if executor is not None:
+            executor.shutdown()
+
+    print(f"Scored {count} records", file=sys.stderr)
+    if args.model and args.cascade_margin is not None:
+        print(f"Answered by the matrix engine: {tiers['engine']}, by the model: {tiers['model']}, "
+              f"without a known symptom: {tiers['fallback']}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
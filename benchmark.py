@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Smart Health Companion prediction hot path
+
+Runs offline against synthetic workloads that scale vocabulary size,
+input length and batch size, reports p50/p99 latency and throughput, and
+compares the results against a saved baseline.
+
+    python benchmark.py --save-baseline bench_baseline.json
+    python benchmark.py --baseline bench_baseline.json --threshold 0.25
+
+Startup cost is profiled separately with `python -X importtime`:
+
+    python benchmark.py --import-profile              # import app
+    python benchmark.py --import-profile "import api"
+
+The cascade cutoff (CASCADE_MARGIN) is tuned with a sweep that reports
+how many requests each tier answers and the resulting latency:
+
+    python benchmark.py --cascade-sweep
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from functools import lru_cache
+from itertools import cycle
+
+import numpy as np
+
+from utils.bitset import BitsetMatrix
+from utils.helpers import COMMON_SYMPTOMS, extract_symptoms_from_text, get_emergency_priority
+from utils.matching import SymptomMatcher
+from utils.prediction import PredictionEngine, predict_batch
+
+# Import time allowed for app.py itself, on top of the Streamlit framework
+IMPORT_BUDGET_MS = 100.0
+IMPORT_BUDGET_EXCLUDE = ('streamlit',)
+
+# Cascade cutoffs compared by --cascade-sweep; 0 never runs the forest, 1 always does
+CASCADE_MARGINS = (0.0, 0.1, 0.2, 0.4, 1.0)
+
+FILLER_WORDS = [
+    'patient', 'reports', 'since', 'yesterday', 'mild', 'with', 'and', 'the',
+    'intermittent', 'after', 'eating', 'worse', 'at', 'night', 'no', 'history',
+]
+
+
+def measure(func, repeats, warmup=3):
+    """
+    Time repeated calls of func and return latency statistics in milliseconds
+    """
+    for _ in range(warmup):
+        func()
+
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings[i] = time.perf_counter() - start
+
+    return latency_stats(timings * 1000.0)
+
+
+def latency_stats(timings_ms):
+    """
+    p50/p99/mean latency and throughput of a sequence of call timings in milliseconds
+    """
+    timings = np.asarray(timings_ms, dtype=np.float64)
+    total = timings.sum()
+    return {
+        'repeats': len(timings),
+        'p50_ms': float(np.percentile(timings, 50)),
+        'p99_ms': float(np.percentile(timings, 99)),
+        'mean_ms': float(timings.mean()),
+        'throughput_per_s': float(len(timings) / (total / 1000.0)) if total else float('inf'),
+    }
+
+
+def synthetic_vocabulary(size, rng):
+    """
+    Random one- to three-word symptom names
+    """
+    vocabulary = set(COMMON_SYMPTOMS)
+    while len(vocabulary) < size:
+        n_words = rng.randint(1, 3)
+        vocabulary.add(' '.join(
+            ''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(4, 9)))
+            for _ in range(n_words)
+        ))
+    return sorted(vocabulary)[:size]
+
+
+def synthetic_text(vocabulary, n_words, rng, symptom_ratio=0.2):
+    """
+    Free text of roughly n_words words mixing symptoms and filler
+    """
+    words = []
+    while len(words) < n_words:
+        if rng.random() < symptom_ratio:
+            words.extend(rng.choice(vocabulary).split())
+        else:
+            words.append(rng.choice(FILLER_WORDS))
+    return ' '.join(words[:n_words])
+
+
+def synthetic_engine(n_symptoms, n_diseases, rng):
+    """
+    Prediction engine over a random sparse incidence matrix
+    """
+    vocabulary = synthetic_vocabulary(n_symptoms, rng)
+    np_rng = np.random.default_rng(rng.randint(0, 2 ** 31))
+    incidence = (np_rng.random((n_diseases, n_symptoms)) < 0.05).astype(np.float32)
+    diseases = [f"Disease {i}" for i in range(n_diseases)]
+    return PredictionEngine([term.replace(' ', '_') for term in vocabulary], diseases, incidence), vocabulary
+
+
+def build_cases(quick=False, seed=42):
+    """
+    Return (name, setup, repeats) for every benchmark case.
+
+    setup() builds the case's inputs and returns the function to time, so
+    cases that are filtered out (--only) never pay for their workloads.
+    Each case draws from its own seeded RNG, so its inputs do not depend
+    on which other cases run.
+    """
+    scale = 0.1 if quick else 1.0
+
+    def repeats(n):
+        return max(5, int(n * scale))
+
+    def case_rng(name):
+        return random.Random(f"{seed}:{name}")
+
+    @lru_cache(maxsize=None)
+    def real_engine():
+        return PredictionEngine.from_csv()
+
+    @lru_cache(maxsize=None)
+    def catalog(n_symptoms, n_diseases):
+        engine, vocabulary = synthetic_engine(n_symptoms, n_diseases, case_rng(f"catalog={n_symptoms}x{n_diseases}"))
+        return engine, vocabulary, synthetic_text(vocabulary, 50, case_rng(f"text={n_symptoms}x{n_diseases}"))
+
+    @lru_cache(maxsize=None)
+    def forest_features():
+        return real_engine().encode_text(synthetic_text(COMMON_SYMPTOMS, 20, case_rng('forest'))).reshape(1, -1)
+
+    cases = []
+
+    # Symptom extraction: input length on the real vocabulary. Distinct
+    # texts keep the normalization LRU cache from hiding the matcher cost.
+    for n_words in (10, 100, 1000):
+        name = f"extract_symptoms/words={n_words}"
+
+        def setup(name=name, n_words=n_words):
+            rng = case_rng(name)
+            texts = cycle([synthetic_text(COMMON_SYMPTOMS, n_words, rng) for _ in range(5000)])
+            return lambda: extract_symptoms_from_text(next(texts))
+
+        cases.append((name, setup, repeats(2000)))
+
+    # Symptom matching: vocabulary size at a fixed input length
+    for size in (60, 1000, 10000):
+        name = f"match_symptoms/vocab={size}"
+
+        def setup(name=name, size=size):
+            rng = case_rng(name)
+            vocabulary = synthetic_vocabulary(size, rng)
+            matcher = SymptomMatcher(vocabulary)
+            text = synthetic_text(vocabulary, 200, rng)
+            return lambda: matcher.extract(text)
+
+        cases.append((name, setup, repeats(2000)))
+
+    # Single-request prediction: catalog size
+    for n_symptoms, n_diseases in ((60, 10), (1000, 100), (5000, 500)):
+        size = f"symptoms={n_symptoms},diseases={n_diseases}"
+
+        def dense(n_symptoms=n_symptoms, n_diseases=n_diseases):
+            engine, _, text = catalog(n_symptoms, n_diseases)
+            return lambda: engine.predict(engine.encode_text(text), top_k=5)
+
+        def sparse(n_symptoms=n_symptoms, n_diseases=n_diseases):
+            engine, _, text = catalog(n_symptoms, n_diseases)
+            return lambda: engine.predict(engine.encode_sparse(engine.extract_symptoms(text)), top_k=5)
+
+        def bitset(n_symptoms=n_symptoms, n_diseases=n_diseases):
+            engine, _, text = catalog(n_symptoms, n_diseases)
+            packed = PredictionEngine(engine.symptoms, engine.diseases,
+                                      BitsetMatrix.from_dense(engine.incidence, engine.diseases, engine.symptoms))
+            return lambda: packed.predict(packed.encode_text(text), top_k=5)
+
+        cases.append((f"predict_disease/{size}", dense, repeats(1000)))
+        cases.append((f"predict_disease_sparse/{size}", sparse, repeats(1000)))
+        cases.append((f"predict_disease_bitset/{size}", bitset, repeats(1000)))
+
+    # Batch prediction: batch size on the real dataset
+    for batch_size in (1, 100, 1000):
+        name = f"predict_batch/batch={batch_size}"
+
+        def setup(name=name, batch_size=batch_size):
+            rng = case_rng(name)
+            texts = [synthetic_text(COMMON_SYMPTOMS, 20, rng) for _ in range(batch_size)]
+            engine = real_engine()
+            return lambda: predict_batch(texts, engine)
+
+        cases.append((name, setup, repeats(max(10, 20000 // batch_size))))
+
+    # Triage priority
+    for n_symptoms in (3, 30):
+        name = f"get_emergency_priority/symptoms={n_symptoms}"
+
+        def setup(name=name, n_symptoms=n_symptoms):
+            symptoms = case_rng(name).sample(COMMON_SYMPTOMS, n_symptoms)
+            return lambda: get_emergency_priority(symptoms)
+
+        cases.append((name, setup, repeats(5000)))
+
+    # Triage rule table size: a compiled table scans in one pass regardless of rule count
+    for n_rules in (20, 1000, 10000):
+        name = f"triage_evaluate/rules={n_rules}"
+
+        def setup(name=name, n_rules=n_rules):
+            from utils.triage import PRIORITY_LEVELS, SEVERITY_LEVELS, TriageEngine
+
+            rng = case_rng(name)
+            keywords = synthetic_vocabulary(n_rules, rng)
+            rules = [{'keywords': [keyword], 'severity': rng.choice(SEVERITY_LEVELS),
+                      'priority': rng.choice(PRIORITY_LEVELS)} for keyword in keywords]
+            patients = cycle([[synthetic_text(keywords, 8, rng) for _ in range(5)] for _ in range(1000)])
+            triage = TriageEngine(rules, cache_size=0)
+            return lambda: triage.evaluate(next(patients))
+
+        cases.append((name, setup, repeats(2000)))
+
+    # Hospital map: fresh render vs the render cache, by result-set size
+    for n_hospitals in (10, 1000):
+        def hospitals(n_hospitals=n_hospitals):
+            rng = case_rng(f"hospitals={n_hospitals}")
+            return [
+                {'name': f"Hospital {i}", 'address': f"{i} Main St", 'phone': '555-0100',
+                 'lat': 40.0 + rng.random(), 'lng': -74.0 + rng.random()}
+                for i in range(n_hospitals)
+            ]
+
+        def fresh(hospitals=hospitals):
+            from utils.maps import build_hospital_map
+
+            points = hospitals()
+            return lambda: build_hospital_map(points).get_root().render()
+
+        def cached(hospitals=hospitals):
+            from utils.maps import MapRenderer
+
+            points, renderer = hospitals(), MapRenderer()
+            return lambda: renderer.render(points)
+
+        cases.append((f"render_map/hospitals={n_hospitals}", fresh, repeats(20)))
+        cases.append((f"render_map_cached/hospitals={n_hospitals}", cached, repeats(200)))
+
+    # Forest inference on a single request: sklearn vs the compiled artifact
+    from model.registry import DEFAULT_ARTIFACT_PATH, ModelRegistry
+    from model.artifact import is_artifact
+
+    def sklearn_forest():
+        model, features = ModelRegistry().get().model, forest_features()
+        return lambda: model.predict_proba(features)
+
+    cases.append(("forest_predict_proba/sklearn", sklearn_forest, repeats(200)))
+
+    # Cold model load from disk
+    cases.append(("load_model/pickle", lambda: lambda: ModelRegistry().get(), repeats(20)))
+
+    if is_artifact(DEFAULT_ARTIFACT_PATH):
+        def compiled_forest():
+            model, features = ModelRegistry(model_path=DEFAULT_ARTIFACT_PATH).get().model, forest_features()
+            return lambda: model.predict_proba(features)
+
+        cases.append(("forest_predict_proba/compiled", compiled_forest, repeats(1000)))
+        cases.append(("load_model/artifact",
+                      lambda: lambda: ModelRegistry(model_path=DEFAULT_ARTIFACT_PATH).get(), repeats(20)))
+
+    # Cascade: matrix engine first, forest only for ambiguous requests
+    for margin in CASCADE_MARGINS:
+        def setup(margin=margin):
+            rng = case_rng('cascade')
+            texts = cycle([synthetic_text(COMMON_SYMPTOMS, 8, rng) for _ in range(500)])
+            bundle = ModelRegistry(cascade_margin=margin).get()
+            return lambda: bundle.predict_text(next(texts), top_k=3, use_cache=False)
+
+        cases.append((f"predict_cascade/margin={margin}", setup, repeats(200)))
+
+    return cases
+
+
+def cascade_sweep(margins=CASCADE_MARGINS, n_texts=500, model_path=None, seed=42):
+    """
+    Tier shares and latency of the cascade at each margin, on synthetic requests
+    """
+    from model.registry import DEFAULT_MODEL_PATH, ModelRegistry
+
+    rng = random.Random(seed)
+    texts = [synthetic_text(COMMON_SYMPTOMS, 8, rng) for _ in range(n_texts)]
+    sweep = {}
+    for margin in margins:
+        bundle = ModelRegistry(model_path=model_path or DEFAULT_MODEL_PATH, cascade_margin=margin).get()
+        latencies = []
+        for text in texts:
+            start = time.perf_counter()
+            bundle.predict_text(text, top_k=3, use_cache=False)
+            latencies.append((time.perf_counter() - start) * 1000)
+        sweep[margin] = dict(latency_stats(latencies), tiers=bundle.cascade_stats())
+    return sweep
+
+
+def print_cascade_sweep(sweep):
+    print(f"{'margin':>8} {'engine':>8} {'model':>8} {'fallback':>8} {'p50 ms':>10} {'p99 ms':>10} {'ops/s':>10}")
+    for margin, stats in sweep.items():
+        tiers = stats['tiers']
+        print(f"{margin:>8} {tiers['engine']['share']:>8.0%} {tiers['model']['share']:>8.0%} "
+              f"{tiers['fallback']['share']:>8.0%} "
+              f"{stats['p50_ms']:>10.4f} {stats['p99_ms']:>10.4f} {stats['throughput_per_s']:>10.1f}")
+
+
+def run_benchmarks(quick=False, only=None):
+    """
+    Run all benchmark cases and return {name: stats}
+    """
+    results = {}
+    for name, setup, repeats in build_cases(quick=quick):
+        if only and only not in name:
+            continue
+        results[name] = measure(setup(), repeats)
+        stats = results[name]
+        print(f"{name:<55} p50 {stats['p50_ms']:9.4f} ms   p99 {stats['p99_ms']:9.4f} ms   "
+              f"{stats['throughput_per_s']:12.1f} ops/s")
+    return results
+
+
+def compare_to_baseline(results, baseline, threshold=0.25, metric='p50_ms'):
+    """
+    Return [(name, baseline, current, change)] for cases slower than the threshold
+    """
+    regressions = []
+    for name, stats in results.items():
+        reference = baseline.get('results', {}).get(name)
+        if not reference or not reference.get(metric):
+            continue
+        change = stats[metric] / reference[metric] - 1.0
+        if change > threshold:
+            regressions.append((name, reference[metric], stats[metric], change))
+    return regressions
+
+
+def profile_imports(statement='import app'):
+    """
+    Run statement in a fresh interpreter under -X importtime.
+
+    Returns one row per imported module, in the order the interpreter
+    reports them (children before their parent).
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"'{statement}' failed:\n{process.stderr[-2000:]}")
+
+    rows = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+        })
+    return rows
+
+
+def summarize_imports(rows, exclude=IMPORT_BUDGET_EXCLUDE):
+    """
+    Total import time, the part spent in excluded packages, and self time per top-level package
+    """
+    total = sum(row['cumulative_ms'] for row in rows if row['depth'] == 0)
+
+    # Walk parents before children so everything under an excluded package is skipped
+    excluded = 0.0
+    excluded_depths = []
+    for row in reversed(rows):
+        while excluded_depths and excluded_depths[-1] >= row['depth']:
+            excluded_depths.pop()
+        if not excluded_depths and row['module'].split('.')[0] in exclude:
+            excluded += row['cumulative_ms']
+            excluded_depths.append(row['depth'])
+
+    packages = defaultdict(float)
+    for row in rows:
+        packages[row['module'].split('.')[0]] += row['self_ms']
+
+    return {
+        'total_ms': total,
+        'excluded_ms': excluded,
+        'own_ms': total - excluded,
+        'modules': len(rows),
+        'packages': dict(sorted(packages.items(), key=lambda item: -item[1])),
+    }
+
+
+def import_report(statement='import app', budget_ms=IMPORT_BUDGET_MS, top=15):
+    """
+    Print where startup time goes; returns True when within the budget
+    """
+    summary = summarize_imports(profile_imports(statement))
+
+    print(f"📦 {statement}: {summary['total_ms']:.1f} ms, {summary['modules']} modules")
+    print(f"   {', '.join(IMPORT_BUDGET_EXCLUDE)}: {summary['excluded_ms']:.1f} ms")
+    print(f"   everything else: {summary['own_ms']:.1f} ms (budget {budget_ms:.0f} ms)\n")
+    for package, self_ms in list(summary['packages'].items())[:top]:
+        print(f"   {package:<40} {self_ms:9.1f} ms")
+
+    within_budget = summary['own_ms'] <= budget_ms
+    print(f"\n{'✅ Within' if within_budget else '❌ Over'} the import budget")
+    return within_budget
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the prediction hot path")
+    parser.add_argument('--quick', action='store_true', help="Fewer repeats for a fast smoke run")
+    parser.add_argument('--only', help="Run only cases whose name contains this string")
+    parser.add_argument('--save-baseline', metavar='FILE', help="Write results as a JSON baseline")
+    parser.add_argument('--baseline', metavar='FILE', help="Compare against a saved JSON baseline")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed p50 slowdown before failing (0.25 = 25%%)")
+    parser.add_argument('--import-profile', nargs='?', const='import app', metavar='STATEMENT',
+                        help="Profile import time of a statement (default: 'import app') instead")
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET_MS,
+                        help="Import time allowed outside Streamlit, in ms")
+    parser.add_argument('--cascade-sweep', action='store_true',
+                        help="Report cascade tier shares and latency per margin instead")
+    parser.add_argument('--model', help="Model used by --cascade-sweep (default: model/disease_model.pkl)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Run the benchmarks and check for regressions
+    """
+    args = parse_args(argv)
+
+    if args.import_profile:
+        return 0 if import_report(args.import_profile, args.import_budget) else 1
+
+    if args.cascade_sweep:
+        print_cascade_sweep(cascade_sweep(model_path=args.model))
+        return 0
+
+    print("⏱️  Smart Health Companion - Benchmarks")
+    print("=" * 50)
+    results = run_benchmarks(quick=args.quick, only=args.only)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({
+                'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results,
+            }, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for name, before, after, change in regressions:
+                print(f"   {name}: {before:.4f} ms -> {after:.4f} ms (+{change:.0%})")
+            return 1
+        print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
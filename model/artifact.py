@@ -0,0 +1,258 @@
+"""
+Pickle-free model artifact format for the disease Random Forest
+
+An artifact is a directory holding a JSON manifest and one .npy file per
+flattened tree array:
+
+    disease_model/
+        manifest.json      format version, classes, symptoms, array specs
+        feature.npy        split feature per node (int32)
+        threshold.npy      split threshold per node (float64)
+        left.npy           left child per node, as a global node index (int32)
+        right.npy          right child per node (int32)
+        value.npy          class probabilities per node (float32)
+        roots.npy          root node of every tree (int32)
+
+Arrays are loaded with np.load(mmap_mode='r'), so opening an artifact is
+near-instant, pages are shared by every process that maps the same
+files, and no pickle is ever executed. Leaves point to themselves, which
+lets predict_proba walk all trees for all samples in max_depth vectorized
+steps instead of going through sklearn's per-call overhead.
+"""
+
+import json
+import os
+import shutil
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+ARTIFACT_FORMAT = 'smart-health-forest'
+ARTIFACT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+_ARRAY_DTYPES = {
+    'feature': np.int32,
+    'threshold': np.float64,
+    'left': np.int32,
+    'right': np.int32,
+    'value': np.float32,
+    'roots': np.int32,
+}
+
+
+class ArtifactError(ValueError):
+    """Raised when an artifact directory is missing, corrupt or of an unknown version"""
+
+
+class CompiledForest:
+    """
+    A Random Forest flattened into contiguous node arrays.
+
+    Exposes classes_, n_features_in_ and predict_proba() like the sklearn
+    estimator it was compiled from.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], classes: Sequence[str], n_features: int,
+                 max_depth: int, symptoms: Optional[Sequence[str]] = None):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+
+        self.classes_ = np.array(classes)
+        self.n_features_in_ = n_features
+        self.max_depth = max_depth
+        self.symptoms = list(symptoms) if symptoms is not None else None
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    @classmethod
+    def from_sklearn(cls, model, symptoms: Optional[Sequence[str]] = None):
+        """
+        Flatten a fitted sklearn RandomForestClassifier
+        """
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+
+            # Leaves loop back to themselves so extra traversal steps are no-ops
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+
+            value = tree.value[:, 0, :]
+            totals = value.sum(axis=1, keepdims=True)
+            values.append(np.divide(value, totals, out=np.zeros_like(value), where=totals > 0))
+
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        arrays = {
+            'feature': np.concatenate(features),
+            'threshold': np.concatenate(thresholds),
+            'left': np.concatenate(lefts),
+            'right': np.concatenate(rights),
+            'value': np.concatenate(values),
+            'roots': np.array(roots),
+        }
+        arrays = {name: np.ascontiguousarray(array, dtype=_ARRAY_DTYPES[name]) for name, array in arrays.items()}
+
+        return cls(arrays, [str(label) for label in model.classes_], int(model.n_features_in_),
+                   int(max_depth), symptoms)
+
+    def apply(self, X) -> np.ndarray:
+        """
+        Leaf node reached in every tree: (n_samples x n_trees) global node indices
+        """
+        if hasattr(X, 'toarray'):
+            X = X.toarray()
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the model expects {self.n_features_in_}")
+
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        Average class probabilities over all trees, accumulated in float64
+        like sklearn so served confidences are not float32-rounded
+        """
+        return self.value[self.apply(X)].mean(axis=1, dtype=np.float64)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def save(self, dirpath: str):
+        """
+        Write the artifact directory, replacing any previous version
+        """
+        dirpath = os.path.normpath(dirpath)
+        tmp_path = f"{dirpath}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        arrays = {}
+        for name in _ARRAY_DTYPES:
+            array = getattr(self, name)
+            np.save(os.path.join(tmp_path, f"{name}.npy"), array, allow_pickle=False)
+            arrays[name] = {'dtype': array.dtype.str, 'shape': list(array.shape)}
+
+        manifest = {
+            'format': ARTIFACT_FORMAT,
+            'version': ARTIFACT_VERSION,
+            'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'classes': [str(label) for label in self.classes_],
+            'symptoms': self.symptoms,
+            'n_features': self.n_features_in_,
+            'n_estimators': self.n_estimators,
+            'max_depth': self.max_depth,
+            'arrays': arrays,
+        }
+        with open(os.path.join(tmp_path, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        # Processes that already mapped the old files keep reading them safely
+        old_path = f"{dirpath}.old-{os.getpid()}"
+        if os.path.exists(dirpath):
+            os.replace(dirpath, old_path)
+        os.replace(tmp_path, dirpath)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    @classmethod
+    def load(cls, dirpath: str, mmap: bool = True):
+        """
+        Open an artifact directory; arrays are memory-mapped by default
+        """
+        manifest = read_manifest(dirpath)
+
+        arrays = {}
+        for name, dtype in _ARRAY_DTYPES.items():
+            array = np.load(os.path.join(dirpath, f"{name}.npy"), mmap_mode='r' if mmap else None,
+                            allow_pickle=False)
+            spec = manifest['arrays'][name]
+            if array.dtype != np.dtype(dtype) or list(array.shape) != spec['shape']:
+                raise ArtifactError(f"Array '{name}' in {dirpath} does not match the manifest")
+            arrays[name] = array
+
+        n_nodes = len(arrays['feature'])
+        if any(len(arrays[name]) != n_nodes for name in ('threshold', 'left', 'right', 'value')):
+            raise ArtifactError(f"Node arrays in {dirpath} have different lengths")
+
+        return cls(arrays, manifest['classes'], manifest['n_features'], manifest['max_depth'],
+                   manifest.get('symptoms'))
+
+
+def read_manifest(dirpath: str) -> Dict:
+    """
+    Read and check an artifact manifest
+    """
+    path = os.path.join(dirpath, MANIFEST_NAME)
+    if not os.path.exists(path):
+        raise ArtifactError(f"No model artifact manifest at {path}")
+
+    with open(path) as f:
+        manifest = json.load(f)
+
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        raise ArtifactError(f"{dirpath} is not a {ARTIFACT_FORMAT} artifact")
+    if manifest.get('version') != ARTIFACT_VERSION:
+        raise ArtifactError(f"Unsupported artifact version {manifest.get('version')} in {dirpath}")
+
+    return manifest
+
+
+def is_artifact(path: str) -> bool:
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_NAME))
+
+
+def export_artifact(model, symptoms: Sequence[str], dirpath: str) -> CompiledForest:
+    """
+    Compile a fitted sklearn forest and save it as an artifact
+    """
+    forest = CompiledForest.from_sklearn(model, [str(symptom) for symptom in symptoms])
+    forest.save(dirpath)
+    return forest
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Convert a pickled model (model/disease_model.pkl) into an artifact directory
+    """
+    import argparse
+    import pickle
+
+    parser = argparse.ArgumentParser(description="Export the trained model as a pickle-free artifact")
+    parser.add_argument('model_path', nargs='?', default='model/disease_model.pkl')
+    parser.add_argument('-o', '--output', default='model/disease_model', help="Artifact directory")
+    args = parser.parse_args(argv)
+
+    # Only convert pickles you trust: this is the one place a pickle is loaded
+    with open(args.model_path, 'rb') as f:
+        model_data = pickle.load(f)
+
+    forest = export_artifact(model_data['model'], model_data['symptoms'], args.output)
+    print(f"Wrote {args.output}: {forest.n_estimators} trees, {len(forest.feature)} nodes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""
+Process-wide registry that serves the trained disease model
+
+The registry loads the model artifact (or disease_model.pkl and
+symptom_mapping.pkl) once per process, checks them against
+data/symptoms.csv and hands the same warm bundle to every caller (all
+Streamlit sessions, the batch CLI, ...).
+When the files on disk change, the next lookup loads the new version and
+swaps it in atomically; callers holding the old bundle keep using it.
+"""
+
+import os
+import pickle
+import threading
+import time
+import warnings
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from model.artifact import CompiledForest, MANIFEST_NAME, is_artifact
+from utils.cache import TTLCache
+from utils.features import SymptomEncoder
+from utils.instrumentation import Histogram, timed
+from utils.prediction import PredictionEngine, format_disease_name, top_k_indices
+
+DEFAULT_ARTIFACT_PATH = 'model/disease_model'
+DEFAULT_MODEL_PATH = 'model/disease_model.pkl'
+DEFAULT_MAPPING_PATH = 'model/symptom_mapping.pkl'
+DEFAULT_DATA_PATH = 'data/symptoms.csv'
+
+# Cascade cutoff: below this top-2 posterior margin the forest decides
+DEFAULT_CASCADE_MARGIN = 0.2
+# Margin served when CASCADE_MARGIN is unset. The forest is trained on one
+# row per disease, so by default the matrix engine answers every request
+SERVING_CASCADE_MARGIN = 0.0
+
+PREDICTION_CACHE_SIZE = 4096
+PREDICTION_CACHE_TTL = 3600.0
+
+
+class ModelValidationError(ValueError):
+    """Raised when model artifacts do not match the symptoms dataset"""
+
+
+class ModelBundle:
+    """
+    A loaded model version: the classifier, its symptom mapping and the
+    matrix engine built from the same dataset.
+
+    With cascade_margin set, requests are first ranked by the matrix
+    engine, and the forest only runs when the engine's top two diseases
+    are less than cascade_margin apart in posterior probability.
+    """
+
+    def __init__(self, model, symptoms: List[str], symptom_mapping: Dict[str, int],
+                 engine: PredictionEngine, version: Tuple, cascade_margin: Optional[float] = None):
+        self.model = model
+        self.symptoms = symptoms
+        self.symptom_mapping = symptom_mapping
+        # Model columns; validate_artifacts checks they match the engine's
+        self.encoder = SymptomEncoder(symptom_mapping)
+        self.engine = engine
+        self.version = version
+        self.cascade_margin = cascade_margin
+        # Latency of requests answered by each cascade tier; 'fallback'
+        # counts requests without a known symptom
+        self.tiers = {'engine': Histogram(), 'model': Histogram(), 'fallback': Histogram()}
+        self.loaded_at = time.time()
+        self.diseases = [format_disease_name(label) for label in model.classes_]
+
+    def predict_proba(self, features) -> np.ndarray:
+        """
+        Class probabilities for a feature vector or matrix, ordered like self.diseases
+        """
+        if getattr(features, 'ndim', 2) == 1:
+            features = features.reshape(1, -1)
+        return self.model.predict_proba(features)
+
+    def predict(self, features, top_k: Optional[int] = None):
+        """
+        Predict with the trained model from a dense vector or a sparse row.
+
+        Returns (disease, probability), or a ranked list of pairs when top_k is given.
+        """
+        proba = self.predict_proba(features)[0]
+        order = top_k_indices(proba, top_k or 1)
+        ranked = [(self.diseases[i], float(proba[i])) for i in order]
+
+        if top_k is None:
+            return ranked[0]
+        return ranked
+
+    def predict_indices(self, indices: np.ndarray, top_k: Optional[int] = None, use_cache: bool = True):
+        """
+        Predict from sorted, unique feature columns (see SymptomEncoder.indices).
+
+        Results are cached process-wide by the column set and the model
+        version, so 'fever, headache' and 'Headache and fever' share one
+        entry and a reloaded model never serves stale results.
+        """
+        if not use_cache:
+            return self._predict_row(indices, top_k)
+
+        cache = get_prediction_cache()
+        key = (self.version, self.cascade_margin, indices.tobytes(), top_k)
+        result = cache.get(key)
+        if result is None:
+            result = self._predict_row(indices, top_k)
+            # Store an immutable copy; callers get their own list
+            cache.set(key, tuple(result) if top_k is not None else result)
+        return list(result) if top_k is not None else result
+
+    def predict_symptoms(self, symptoms: List[str], top_k: Optional[int] = None, use_cache: bool = False):
+        """
+        Predict from symptom names; None or an empty differential when none is known
+        """
+        return self.predict_indices(self.encoder.indices(symptoms), top_k=top_k, use_cache=use_cache)
+
+    def _predict_row(self, indices: np.ndarray, top_k: Optional[int] = None):
+        features = self.encoder.row(indices)
+        if self.cascade_margin is not None:
+            return self.predict_cascade(features, top_k=top_k)
+        if not features.nnz:
+            return self.engine.predict(features, top_k=top_k)
+        return self.predict(features, top_k=top_k)
+
+    def predict_cascade(self, features, top_k: Optional[int] = None):
+        """
+        Rank with the matrix engine and fall back to the forest when its
+        top two diseases are closer than cascade_margin. Rows without a
+        known symptom get no diagnosis and are counted as the 'fallback' tier.
+        """
+        start = time.perf_counter()
+        if not features.nnz:
+            tier = 'fallback'
+            result = self.engine.predict(features, top_k=top_k)
+            self.tiers[tier].observe((time.perf_counter() - start) * 1000)
+            return result
+
+        proba = self.engine.posterior(features)
+        order = top_k_indices(proba, max(2, top_k or 1))
+        margin = proba[order[0]] - proba[order[1]] if len(order) > 1 else 1.0
+
+        if margin >= (self.cascade_margin or 0.0):
+            tier = 'engine'
+            ranked = [(self.engine.diseases[i], float(proba[i])) for i in order[:top_k or 1]]
+            result = ranked if top_k is not None else ranked[0]
+        else:
+            tier = 'model'
+            result = self.predict(features, top_k=top_k)
+
+        self.tiers[tier].observe((time.perf_counter() - start) * 1000)
+        return result
+
+    def cascade_stats(self) -> Dict[str, Dict]:
+        """
+        Requests answered by each tier, their share and latency
+        """
+        snapshots = {tier: histogram.snapshot() for tier, histogram in self.tiers.items()}
+        total = sum(snapshot['count'] for snapshot in snapshots.values())
+        return {
+            tier: {
+                'count': snapshot['count'],
+                'share': snapshot['count'] / total if total else 0.0,
+                'mean_ms': snapshot['mean_ms'],
+                'p50_ms': snapshot['p50_ms'],
+                'p99_ms': snapshot['p99_ms'],
+            }
+            for tier, snapshot in snapshots.items()
+        }
+
+    @timed('predict')
+    def predict_text(self, text: str, top_k: Optional[int] = None, use_cache: bool = True,
+                     return_symptoms: bool = False):
+        """
+        Predict from free text, through the prediction cache by default.
+        With return_symptoms, returns (prediction, symptoms that were scored).
+        """
+        symptoms = self.engine.extract_symptoms(text)
+        result = self.predict_symptoms(symptoms, top_k=top_k, use_cache=use_cache)
+        return (result, symptoms) if return_symptoms else result
+
+
+def _file_version(*paths) -> Tuple:
+    """
+    Cheap change detector: (mtime_ns, size) of every artifact
+    """
+    version = []
+    for path in paths:
+        if os.path.isdir(path):
+            # Artifact directories are replaced as a whole, the manifest last
+            path = os.path.join(path, MANIFEST_NAME)
+        stat = os.stat(path)
+        version.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(version)
+
+
+def load_model_file(filepath: str):
+    """
+    Load the {'model', 'symptoms'} dict written by train_model.save_model.
+
+    Artifact directories (see model/artifact.py) load without unpickling
+    anything and are memory-mapped. Files saved with joblib ('.joblib')
+    are opened with mmap_mode='r' so their NumPy arrays are backed by the
+    OS page cache and shared between worker processes instead of being
+    copied into each one.
+    """
+    if is_artifact(filepath):
+        forest = CompiledForest.load(filepath)
+        return {'model': forest, 'symptoms': forest.symptoms}
+
+    if filepath.endswith('.joblib'):
+        import joblib
+        return joblib.load(filepath, mmap_mode='r')
+
+    with open(filepath, 'rb') as f:
+        return pickle.load(f)
+
+
+def validate_artifacts(model, symptoms, symptom_mapping: Dict[str, int], engine: PredictionEngine):
+    """
+    Check that the model and symptom mapping match the symptoms dataset
+    """
+    symptoms = list(symptoms)
+    if symptoms != engine.symptoms:
+        raise ModelValidationError("Model symptom order does not match the symptoms dataset")
+
+    if symptom_mapping != engine.symptom_index:
+        raise ModelValidationError("Symptom mapping does not match the symptoms dataset")
+
+    n_features = getattr(model, 'n_features_in_', len(symptoms))
+    if n_features != engine.n_symptoms:
+        raise ModelValidationError(
+            f"Model expects {n_features} features but the dataset has {engine.n_symptoms} symptoms"
+        )
+
+    diseases = {format_disease_name(label) for label in model.classes_}
+    if diseases != set(engine.diseases):
+        raise ModelValidationError("Model classes do not match the diseases in the dataset")
+
+
+class ModelRegistry:
+    """
+    Thread-safe holder of the current ModelBundle with hot-swapping
+    """
+
+    def __init__(self, model_path: str = DEFAULT_MODEL_PATH, mapping_path: str = DEFAULT_MAPPING_PATH,
+                 data_path: str = DEFAULT_DATA_PATH, check_interval: float = 5.0,
+                 cascade_margin: Optional[float] = None):
+        self.model_path = model_path
+        self.mapping_path = mapping_path
+        self.data_path = data_path
+        self.check_interval = check_interval
+        self.cascade_margin = cascade_margin
+
+        self._bundle: Optional[ModelBundle] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def _version(self) -> Tuple:
+        if is_artifact(self.model_path):
+            return _file_version(self.model_path, self.data_path)
+        return _file_version(self.model_path, self.mapping_path, self.data_path)
+
+    def _load(self, version: Tuple) -> ModelBundle:
+        model_data = load_model_file(self.model_path)
+        engine = PredictionEngine.from_dataset(self.data_path)
+
+        model = model_data['model']
+        symptoms = list(model_data['symptoms'])
+
+        if is_artifact(self.model_path):
+            # Artifacts carry their symptom order in the manifest
+            symptom_mapping = SymptomEncoder.from_symptoms(symptoms).mapping
+        else:
+            symptom_mapping = SymptomEncoder.load(self.mapping_path).mapping
+        validate_artifacts(model, symptoms, symptom_mapping, engine)
+
+        return ModelBundle(model, symptoms, symptom_mapping, engine, version, self.cascade_margin)
+
+    def get(self) -> ModelBundle:
+        """
+        Return the current bundle, loading or hot-swapping it when needed.
+
+        The file check runs at most once every check_interval seconds, so
+        the common path is a single attribute read.
+        """
+        bundle = self._bundle
+        if bundle is not None and time.monotonic() < self._next_check:
+            return bundle
+
+        with self._lock:
+            if self._bundle is not None and time.monotonic() < self._next_check:
+                return self._bundle
+
+            version = self._version()
+            if self._bundle is None:
+                self._bundle = self._load(version)
+            elif self._bundle.version != version:
+                # Swap only after the new version loaded and validated, so a
+                # half-written artifact never replaces a working model
+                try:
+                    self._bundle = self._load(version)
+                except Exception as e:
+                    warnings.warn(f"Keeping current model, failed to load new version: {e}")
+
+            self._next_check = time.monotonic() + self.check_interval
+            return self._bundle
+
+    def reload(self) -> ModelBundle:
+        """
+        Force loading the artifacts from disk
+        """
+        with self._lock:
+            self._bundle = self._load(self._version())
+            self._next_check = time.monotonic() + self.check_interval
+            return self._bundle
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+_prediction_cache: Optional[TTLCache] = None
+_prediction_cache_lock = threading.Lock()
+
+
+def get_prediction_cache() -> TTLCache:
+    """
+    The process-wide prediction cache shared by every session
+    """
+    global _prediction_cache
+    if _prediction_cache is None:
+        with _prediction_cache_lock:
+            if _prediction_cache is None:
+                _prediction_cache = TTLCache(maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+    return _prediction_cache
+
+
+def get_registry() -> ModelRegistry:
+    """
+    The process-wide default registry
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                default_model = DEFAULT_ARTIFACT_PATH if is_artifact(DEFAULT_ARTIFACT_PATH) else DEFAULT_MODEL_PATH
+                cascade_margin = os.getenv('CASCADE_MARGIN')
+                _registry = ModelRegistry(
+                    model_path=os.getenv('MODEL_PATH', default_model),
+                    mapping_path=os.getenv('SYMPTOM_MAPPING_PATH', DEFAULT_MAPPING_PATH),
+                    cascade_margin=float(cascade_margin) if cascade_margin else SERVING_CASCADE_MARGIN,
+                )
+    return _registry
@@ -4,51 +4,223 @@ Train disease prediction model using symptoms data
 
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report
+import argparse
+import hashlib
+import json
 import pickle
 import os
+import sys
 
-def load_and_prepare_data():
+# Allow running as a script (python model/train_model.py) from the repo root
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from model.artifact import export_artifact
+from model.tuning import (CV_CACHE_DIR, REPORT_PATH, cross_validate, parameter_candidates,
+                          simulate_patients, write_report)
+from utils.features import SymptomEncoder
+
+DATA_PATH = 'data/symptoms.csv'
+MODEL_PATH = 'model/disease_model.pkl'
+MAPPING_PATH = 'model/symptom_mapping.pkl'
+MANIFEST_PATH = 'model/train_manifest.json'
+
+# Rows read per chunk when loading training data
+CHUNK_SIZE = 100000
+# Diagnosis column of patient-level datasets
+LABEL_COLUMN = 'disease'
+
+DEFAULT_PARAMS = {
+    'n_estimators': 100,
+    'random_state': 42,
+    'max_depth': 10
+}
+
+def file_hash(filepath):
+    """
+    SHA-256 of a file, read in blocks
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def fingerprint(data_hash, params):
     """
-    Load symptoms data and prepare for training
+    Fingerprint of the training inputs: data content plus hyperparameters
     """
-    # Load the symptoms dataset
-    data = pd.read_csv('data/symptoms.csv')
+    payload = json.dumps({'data': data_hash, 'params': params}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def load_manifest(filepath=MANIFEST_PATH):
+    """
+    Load the manifest describing the last training run, if any
+    """
+    if not os.path.exists(filepath):
+        return {}
+    with open(filepath) as f:
+        return json.load(f)
+
+def save_manifest(manifest, filepath=MANIFEST_PATH):
+    """
+    Save the manifest describing this training run
+    """
+    with open(filepath, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+def outputs_current(manifest, key, outputs):
+    """
+    True when the manifest entry matches the key and all outputs exist
+    """
+    return manifest.get(key) is not None and all(os.path.exists(path) for path in outputs)
+
+def is_parquet(filepath):
+    return filepath.endswith(('.parquet', '.pq'))
+
+def _parquet_file(filepath):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet training data requires pyarrow: pip install pyarrow")
+    return pq.ParquetFile(filepath)
+
+def read_columns(filepath):
+    """
+    Column names of a CSV or Parquet dataset, without reading its rows
+    """
+    if is_parquet(filepath):
+        return list(_parquet_file(filepath).schema_arrow.names)
+    return list(pd.read_csv(filepath, nrows=0).columns)
+
+def iter_chunks(filepath, dtypes, chunksize=CHUNK_SIZE):
+    """
+    Yield DataFrames of at most chunksize rows with the given column dtypes
+    """
+    if is_parquet(filepath):
+        for batch in _parquet_file(filepath).iter_batches(batch_size=chunksize, columns=list(dtypes)):
+            yield batch.to_pandas().astype(dtypes, copy=False)
+    else:
+        yield from pd.read_csv(filepath, chunksize=chunksize, dtype=dtypes, usecols=list(dtypes))
+
+def detect_layout(columns, label_column=LABEL_COLUMN):
+    """
+    'incidence' for symptom x disease tables like data/symptoms.csv,
+    'patients' for one row per patient with a diagnosis column
+    """
+    if columns and columns[0] == 'symptom':
+        return 'incidence'
+    if label_column in columns:
+        return 'patients'
+    raise ValueError(f"Expected a 'symptom' first column or a '{label_column}' label column, got {columns[:5]}")
+
+def _coo_to_csr(rows, cols, shape):
+    rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int32)
+    cols = np.concatenate(cols) if cols else np.empty(0, dtype=np.int32)
+    data = np.ones(len(rows), dtype=np.uint8)
+    return sp.csr_matrix((data, (rows, cols)), shape=shape, dtype=np.uint8)
+
+def _load_incidence(filepath, columns, chunksize):
+    diseases = np.array(columns[1:], dtype=object)
+    dtypes = dict.fromkeys(columns[1:], np.uint8)
+    dtypes['symptom'] = str
+    
+    symptoms, rows, cols = [], [], []
+    for chunk in iter_chunks(filepath, dtypes, chunksize):
+        offset = len(symptoms)
+        symptoms.extend(chunk['symptom'])
+        symptom_index, disease_index = np.nonzero(chunk[columns[1:]].to_numpy())
+        # Transpose by swapping coordinates: each disease is one training sample
+        rows.append(disease_index.astype(np.int32))
+        cols.append((symptom_index + offset).astype(np.int32))
+    
+    X = _coo_to_csr(rows, cols, (len(diseases), len(symptoms)))
+    return X, diseases, np.array(symptoms, dtype=object)
+
+def _load_patients(filepath, columns, chunksize, label_column):
+    symptom_columns = [column for column in columns if column != label_column]
+    dtypes = dict.fromkeys(symptom_columns, np.uint8)
+    dtypes[label_column] = str
     
-    # Separate features (symptoms) and targets (diseases)
-    symptoms = data['symptom'].values
-    diseases = data.columns[1:].values  # All columns except 'symptom'
+    blocks, labels = [], []
+    for chunk in iter_chunks(filepath, dtypes, chunksize):
+        labels.append(chunk[label_column].to_numpy(dtype=object))
+        blocks.append(sp.csr_matrix(chunk[symptom_columns].to_numpy(), dtype=np.uint8))
     
-    # Create feature matrix (symptoms as features)
-    X = data.iloc[:, 1:].T  # Transpose to get diseases as rows, symptoms as columns
-    y = diseases  # Disease names as labels
+    if blocks:
+        X = sp.vstack(blocks, format='csr', dtype=np.uint8)
+        y = np.concatenate(labels)
+    else:
+        X = sp.csr_matrix((0, len(symptom_columns)), dtype=np.uint8)
+        y = np.empty(0, dtype=object)
+    return X, y, np.array(symptom_columns, dtype=object)
+
+def load_and_prepare_data(filepath=DATA_PATH, chunksize=CHUNK_SIZE, label_column=LABEL_COLUMN):
+    """
+    Load a CSV or Parquet symptoms dataset for training.
     
-    return X, y, symptoms
+    Returns X as a sparse (samples x symptoms) uint8 CSR matrix, the label
+    of each sample and the symptom names. The file is read chunksize rows
+    at a time and only non-zero flags are kept, so memory follows the
+    number of positive symptoms rather than rows x columns, and no dense
+    transposed copy of the table is ever built.
+    
+    Two layouts are accepted: data/symptoms.csv's symptom-per-row table
+    (each disease column becomes one sample) and patient-level data with
+    one row per patient, a label_column diagnosis and 0/1 symptom columns.
+    """
+    columns = read_columns(filepath)
+    if detect_layout(columns, label_column) == 'incidence':
+        return _load_incidence(filepath, columns, chunksize)
+    return _load_patients(filepath, columns, chunksize, label_column)
 
-def train_model(X, y):
+def train_model(X, y, params=None, n_jobs=-1):
     """
     Train Random Forest model for disease prediction
     """
     # Split data for training (in this case, we have limited data, so we'll use all for training)
     # In a real scenario, you'd have more data and proper train/test split
     
-    # Create and train the model
-    model = RandomForestClassifier(
-        n_estimators=100,
-        random_state=42,
-        max_depth=10
-    )
+    # Create and train the model, building trees on all cores
+    model = RandomForestClassifier(n_jobs=n_jobs, **(params or DEFAULT_PARAMS))
     
     # Train the model
     model.fit(X, y)
     
     return model
 
+def add_trees(model, X, y, n_trees, n_jobs=-1):
+    """
+    Grow an existing forest by n_trees without refitting the trees it already has
+    """
+    if set(model.classes_) != set(y):
+        # Existing trees cannot predict diseases they were never trained on
+        raise ValueError("Diseases changed since the model was trained; retrain from scratch")
+    
+    model.set_params(warm_start=True, n_estimators=model.n_estimators + n_trees, n_jobs=n_jobs)
+    model.fit(X, y)
+    model.set_params(warm_start=False)
+    
+    return model
+
+def load_model(filepath=MODEL_PATH):
+    """
+    Load a model saved by save_model
+    """
+    if filepath.endswith('.joblib'):
+        import joblib
+        return joblib.load(filepath)
+    with open(filepath, 'rb') as f:
+        return pickle.load(f)
+
 def evaluate_model(model, X, y):
     """
-    Evaluate the trained model
+    Evaluate the trained model on its training data (see --cv for held-out accuracy)
     """
     # Make predictions
     y_pred = model.predict(X)
@@ -62,9 +234,9 @@ def evaluate_model(model, X, y):
     
     return accuracy
 
-def save_model(model, symptoms, filepath='model/disease_model.pkl'):
+def save_model(model, symptoms, filepath=MODEL_PATH, artifact_path=None):
     """
-    Save the trained model and symptoms list
+    Save the trained model and symptoms list, plus a pickle-free artifact
     """
     # Create model directory if it doesn't exist
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
@@ -75,54 +247,168 @@ def save_model(model, symptoms, filepath='model/disease_model.pkl'):
         'symptoms': symptoms
     }
     
-    with open(filepath, 'wb') as f:
-        pickle.dump(model_data, f)
+    if filepath.endswith('.joblib'):
+        # joblib files can be memory-mapped by the model registry
+        import joblib
+        joblib.dump(model_data, filepath)
+    else:
+        with open(filepath, 'wb') as f:
+            pickle.dump(model_data, f)
     
     print(f"Model saved to {filepath}")
+    
+    # Flattened, memory-mappable copy served by the model registry
+    artifact_path = artifact_path or os.path.splitext(filepath)[0]
+    export_artifact(model, symptoms, artifact_path)
+    print(f"Model artifact saved to {artifact_path}/")
 
-def create_symptom_mapping():
+def create_symptom_mapping(symptoms=None):
     """
     Create a mapping of symptoms to their indices for easy lookup
     """
-    data = pd.read_csv('data/symptoms.csv')
-    symptoms = data['symptom'].values
+    if symptoms is None:
+        data = pd.read_csv(DATA_PATH)
+        symptoms = data['symptom'].values
+    
+    # Same column order as the training matrix; inference rebuilds its encoder from this
+    return SymptomEncoder.from_symptoms(symptoms).mapping
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the disease prediction model")
+    parser.add_argument('--data', default=DATA_PATH, help="Symptoms dataset")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE, help="Rows read per chunk")
+    parser.add_argument('--label-column', default=LABEL_COLUMN,
+                        help="Diagnosis column of patient-level data (one row per patient)")
+    parser.add_argument('--model-path', default=MODEL_PATH, help="Where to save the model")
+    parser.add_argument('--n-estimators', type=int,
+                        help=f"Trees in the forest (default: the size of the last run, "
+                             f"{DEFAULT_PARAMS['n_estimators']} for the first)")
+    parser.add_argument('--max-depth', type=int, default=DEFAULT_PARAMS['max_depth'])
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Cores used to build trees (-1 = all)")
+    parser.add_argument('--add-trees', type=int, default=0,
+                        help="Grow the saved forest by this many trees instead of retraining; "
+                             "later runs keep the grown size unless --n-estimators is given")
+    parser.add_argument('--force', action='store_true', help="Retrain even if outputs are current")
+    
+    evaluation = parser.add_argument_group("held-out evaluation (trains nothing, writes a report)")
+    evaluation.add_argument('--cv', type=int, metavar='K', help="Cross-validate with K stratified folds")
+    evaluation.add_argument('--search', choices=['grid', 'random'], default='grid',
+                            help="Try every hyperparameter combination or a random sample")
+    evaluation.add_argument('--n-iter', type=int, default=10, help="Configurations tried by --search random")
+    evaluation.add_argument('--workers', type=int, help="Worker processes (default: all cores)")
+    evaluation.add_argument('--report', default=REPORT_PATH, help="Where to write the JSON report")
+    evaluation.add_argument('--cache-dir', default=CV_CACHE_DIR, help="Fold result cache ('' to disable)")
+    evaluation.add_argument('--simulate-patients', type=int, default=0, metavar='N',
+                            help="Cross-validate on N simulated patients per disease")
+    return parser.parse_args(argv)
+
+def run_evaluation(args):
+    """
+    Cross-validate a hyperparameter search and write the report
+    """
+    X, y, symptoms = load_and_prepare_data(args.data, chunksize=args.chunksize, label_column=args.label_column)
+    if args.simulate_patients:
+        X, y = simulate_patients(X, y, n_per_class=args.simulate_patients)
     
-    symptom_mapping = {symptom: i for i, symptom in enumerate(symptoms)}
+    candidates = parameter_candidates(search=args.search, n_iter=args.n_iter)
+    print(f"Cross-validating {len(candidates)} configurations x {args.cv} folds "
+          f"on {X.shape[0]} samples...")
+    try:
+        report = cross_validate(X, y, candidates, k=args.cv, workers=args.workers,
+                                cache_dir=args.cache_dir or None)
+    except ValueError as e:
+        print(f"{e}")
+        print("Use patient-level data, or --simulate-patients to sample patients from the symptom table.")
+        return None
+    write_report(report, args.report)
     
-    return symptom_mapping
+    print(f"{report['computed']} fold fits computed, {report['cached']} from cache, "
+          f"{report['elapsed_s']:.1f}s")
+    for row in report['results'][:5]:
+        print(f"  accuracy {row['accuracy_mean']:.3f} ± {row['accuracy_std']:.3f}  "
+              f"fit {row['fit_s_mean']:.2f}s  predict {row['predict_ms_per_sample']:.3f} ms/sample  "
+              f"{row['params']}")
+    print(f"Report written to {args.report}")
+    return report
 
-def main():
+def main(argv=None):
     """
     Main function to train and save the model
     """
+    args = parse_args(argv)
+    if args.cv:
+        run_evaluation(args)
+        return
+    
+    previous = load_manifest()
+    n_estimators = args.n_estimators
+    if n_estimators is None:
+        # Keep trees added by --add-trees instead of retraining a default-sized forest
+        n_estimators = previous.get('params', {}).get('n_estimators', DEFAULT_PARAMS['n_estimators'])
+    params = dict(DEFAULT_PARAMS, n_estimators=n_estimators, max_depth=args.max_depth)
+    
+    manifest = {} if args.force else previous
+    data_hash = file_hash(args.data)
+    model_key = fingerprint(data_hash, params)
+    artifact_path = os.path.splitext(args.model_path)[0]
+    
+    if not args.add_trees and manifest.get('model_key') == model_key and \
+            outputs_current(manifest, 'mapping_key', [args.model_path, artifact_path, MAPPING_PATH]):
+        print("Model is up to date with the data and parameters, nothing to do.")
+        print("Use --force to retrain anyway.")
+        return
+    
     print("Loading and preparing data...")
-    X, y, symptoms = load_and_prepare_data()
+    X, y, symptoms = load_and_prepare_data(args.data, chunksize=args.chunksize, label_column=args.label_column)
     
-    print(f"Training data shape: {X.shape}")
-    print(f"Number of diseases: {len(y)}")
+    print(f"Training data shape: {X.shape} ({X.nnz} symptom flags)")
+    print(f"Number of samples: {len(y)}")
+    print(f"Number of diseases: {len(np.unique(y))}")
     print(f"Number of symptoms: {len(symptoms)}")
     
-    print("\nTraining Random Forest model...")
-    model = train_model(X, y)
+    if args.add_trees and os.path.exists(args.model_path):
+        print(f"\nAdding {args.add_trees} trees to the saved model...")
+        model = load_model(args.model_path)['model']
+        try:
+            model = add_trees(model, X, y, args.add_trees, n_jobs=args.n_jobs)
+        except ValueError as e:
+            print(f"{e}")
+            print("\nTraining Random Forest model...")
+            model = train_model(X, y, params, n_jobs=args.n_jobs)
+        params = dict(params, n_estimators=model.n_estimators)
+        model_key = fingerprint(data_hash, params)
+    else:
+        print("\nTraining Random Forest model...")
+        model = train_model(X, y, params, n_jobs=args.n_jobs)
     
     print("\nEvaluating model...")
     accuracy = evaluate_model(model, X, y)
     
     print("\nSaving model...")
-    save_model(model, symptoms)
+    save_model(model, symptoms, args.model_path, artifact_path)
     
-    # Create symptom mapping
-    symptom_mapping = create_symptom_mapping()
+    # Symptom mapping only depends on the symptom list
+    mapping_key = hashlib.sha256('\n'.join(symptoms).encode('utf-8')).hexdigest()
+    if outputs_current(manifest, 'mapping_key', [MAPPING_PATH]) and manifest['mapping_key'] == mapping_key:
+        print("Symptom mapping is up to date")
+    else:
+        # Save symptom mapping
+        SymptomEncoder(create_symptom_mapping(symptoms)).save(MAPPING_PATH)
     
-    # Save symptom mapping
-    with open('model/symptom_mapping.pkl', 'wb') as f:
-        pickle.dump(symptom_mapping, f)
+    save_manifest({
+        'model_key': model_key,
+        'mapping_key': mapping_key,
+        'data_hash': data_hash,
+        'params': params,
+        'accuracy': accuracy
+    })
     
     print("Model training completed successfully!")
     print(f"Model accuracy: {accuracy:.2f}")
     print("Files created:")
-    print("- model/disease_model.pkl")
-    print("- model/symptom_mapping.pkl")
+    print(f"- {args.model_path}")
+    print(f"- {artifact_path}/")
+    print(f"- {MAPPING_PATH}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,244 @@
+"""
+Cross-validation and hyperparameter search for the disease model
+
+Every (hyperparameters, fold) pair is an independent job run on a process
+pool; the training matrix is shipped to each worker once, by the pool
+initializer, rather than with every job. Finished jobs are cached on disk
+under a key made of the data hash, the fold layout and the parameters,
+so re-running a search after adding a few configurations (or changing
+nothing) only fits what is new. The report records accuracy, fit time
+and inference time for each configuration.
+
+    python model/train_model.py --cv 5 --search grid --workers 4
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold
+
+CV_CACHE_DIR = '.cache/cv'
+REPORT_PATH = 'model/cv_report.json'
+
+PARAM_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [None, 10, 20],
+    'min_samples_leaf': [1, 2, 4],
+    'max_features': ['sqrt', 0.5],
+}
+
+# Training data of the current worker process, set by _init_worker
+_worker_data = None
+
+
+def data_hash(X, y) -> str:
+    """
+    SHA-256 of a training matrix and its labels
+    """
+    X = sp.csr_matrix(X)
+    digest = hashlib.sha256()
+    digest.update(repr(X.shape).encode('utf-8'))
+    for array in (X.indptr.astype(np.int64), X.indices.astype(np.int64), X.data.astype(np.float64)):
+        digest.update(array.tobytes())
+    digest.update('\n'.join(map(str, y)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def simulate_patients(X, y, n_per_class: int = 50, sensitivity: float = 0.7,
+                      false_positive_rate: float = 0.01, seed: int = 42):
+    """
+    Sample patient rows from a disease x symptom table.
+
+    Each simulated patient reports every symptom of their disease with
+    probability `sensitivity` and any other symptom with probability
+    `false_positive_rate`, and has at least one symptom. Useful for
+    cross-validating on data/symptoms.csv, which has one row per disease.
+    """
+    rng = np.random.default_rng(seed)
+    X = sp.csr_matrix(X).toarray().astype(bool)
+    blocks, labels = [], []
+    for profile, label in zip(X, y):
+        rates = np.where(profile, sensitivity, false_positive_rate)
+        patients = rng.random((n_per_class, len(profile))) < rates
+        empty = ~patients.any(axis=1)
+        if empty.any() and profile.any():
+            # Give symptom-free draws one of the disease's own symptoms
+            patients[empty, rng.choice(np.flatnonzero(profile), empty.sum())] = True
+        blocks.append(sp.csr_matrix(patients, dtype=np.uint8))
+        labels.extend([label] * n_per_class)
+    return sp.vstack(blocks, format='csr'), np.array(labels, dtype=object)
+
+
+def parameter_candidates(grid: Dict[str, List] = PARAM_GRID, search: str = 'grid',
+                         n_iter: int = 10, seed: int = 42) -> List[Dict]:
+    """
+    Every combination of the grid, or n_iter random draws from it
+    """
+    if search == 'grid':
+        return list(ParameterGrid(grid))
+    if search == 'random':
+        return list(ParameterSampler(grid, n_iter=n_iter, random_state=seed))
+    raise ValueError(f"Unknown search {search!r}, expected 'grid' or 'random'")
+
+
+def make_folds(y, k: int = 5, seed: int = 42) -> List[tuple]:
+    """
+    Stratified (train, test) index pairs
+    """
+    _, counts = np.unique(y, return_counts=True)
+    if counts.min() < k:
+        raise ValueError(
+            f"{k}-fold cross-validation needs at least {k} samples of every disease, "
+            f"the smallest class has {counts.min()}"
+        )
+    folds = StratifiedKFold(n_splits=k, shuffle=True, random_state=seed)
+    return list(folds.split(np.zeros(len(y)), y))
+
+
+def _job_key(data_key: str, k: int, seed: int, fold: int, params: Dict) -> str:
+    payload = json.dumps({'data': data_key, 'k': k, 'seed': seed, 'fold': fold, 'params': params},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _init_worker(X, y):
+    global _worker_data
+    _worker_data = (X, y)
+
+
+def fit_fold(train_index, test_index, params: Dict, data=None) -> Dict:
+    """
+    Fit on one fold's training rows and score its held-out rows
+    """
+    X, y = data if data is not None else _worker_data
+    model = RandomForestClassifier(n_jobs=1, random_state=42, **params)
+
+    start = time.perf_counter()
+    model.fit(X[train_index], y[train_index])
+    fit_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predicted = model.predict(X[test_index])
+    predict_s = time.perf_counter() - start
+
+    return {
+        'accuracy': float(np.mean(predicted == y[test_index])),
+        'fit_s': fit_s,
+        'predict_ms_per_sample': predict_s * 1000 / max(1, len(test_index)),
+    }
+
+
+class FoldCache:
+    """
+    One JSON file per finished (data, fold, parameters) job
+    """
+
+    def __init__(self, directory: Optional[str] = CV_CACHE_DIR):
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        if not self.directory or not os.path.exists(self._path(key)):
+            return None
+        with open(self._path(key)) as f:
+            return json.load(f)
+
+    def set(self, key: str, result: Dict):
+        if not self.directory:
+            return
+        tmp_path = f"{self._path(key)}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            json.dump(result, f)
+        os.replace(tmp_path, self._path(key))
+
+
+def _summarize(params: Dict, folds: List[Dict]) -> Dict:
+    accuracy = np.array([fold['accuracy'] for fold in folds])
+    return {
+        'params': params,
+        'accuracy_mean': float(accuracy.mean()),
+        'accuracy_std': float(accuracy.std()),
+        'fit_s_mean': float(np.mean([fold['fit_s'] for fold in folds])),
+        'predict_ms_per_sample': float(np.mean([fold['predict_ms_per_sample'] for fold in folds])),
+        'folds': folds,
+    }
+
+
+def cross_validate(X, y, candidates: Iterable[Dict], k: int = 5, seed: int = 42,
+                   workers: Optional[int] = None, cache_dir: Optional[str] = CV_CACHE_DIR) -> Dict:
+    """
+    k-fold cross-validate every candidate on a process pool.
+
+    Returns a report with per-configuration accuracy (mean and std over
+    folds), mean fit time and inference time per sample, ranked by
+    accuracy, plus how many fold fits were computed or taken from cache.
+    """
+    started = time.perf_counter()
+    X = sp.csr_matrix(X)
+    y = np.asarray(y, dtype=object)
+    candidates = [dict(params) for params in candidates]
+    data_key = data_hash(X, y)
+    folds = make_folds(y, k, seed)
+    cache = FoldCache(cache_dir)
+
+    results = {}
+    pending = []
+    for i, params in enumerate(candidates):
+        for fold, (train_index, test_index) in enumerate(folds):
+            key = _job_key(data_key, k, seed, fold, params)
+            cached = cache.get(key)
+            if cached is not None:
+                results[(i, fold)] = cached
+            else:
+                pending.append((i, fold, key))
+
+    if pending:
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            for i, fold, key in pending:
+                results[(i, fold)] = fit_fold(*folds[fold], candidates[i], data=(X, y))
+                cache.set(key, results[(i, fold)])
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y)) as pool:
+                futures = {pool.submit(fit_fold, *folds[fold], candidates[i]): (i, fold, key)
+                           for i, fold, key in pending}
+                for future in as_completed(futures):
+                    i, fold, key = futures[future]
+                    results[(i, fold)] = future.result()
+                    cache.set(key, results[(i, fold)])
+
+    ranked = sorted(
+        (_summarize(params, [results[(i, fold)] for fold in range(k)]) for i, params in enumerate(candidates)),
+        key=lambda row: (-row['accuracy_mean'], row['fit_s_mean']),
+    )
+    return {
+        'data_hash': data_key,
+        'n_samples': int(X.shape[0]),
+        'n_features': int(X.shape[1]),
+        'k': k,
+        'seed': seed,
+        'computed': len(pending),
+        'cached': len(candidates) * k - len(pending),
+        'elapsed_s': time.perf_counter() - started,
+        'best': ranked[0] if ranked else None,
+        'results': ranked,
+    }
+
+
+def write_report(report: Dict, filepath: str = REPORT_PATH):
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(filepath, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
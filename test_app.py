@@ -96,6 +96,131 @@ def test_model_training():
         print(f"❌ Model training failed: {e}")
         return False
 
+def test_training_loader():
+    """Test chunked sparse loading of training data"""
+    print("\n📚 Testing training data loader...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from model.train_model import load_and_prepare_data, train_model
+        
+        data = pd.read_csv('data/symptoms.csv')
+        X, y, symptoms = load_and_prepare_data('data/symptoms.csv', chunksize=7)
+        if X.format == 'csr' and X.dtype == np.uint8 and (X.toarray() == data.iloc[:, 1:].T.values).all() \
+                and list(y) == list(data.columns[1:]) and list(symptoms) == list(data['symptom']):
+            print(f"✅ Symptom table loads in chunks as a sparse {X.shape} matrix")
+        else:
+            print("❌ Sparse matrix differs from the transposed table")
+            return False
+        
+        patients = pd.DataFrame(X.toarray(), columns=symptoms)
+        patients.insert(0, 'disease', y)
+        patients = pd.concat([patients] * 3, ignore_index=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'patients.csv')
+            patients.to_csv(path, index=False)
+            X_patients, y_patients, patient_symptoms = load_and_prepare_data(path, chunksize=4)
+        if X_patients.shape == (30, len(symptoms)) and list(y_patients) == list(patients['disease']) \
+                and (X_patients.toarray() == patients[symptoms].values).all():
+            print("✅ Patient-level data loads in chunks")
+        else:
+            print(f"❌ Unexpected patient-level data: {X_patients.shape}")
+            return False
+        
+        model = train_model(X_patients, y_patients, {'n_estimators': 10, 'random_state': 42}, n_jobs=1)
+        if (model.predict(X) == y).mean() > 0.5:
+            print("✅ Forest trains on the sparse matrix")
+        else:
+            print("❌ Forest trained on sparse data predicts poorly")
+            return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Training data loader failed: {e}")
+        return False
+
+def test_incremental_training():
+    """Test that re-running training skips unchanged work"""
+    print("\n♻️ Testing incremental training...")
+    
+    cwd = os.getcwd()
+    try:
+        import contextlib
+        import io
+        import shutil
+        import tempfile
+        from model.train_model import load_model, main as train
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, 'data'))
+            os.makedirs(os.path.join(tmp, 'model'))
+            shutil.copy('data/symptoms.csv', os.path.join(tmp, 'data'))
+            os.chdir(tmp)
+            
+            def run(*argv):
+                output = io.StringIO()
+                with contextlib.redirect_stdout(output):
+                    train(['--n-jobs', '1', *argv])
+                return output.getvalue()
+            
+            run('--n-estimators', '5')
+            run('--add-trees', '3')
+            output = run()
+            n_trees = load_model('model/disease_model.pkl')['model'].n_estimators
+            if 'up to date' in output and n_trees == 8:
+                print("✅ A default run after --add-trees keeps the grown forest")
+            else:
+                print(f"❌ Grown forest was retrained ({n_trees} trees)")
+                return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Incremental training failed: {e}")
+        return False
+    finally:
+        os.chdir(cwd)
+
+def test_cross_validation():
+    """Test parallel cross-validation with the fold cache"""
+    print("\n🔁 Testing cross-validation...")
+    
+    try:
+        import tempfile
+        from model.train_model import load_and_prepare_data
+        from model.tuning import cross_validate, simulate_patients
+        
+        X, y, _ = load_and_prepare_data('data/symptoms.csv')
+        X, y = simulate_patients(X, y, n_per_class=6)
+        candidates = [{'n_estimators': 5, 'max_depth': 5}, {'n_estimators': 10, 'max_depth': None}]
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            report = cross_validate(X, y, candidates, k=3, workers=2, cache_dir=tmp)
+            best = report['best']
+            if report['computed'] == 6 and 0 <= best['accuracy_mean'] <= 1 and \
+                    best['fit_s_mean'] > 0 and best['predict_ms_per_sample'] > 0:
+                print(f"✅ 2 configurations x 3 folds scored on held-out data ({best['accuracy_mean']:.2f})")
+            else:
+                print(f"❌ Unexpected report: {report}")
+                return False
+            
+            report = cross_validate(X, y, candidates + [{'n_estimators': 5, 'max_depth': 2}], k=3,
+                                    workers=2, cache_dir=tmp)
+            if report['computed'] == 3 and report['cached'] == 6:
+                print("✅ Re-running only fits new configurations")
+            else:
+                print(f"❌ Cache not used: {report['computed']} computed, {report['cached']} cached")
+                return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Cross-validation failed: {e}")
+        return False
+
 def test_utility_functions():
     """Test utility functions"""
     print("\n🔧 Testing utility functions...")
@@ -113,6 +238,18 @@ def test_utility_functions():
             print("❌ Text cleaning failed")
             return False
         
+        # Non-letters become word boundaries, for ASCII and non-ASCII input alike
+        boundaries = {
+            "fever,headache": "fever headache",
+            "Sore-throat/COUGH;nausea.": "sore throat cough nausea",
+            "fever\u2014headache, 39\u00b0C": "fever headache c",
+        }
+        if all(clean_symptoms_text(text) == expected for text, expected in boundaries.items()):
+            print("✅ Text cleaning keeps token boundaries")
+        else:
+            print(f"❌ Token boundaries were lost: {[clean_symptoms_text(text) for text in boundaries]}")
+            return False
+        
         # Test symptom extraction
         symptoms = extract_symptoms_from_text(test_text)
         if 'fever' in symptoms and 'headache' in symptoms:
@@ -121,12 +258,913 @@ def test_utility_functions():
             print("❌ Symptom extraction failed")
             return False
         
+        # Whole-word matching: 'painful urination' must not also yield 'pain' symptoms
+        symptoms = extract_symptoms_from_text("Painful urination and chest pain")
+        if symptoms == ['chest pain', 'painful urination']:
+            print("✅ Word-boundary matching works")
+        else:
+            print(f"❌ Word-boundary matching failed: {symptoms}")
+            return False
+        
+        # Plurals match their singular symptom
+        symptoms = extract_symptoms_from_text("I have chest pains and headaches, also a fever")
+        if symptoms == ['fever', 'headache', 'chest pain']:
+            print("✅ Plural symptoms are extracted")
+        else:
+            print(f"❌ Plural symptoms were missed: {symptoms}")
+            return False
+        
+        # Punctuation separates symptoms just like spaces do
+        joined = {
+            "fever,headache": ['fever', 'headache'],
+            "fever/cough": ['fever', 'cough'],
+            "I have fever.Cough too": ['fever', 'cough'],
+            "sore-throat and fever": ['fever', 'sore throat'],
+        }
+        failed = {text: extract_symptoms_from_text(text) for text, expected in joined.items()
+                  if sorted(extract_symptoms_from_text(text)) != sorted(expected)}
+        if not failed:
+            print("✅ Comma-, slash-, period- and hyphen-joined symptoms are extracted")
+        else:
+            print(f"❌ Joined symptoms were missed: {failed}")
+            return False
+        
         return True
         
     except Exception as e:
         print(f"❌ Utility functions failed: {e}")
         return False
 
+def test_prediction_engine():
+    """Test vectorized disease scoring"""
+    print("\n🧮 Testing prediction engine...")
+    
+    try:
+        from utils.prediction import PredictionEngine
+        
+        engine = PredictionEngine.from_csv('data/symptoms.csv')
+        print(f"✅ Built engine: {engine.n_diseases} diseases x {engine.n_symptoms} symptoms")
+        
+        features = engine.encode_text("I have a cough, sore throat and runny nose")
+        ranked = engine.predict(features, top_k=3)
+        if ranked[0][0] == "Common Cold" and len(ranked) == 3:
+            print("✅ Top-k prediction works")
+        else:
+            print(f"❌ Unexpected prediction: {ranked}")
+            return False
+        
+        from utils.bitset import BitsetMatrix
+        packed = PredictionEngine.from_bitset(BitsetMatrix.from_csv('data/symptoms.csv'))
+        if (packed.score(features) == engine.score(features)).all():
+            print("✅ Bitset scoring matches dense scoring")
+        else:
+            print("❌ Bitset scoring differs from dense scoring")
+            return False
+        
+        import numpy as np
+        from utils.prediction import top_k_indices
+        proba = engine.posterior(features)
+        if abs(proba.sum() - 1) < 1e-9 and np.allclose(packed.posterior(features), proba) and \
+                abs(ranked[0][1] - proba.max()) < 1e-9:
+            print("✅ Posterior probabilities are normalized and backend-independent")
+        else:
+            print(f"❌ Unexpected posterior: {proba}")
+            return False
+        
+        scores = np.array([[3, 1, 3, 2, 3], [0, 0, 0, 0, 1]])
+        if top_k_indices(scores, 2).tolist() == [[0, 2], [4, 0]]:
+            print("✅ Partial-sort top-k keeps ties in dataset order")
+        else:
+            print(f"❌ Unexpected top-k: {top_k_indices(scores, 2)}")
+            return False
+        
+        from utils.prediction import predict_batch
+        results = predict_batch(["fever and headache", "cough and runny nose"], engine, chunk_size=1)
+        if [r['predicted_disease'] for r in results] == ["Dengue", "Common Cold"]:
+            print("✅ Batch prediction works")
+        else:
+            print(f"❌ Unexpected batch predictions: {results}")
+            return False
+        
+        import contextlib
+        import io
+        import tempfile
+        from batch_predict import iter_records
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'intake.jsonl')
+            with open(path, 'w') as f:
+                f.write('{"symptoms": "cough"}\n"bare string"\n[1, 2]\n{"symptoms": "fever"}\n')
+            with contextlib.redirect_stderr(io.StringIO()) as stderr:
+                records = list(iter_records(path))
+        if records == [{'symptoms': 'cough'}, {'symptoms': 'fever'}] and 'line 2' in stderr.getvalue():
+            print("✅ Batch input skips JSONL lines that are not objects")
+        else:
+            print(f"❌ Unexpected batch records: {records}")
+            return False
+        
+        # No recognized symptom: no diagnosis at all, not a guess
+        batch = predict_batch(["xyz"], engine)
+        if engine.predict(engine.encode_text("xyz"), top_k=3) == [] and engine.predict(engine.encode_text("")) is None \
+                and batch[0]['predicted_disease'] is None and batch[0]['top_k'] == []:
+            print("✅ Unrecognized input gets an empty differential")
+        else:
+            print(f"❌ Unexpected prediction without symptoms: {batch}")
+            return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Prediction engine failed: {e}")
+        return False
+
+def test_model_registry():
+    """Test loading the trained model through the registry"""
+    print("\n📦 Testing model registry...")
+    
+    try:
+        from model.registry import ModelRegistry, get_registry
+        
+        # What the app, the API and the executor serve by default
+        served = get_registry().get()
+        if served.engine.bitset is not None:
+            print(f"✅ Served engine uses the packed bitset ({served.engine.bitset.nbytes} bytes)")
+        else:
+            print("❌ Served engine fell back to the dense matrix")
+            return False
+        
+        clear_cases = {
+            "diarrhea, vomiting and abdominal pain": "Gastroenteritis",
+            "cough and runny nose": "Common Cold",
+            "headache, blurred vision and nausea": "Migraine",
+            "chest pain, shortness of breath, fever and cough": "Pneumonia",
+        }
+        predicted = {text: served.predict_text(text, use_cache=False)[0] for text in clear_cases}
+        if predicted == clear_cases:
+            print("✅ Served model gives sensible diagnoses for clear cases")
+        else:
+            print(f"❌ Served model diagnoses: {predicted}")
+            return False
+        
+        registry = ModelRegistry()
+        bundle = registry.get()
+        print(f"✅ Loaded model with {len(bundle.diseases)} diseases")
+        
+        if registry.get() is not bundle:
+            print("❌ Model was loaded twice")
+            return False
+        print("✅ Model is loaded once and shared")
+        
+        features = bundle.engine.encode_text("cough and runny nose")
+        disease, probability = bundle.predict(features)
+        if disease in bundle.diseases and 0 <= probability <= 1:
+            print(f"✅ Model prediction works: {disease}")
+        else:
+            print(f"❌ Unexpected prediction: {disease}, {probability}")
+            return False
+        
+        import numpy as np
+        artifact = ModelRegistry(model_path='model/disease_model').get()
+        artifact_proba = artifact.predict_proba(features)
+        if artifact_proba.dtype == np.float64 and \
+                np.allclose(artifact_proba, bundle.predict_proba(features), atol=1e-6):
+            print("✅ Compiled artifact matches the pickled model")
+        else:
+            print("❌ Compiled artifact predictions differ from the pickled model")
+            return False
+        
+        sparse_features = bundle.encoder.transform_one(bundle.engine.extract_symptoms("cough and runny nose"))
+        if bundle.encoder.symptoms == bundle.engine.symptoms and sparse_features.format == 'csr' and \
+                np.allclose(bundle.predict_proba(sparse_features), bundle.predict_proba(features)):
+            print("✅ Sparse encoder shares the model's columns and predictions")
+        else:
+            print("❌ Sparse encoding differs from the dense feature vector")
+            return False
+        
+        texts = ["fever and headache", "nausea, vomiting and diarrhea", "cough"]
+        engine_first = ModelRegistry(cascade_margin=0.0).get()
+        model_only = ModelRegistry(cascade_margin=1.0).get()
+        for text in texts:
+            engine_first.predict_text(text, top_k=2, use_cache=False)
+            if model_only.predict_text(text, top_k=2, use_cache=False) != bundle.predict_text(text, top_k=2):
+                print("❌ Cascade fallback differs from the forest")
+                return False
+        if engine_first.cascade_stats()['engine']['count'] == len(texts) and \
+                model_only.cascade_stats()['model']['count'] == len(texts):
+            print("✅ Cascade answers from the engine above the margin and the forest below it")
+        else:
+            print(f"❌ Unexpected cascade tiers: {engine_first.cascade_stats()}")
+            return False
+        
+        from utils.prediction import iter_predictions
+        tiers = [result['tier'] for result in iter_predictions(texts, bundle.engine, model=bundle.model,
+                                                               cascade_margin=1.0)]
+        if tiers == ['model'] * len(texts):
+            print("✅ Batch cascade routes ambiguous rows to the model")
+        else:
+            print(f"❌ Unexpected batch tiers: {tiers}")
+            return False
+        
+        # Input without a known symptom is tagged the same way by both paths
+        batch_tier = next(iter_predictions(["xyz"], bundle.engine, model=bundle.model, cascade_margin=0.0))['tier']
+        engine_first.predict_text("xyz", use_cache=False)
+        if batch_tier == 'fallback' and engine_first.cascade_stats()['fallback']['count'] == 1:
+            print("✅ Rows without symptoms count as the fallback tier in batch and per request")
+        else:
+            print(f"❌ Fallback tiers disagree: {batch_tier}, {engine_first.cascade_stats()['fallback']}")
+            return False
+
+        from model.registry import get_prediction_cache
+        cache = get_prediction_cache()
+        cache.clear()
+        first = bundle.predict_text("fever, headache", top_k=3)
+        before = cache.stats()
+        second = bundle.predict_text("Headache and fever", top_k=3)
+        after = cache.stats()
+        if first == second and after['hits'] == before['hits'] + 1 and after['size'] == 1:
+            print(f"✅ Prediction cache is keyed by symptom set (hit rate {after['hit_rate']:.0%})")
+        else:
+            print(f"❌ Prediction cache missed equivalent input: {after}")
+            return False
+
+        return True
+        
+    except Exception as e:
+        print(f"❌ Model registry failed: {e}")
+        return False
+
+def test_prediction_executor():
+    """Test scoring in worker processes"""
+    print("\n🧵 Testing prediction executor...")
+    
+    try:
+        from model.registry import ModelRegistry
+        from utils.executor import PredictionExecutor
+        from utils.prediction import iter_predictions
+        
+        registry = ModelRegistry(cascade_margin=0.2)
+        bundle = registry.get()
+        texts = ["fever, headache and body aches", "cough and runny nose", "nothing in particular",
+                 "chest pain and shortness of breath", "nausea, vomiting and diarrhea"] * 7
+        
+        import threading
+        import warnings
+        from utils.executor import get_prediction_executor
+        
+        previous = os.environ.get('PREDICTION_WORKERS')
+        os.environ['PREDICTION_WORKERS'] = 'four'
+        try:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                ignored = get_prediction_executor() is None and caught
+        finally:
+            if previous is None:
+                del os.environ['PREDICTION_WORKERS']
+            else:
+                os.environ['PREDICTION_WORKERS'] = previous
+        if ignored:
+            print("✅ An invalid PREDICTION_WORKERS falls back to in-process scoring")
+        else:
+            print("❌ An invalid PREDICTION_WORKERS was not handled")
+            return False
+        
+        with PredictionExecutor(workers=2) as executor:
+            # One ping cannot meet the other at the barrier: it times out and breaks it
+            executor.workers = 1
+            try:
+                executor.warm_up(timeout=0.5)
+                timed_out = False
+            except threading.BrokenBarrierError:
+                timed_out = True
+            executor.workers = 2
+            if timed_out and len(set(executor.warm_up())) == 2:
+                print("✅ warm_up works again after a timeout")
+            else:
+                print("❌ warm_up stays broken after a timeout")
+                return False
+        
+        with PredictionExecutor(workers=2, model_path=registry.model_path, cascade_margin=0.2) as executor:
+            if len(set(executor.warm_up())) == 2:
+                print("✅ Both workers start and load the model before the first request")
+            else:
+                print("❌ Workers did not start")
+                return False
+            
+            if all(executor.predict(text, top_k=3) == bundle.predict_text(text, top_k=3) for text in texts[:5]):
+                print("✅ Worker predictions match the in-process model")
+            else:
+                print("❌ Worker predictions differ from the in-process model")
+                return False
+            
+            expected = list(iter_predictions(texts, bundle.engine, model=bundle.model, chunk_size=4,
+                                             top_k=2, cascade_margin=0.2))
+            if list(executor.iter_predictions(texts, chunk_size=4, top_k=2, max_pending=2)) == expected:
+                print("✅ Batches are scored in parallel and returned in input order")
+            else:
+                print("❌ Batch results differ from in-process scoring")
+                return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Prediction executor failed: {e}")
+        return False
+
+def test_benchmark_harness():
+    """Test benchmark timing and regression detection"""
+    print("\n⏱️  Testing benchmark harness...")
+    
+    try:
+        from benchmark import build_cases, compare_to_baseline, measure
+        
+        stats = measure(lambda: sum(range(100)), repeats=20)
+        if stats['p50_ms'] <= stats['p99_ms'] and stats['throughput_per_s'] > 0:
+            print("✅ Latency statistics work")
+        else:
+            print(f"❌ Unexpected statistics: {stats}")
+            return False
+        
+        baseline = {'results': {'case': {'p50_ms': 1.0}}}
+        if compare_to_baseline({'case': {'p50_ms': 1.5}}, baseline, threshold=0.25) and \
+                not compare_to_baseline({'case': {'p50_ms': 1.1}}, baseline, threshold=0.25):
+            print("✅ Regression detection works")
+        else:
+            print("❌ Regression detection failed")
+            return False
+        
+        # Workloads are built only for the cases that run
+        cases = {name: (setup, repeats) for name, setup, repeats in build_cases(quick=True)}
+        setup, repeats = cases['get_emergency_priority/symptoms=3']
+        if measure(setup(), repeats)['p50_ms'] > 0:
+            print(f"✅ {len(cases)} cases are listed without building their workloads")
+        else:
+            print("❌ Selected case did not run")
+            return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Benchmark harness failed: {e}")
+        return False
+
+def test_api_service():
+    """Test the headless HTTP API"""
+    print("\n🔌 Testing API service...")
+    
+    try:
+        from fastapi.testclient import TestClient
+        import api
+        
+        with TestClient(api.app) as client:
+            response = client.post('/predict', json={'symptoms': 'cough and runny nose'})
+            if response.status_code == 200 and response.json()['predicted_disease'] \
+                    and response.json()['symptoms'] == ['cough', 'runny nose']:
+                print("✅ /predict works")
+            else:
+                print(f"❌ /predict failed: {response.status_code}")
+                return False
+            
+            response = client.post('/predict', json={'symptoms': 'xyz'})
+            if response.status_code == 422:
+                print("✅ /predict rejects text without recognized symptoms")
+            else:
+                print(f"❌ /predict diagnosed unrecognized text: {response.json()}")
+                return False
+            
+            response = client.post('/triage', json={'symptoms': 'chest pain'})
+            if response.status_code == 200 and response.json()['priority'] == 'immediate':
+                print("✅ /triage works")
+            else:
+                print(f"❌ /triage failed: {response.status_code}")
+                return False
+            
+            response = client.post('/triage', json={'symptoms': 'no chest pain. denies shortness of breath, mild cough'})
+            if response.status_code == 200 and response.json()['priority'] == 'routine':
+                print("✅ /triage ignores negated complaints")
+            else:
+                print(f"❌ /triage scored a negated complaint: {response.json()}")
+                return False
+            
+            response = client.post('/triage', json={'symptoms': 'severe headache and high fever'})
+            if response.status_code == 200 and response.json()['priority'] == 'urgent':
+                print("✅ /triage honours severity modifiers")
+            else:
+                print(f"❌ /triage missed a severity modifier: {response.json()}")
+                return False
+            
+            response = client.get('/metrics')
+            if response.status_code == 200 and response.headers['content-type'].startswith('text/plain'):
+                print("✅ /metrics works")
+            else:
+                print(f"❌ /metrics failed: {response.status_code}")
+                return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ API service failed: {e}")
+        return False
+
+def test_hospital_search():
+    """Test nearest-hospital search"""
+    print("\n🏥 Testing hospital search...")
+    
+    try:
+        from utils.hospitals import get_nearby_hospitals
+        
+        hospitals = get_nearby_hospitals("40.7128, -74.0060", k=3)
+        distances = [hospital['distance_km'] for hospital in hospitals]
+        if len(hospitals) == 3 and hospitals[0]['name'] == 'City General Hospital' and distances == sorted(distances):
+            print("✅ Nearest hospitals are ranked by distance")
+        else:
+            print(f"❌ Unexpected hospitals: {hospitals}")
+            return False
+        
+        nearby = get_nearby_hospitals("40.7128, -74.0060", radius_km=2)
+        if nearby and all(hospital['distance_km'] <= 2 for hospital in nearby):
+            print("✅ Radius search works")
+        else:
+            print(f"❌ Radius search failed: {nearby}")
+            return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Hospital search failed: {e}")
+        return False
+
+def test_geocoding():
+    """Test the cached geocoder against a local stub server"""
+    print("\n📍 Testing geocoding...")
+    
+    import json
+    import tempfile
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    calls = []
+    
+    class StubGeocoder(BaseHTTPRequestHandler):
+        def do_GET(self):
+            calls.append(self.path)
+            time.sleep(0.1)
+            body = json.dumps([{'lat': '48.4011', 'lon': '9.9876', 'display_name': 'Ulm, Germany'}])
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(body.encode())
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubGeocoder)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    try:
+        from utils.cache import PersistentTTLCache
+        from utils.geocoding import GazetteerBackend, Geocoder, HTTPGeocoderBackend
+        
+        url = f"http://127.0.0.1:{server.server_address[1]}/search"
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, 'geocode.sqlite')
+            geocoder = Geocoder([GazetteerBackend(), HTTPGeocoderBackend(url)], cache=PersistentTTLCache(cache_path))
+            
+            place = geocoder.geocode("40.7128, -74.0060")
+            if place and place['source'] == 'coordinates' and not calls:
+                print("✅ Coordinates are parsed without a lookup")
+            else:
+                print(f"❌ Coordinates not parsed: {place}")
+                return False
+            
+            place = geocoder.geocode("Mumbai, India")
+            if place and place['source'] == 'gazetteer' and not calls:
+                print("✅ Known cities resolve from the local gazetteer")
+            else:
+                print(f"❌ Gazetteer lookup failed: {place}")
+                return False
+            
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                places = list(pool.map(geocoder.geocode, ["Ulm, Germany"] * 8))
+            if len(calls) == 1 and all(p and p['source'] == 'http' for p in places):
+                print("✅ Concurrent remote lookups are coalesced")
+            else:
+                print(f"❌ Expected one remote request, got {len(calls)}")
+                return False
+            
+            # A fresh geocoder on the same cache file must not go remote again
+            restarted = Geocoder([GazetteerBackend(), HTTPGeocoderBackend(url)], cache=PersistentTTLCache(cache_path))
+            place = restarted.geocode("ulm germany")
+            if place and place['label'] == 'Ulm, Germany' and len(calls) == 1:
+                print("✅ Repeated lookups are served from the persistent cache")
+            else:
+                print(f"❌ Cache miss on repeated lookup: {place}, {len(calls)} requests")
+                return False
+            
+            # A cache path SQLite cannot open falls back to the in-memory cache
+            import utils.geocoding as geocoding
+            previous = os.environ.get('GEOCODER_CACHE_PATH')
+            os.environ['GEOCODER_CACHE_PATH'] = tmp
+            geocoding._geocoder = None
+            try:
+                fallback = geocoding.get_geocoder()
+            finally:
+                geocoding._geocoder = None
+                if previous is None:
+                    del os.environ['GEOCODER_CACHE_PATH']
+                else:
+                    os.environ['GEOCODER_CACHE_PATH'] = previous
+            if fallback.cache is None and fallback.geocode("Mumbai, India"):
+                print("✅ An unusable cache file falls back to the in-memory cache")
+            else:
+                print("❌ Unusable cache file was not handled")
+                return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Geocoding failed: {e}")
+        return False
+    finally:
+        server.shutdown()
+
+def test_hospital_map():
+    """Test cached hospital map rendering"""
+    print("\n🗺️ Testing hospital map rendering...")
+    
+    try:
+        import tempfile
+        from utils.maps import MapRenderer
+        
+        hospitals = [
+            {'name': f"Hospital {i}", 'address': f"{i} Main St", 'phone': '555-0100',
+             'lat': 40.7 + i * 0.001, 'lng': -74.0 + i * 0.001}
+            for i in range(200)
+        ]
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            renderer = MapRenderer(cache_dir=tmp, cluster_threshold=25)
+            small = renderer.render(hospitals[:5])
+            large = renderer.render(hospitals)
+            if 'markerClusterGroup' in large and 'markerClusterGroup' not in small:
+                print("✅ Large result sets are clustered")
+            else:
+                print("❌ Marker clustering not applied as expected")
+                return False
+            
+            if renderer.render(hospitals) == large and renderer.renders == 2:
+                print("✅ Repeated maps are served from the cache")
+            else:
+                print(f"❌ Map re-rendered: {renderer.renders} renders")
+                return False
+            
+            restarted = MapRenderer(cache_dir=tmp, cluster_threshold=25)
+            if restarted.submit(hospitals).result() == large and restarted.renders == 0:
+                print("✅ Rendered maps are reused from disk")
+            else:
+                print("❌ Disk cache not used")
+                return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Hospital map failed: {e}")
+        return False
+
+def test_alert_dispatcher():
+    """Test queued alert delivery against local SMTP and SMS stubs"""
+    print("\n🚨 Testing alert dispatcher...")
+    
+    import socketserver
+    import tempfile
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    emails, sms_requests = [], []
+    
+    class StubSMTP(socketserver.StreamRequestHandler):
+        def handle(self):
+            self.wfile.write(b"220 localhost ESMTP\r\n")
+            while True:
+                line = self.rfile.readline()
+                command = line[:4].upper()
+                if not line or command == b'QUIT':
+                    self.wfile.write(b"221 Bye\r\n")
+                    return
+                if command == b'DATA':
+                    self.wfile.write(b"354 End data with .\r\n")
+                    data = []
+                    while (line := self.rfile.readline()) not in (b".\r\n", b""):
+                        data.append(line)
+                    emails.append(b"".join(data))
+                self.wfile.write(b"250 OK\r\n")
+    
+    class StubSMS(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            sms_requests.append(self.path)
+            # The gateway is briefly unavailable for the first message
+            self.send_response(503 if len(sms_requests) == 1 else 201)
+            self.end_headers()
+            self.wfile.write(b"{}")
+        
+        def log_message(self, *args):
+            pass
+    
+    smtp_server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), StubSMTP)
+    sms_server = ThreadingHTTPServer(('127.0.0.1', 0), StubSMS)
+    for server in (smtp_server, sms_server):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    try:
+        from utils.alerts import AlertDispatcher, AlertQueue, SMSTransport, SMTPTransport, queue_emergency_alert
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            transports = {
+                'email': SMTPTransport('127.0.0.1', smtp_server.server_address[1], use_tls=False),
+                'sms': SMSTransport('AC123', 'token', '+15550000000',
+                                    base_url=f"http://127.0.0.1:{sms_server.server_address[1]}"),
+            }
+            dispatcher = AlertDispatcher(AlertQueue(os.path.join(tmp, 'alerts.sqlite')), transports,
+                                         base_delay=0.05, poll_interval=0.05)
+            dispatcher.start()
+            
+            message = "EMERGENCY ALERT\nSymptoms: chest pain"
+            first = queue_emergency_alert(message, phone='+15551234567', email='a@example.com', dispatcher=dispatcher)
+            repeat = queue_emergency_alert(message, phone='+15551234567', email='a@example.com', dispatcher=dispatcher)
+            for recipient in ('b@example.com', 'c@example.com'):
+                dispatcher.enqueue('email', recipient, message)
+            
+            if all(first.values()) and not any(repeat.values()):
+                print("✅ Repeated alerts to the same contact are deduplicated")
+            else:
+                print(f"❌ Deduplication failed: {first}, {repeat}")
+                return False
+            
+            delivered = dispatcher.drain(timeout=10)
+            metrics = dispatcher.metrics()
+            dispatcher.stop()
+            
+            if delivered and len(emails) == 3 and len(sms_requests) == 2 and metrics['retried'] == 1:
+                print("✅ Alerts are delivered, retrying after a gateway failure")
+            else:
+                print(f"❌ Delivery failed: {len(emails)} emails, {len(sms_requests)} SMS requests, {metrics}")
+                return False
+            
+            if transports['email'].connections_opened < len(emails) and metrics['sent'] == 4 and 'latency_p50_ms' in metrics:
+                print("✅ SMTP connections are pooled and delivery metrics are recorded")
+            else:
+                print(f"❌ Unexpected transport state: {transports['email'].connections_opened} connections, {metrics}")
+                return False
+            
+            import sqlite3
+            import warnings
+            
+            class FlakyQueue(AlertQueue):
+                failures = 1
+                
+                def claim(self):
+                    if self.failures:
+                        self.failures -= 1
+                        raise sqlite3.OperationalError("database is locked")
+                    return super().claim()
+            
+            stub_email = SMTPTransport('127.0.0.1', smtp_server.server_address[1], use_tls=False)
+            flaky = AlertDispatcher(FlakyQueue(os.path.join(tmp, 'flaky.sqlite')), {'email': stub_email},
+                                    workers=1, poll_interval=0.05)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                flaky.start()
+                flaky.enqueue('email', 'd@example.com', message)
+                delivered = flaky.drain(timeout=10)
+                flaky.stop()
+            if delivered and flaky.metrics()['errors'] == 1 and len(emails) == 4:
+                print("✅ Workers keep running after a queue error")
+            else:
+                print(f"❌ Worker stopped after a queue error: {flaky.metrics()}")
+                return False
+            
+            from utils.alerts import AlertDeliveryError
+            
+            class TimingOut:
+                closed = False
+                
+                def send_message(self, message):
+                    raise TimeoutError("timed out")
+                
+                def close(self):
+                    TimingOut.closed = True
+            
+            stub_email._pool.put_nowait(TimingOut())
+            try:
+                stub_email.send('e@example.com', message)
+                wrapped = False
+            except AlertDeliveryError:
+                wrapped = True
+            if wrapped and TimingOut.closed and stub_email._pool.empty():
+                print("✅ Socket errors are reported as delivery errors and drop the connection")
+            else:
+                print("❌ A socket error leaked from the SMTP transport")
+                return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Alert dispatcher failed: {e}")
+        return False
+    finally:
+        smtp_server.shutdown()
+        sms_server.shutdown()
+
+def test_triage_rules():
+    """Test the compiled triage rule table"""
+    print("\n🩺 Testing triage rules...")
+    
+    try:
+        from utils.triage import TriageEngine, get_triage_engine
+        
+        engine = get_triage_engine()
+        result = engine.evaluate(['runny nose', 'high fever', 'no chest pain'])
+        if result['priority'] == 'urgent' and result['severity'] == {
+                'runny nose': 'mild', 'high fever': 'moderate', 'no chest pain': 'mild'}:
+            print("✅ Severity and priority come from one pass, negations ignored")
+        else:
+            print(f"❌ Unexpected triage result: {result}")
+            return False
+        
+        # The most urgent symptom decides, wherever it appears in the list
+        batch = engine.evaluate_batch([['high fever', 'chest pain'], 'denies fever, but has seizures', []])
+        if [patient['priority'] for patient in batch] == ['immediate', 'immediate', 'routine']:
+            print("✅ Batch evaluation works")
+        else:
+            print(f"❌ Unexpected batch priorities: {batch}")
+            return False
+        
+        from utils.helpers import format_emergency_message
+        from utils.triage import split_clauses
+        
+        # Free text keeps its negations and modifiers when split into clauses
+        clauses = split_clauses("Denies shortness of breath. Severe headache and high fever")
+        if engine.priority(clauses) == 'urgent' \
+                and 'Severity: ROUTINE' in format_emergency_message({}, ['chest pain'], 'Home', description='no chest pain'):
+            print("✅ Free text is triaged clause by clause")
+        else:
+            print(f"❌ Clause triage failed: {clauses}")
+            return False
+        
+        rules = [{'keywords': [f"marker {i} finding"], 'severity': 'mild', 'priority': 'routine'} for i in range(5000)]
+        rules.append({'keywords': ['marker 4999 finding'], 'severity': 'severe', 'priority': 'immediate'})
+        rules.append({'keywords': ['sudden collapse'], 'severity': 'severe', 'priority': 'immediate'})
+        large = TriageEngine(rules)
+        if len(large) == 5001 and large.priority('sudden collapse after marker 12 finding') == 'immediate':
+            print("✅ Large rule tables compile and match")
+        else:
+            print("❌ Large rule table failed")
+            return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Triage rules failed: {e}")
+        return False
+
+def test_disease_content():
+    """Test the per-disease content store"""
+    print("\n📚 Testing disease content store...")
+    
+    try:
+        from utils.diseases import DiseaseContentStore, build_index
+        from utils.prediction import PredictionEngine
+        
+        store = DiseaseContentStore()
+        if store.index == build_index():
+            print("✅ data/diseases/index.json is up to date")
+        else:
+            print("❌ Disease index is stale: run python -m utils.diseases")
+            return False
+        
+        missing = [disease for disease in PredictionEngine.from_csv().diseases if store.get(disease) is None]
+        if not missing and store.cache_info().currsize == len(PredictionEngine.from_csv().diseases):
+            print("✅ Content is loaded lazily for every predictable disease")
+        else:
+            print(f"❌ No content for: {missing}")
+            return False
+        
+        required = ('description', 'symptoms', 'first_aid', 'diet', 'emergency_signs')
+        if all(all(store.get(name).get(field) for field in required) for name in store.names()):
+            print("✅ Every condition has complete content")
+        else:
+            print("❌ Some conditions are missing content fields")
+            return False
+        
+        if 'Pneumonia' in store.search('Chest Pain') and store.related(['cough', 'chest pain'])[0] in ('Pneumonia', 'Bronchitis'):
+            print("✅ Inverted symptom index works")
+        else:
+            print(f"❌ Unexpected search results: {store.search('chest pain')}")
+            return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Disease content store failed: {e}")
+        return False
+
+def test_app_startup():
+    """Test that importing the app stays light"""
+    print("\n🚀 Testing app startup...")
+    
+    try:
+        from benchmark import profile_imports, summarize_imports
+        
+        rows = profile_imports('import app')
+        heavy = {'numpy', 'pandas', 'scipy', 'sklearn', 'folium', 'requests'} & {row['module'] for row in rows}
+        if not heavy:
+            print("✅ Heavy dependencies are deferred until a page needs them")
+        else:
+            print(f"❌ Imported at startup: {sorted(heavy)}")
+            return False
+        
+        # One wall-clock sample is too noisy to assert on; the import budget
+        # is enforced by `python benchmark.py --import-profile`
+        summary = summarize_imports(rows)
+        print(f"✅ App import takes {summary['own_ms']:.0f} ms on top of Streamlit")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ App startup failed: {e}")
+        return False
+
+def test_instrumentation():
+    """Test stage timing, Prometheus export and slow-call profiling"""
+    print("\n📈 Testing instrumentation...")
+    
+    try:
+        import json
+        import tempfile
+        from utils.helpers import extract_symptoms_from_text
+        from utils.instrumentation import configure, get_metrics
+        
+        metrics = get_metrics()
+        metrics.reset()
+        extract_symptoms_from_text("fever and headache")
+        if not metrics.snapshot():
+            print("✅ Nothing is recorded while disabled")
+        else:
+            print(f"❌ Recorded while disabled: {metrics.snapshot()}")
+            return False
+        
+        # Flags set after import (e.g. by load_dotenv) take effect once re-read
+        from utils.instrumentation import configure_from_env, is_enabled
+        previous = os.environ.get('INSTRUMENTATION')
+        os.environ['INSTRUMENTATION'] = '1'
+        configure_from_env()
+        enabled = is_enabled()
+        if previous is None:
+            del os.environ['INSTRUMENTATION']
+        else:
+            os.environ['INSTRUMENTATION'] = previous
+        configure_from_env()
+        if enabled:
+            print("✅ INSTRUMENTATION set after import is picked up")
+        else:
+            print("❌ INSTRUMENTATION set after import was ignored")
+            return False
+        
+        configure(enabled=True, profile_sample_rate=1.0, profile_slow_ms=0)
+        try:
+            for _ in range(3):
+                extract_symptoms_from_text("fever and headache")
+        finally:
+            configure(enabled=False, profile_sample_rate=0.0)
+        
+        stage = metrics.snapshot().get('extract_symptoms', {})
+        text = metrics.prometheus()
+        if stage.get('count') == 3 and 'shc_stage_latency_seconds_count{stage="extract_symptoms"} 3' in text:
+            print("✅ Stage latency histogram is exported in Prometheus format")
+        else:
+            print(f"❌ Unexpected metrics: {stage}")
+            return False
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'metrics.jsonl')
+            metrics.write_jsonl(path)
+            with open(path) as f:
+                rows = [json.loads(line) for line in f]
+        slow = [row for row in rows if row.get('type') == 'slow_call']
+        if slow and slow[0]['profile']:
+            print(f"✅ Metrics and {len(slow)} profiled slow calls written as JSONL")
+        else:
+            print("❌ Slow calls were not profiled")
+            return False
+        
+        metrics.reset()
+        return True
+        
+    except Exception as e:
+        print(f"❌ Instrumentation failed: {e}")
+        return False
+
 def test_streamlit_app():
     """Test if Streamlit app can be imported"""
     print("\n🌐 Testing Streamlit app...")
@@ -165,7 +1203,23 @@ def main():
         ("Package Imports", test_imports),
         ("Data Files", test_data_files),
         ("Model Training", test_model_training),
+        ("Training Data Loader", test_training_loader),
+        ("Incremental Training", test_incremental_training),
+        ("Cross-Validation", test_cross_validation),
         ("Utility Functions", test_utility_functions),
+        ("Prediction Engine", test_prediction_engine),
+        ("Model Registry", test_model_registry),
+        ("Prediction Executor", test_prediction_executor),
+        ("Benchmark Harness", test_benchmark_harness),
+        ("API Service", test_api_service),
+        ("Hospital Search", test_hospital_search),
+        ("Geocoding", test_geocoding),
+        ("Hospital Map", test_hospital_map),
+        ("Alert Dispatcher", test_alert_dispatcher),
+        ("Triage Rules", test_triage_rules),
+        ("Disease Content", test_disease_content),
+        ("App Startup", test_app_startup),
+        ("Instrumentation", test_instrumentation),
         ("Streamlit App", test_streamlit_app)
     ]
     
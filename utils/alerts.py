@@ -0,0 +1,473 @@
+"""
+Queued delivery of emergency alerts for Smart Health Companion
+
+Alerts are written to a persistent SQLite queue and delivered by a pool
+of background worker threads, so the UI returns as soon as the alert is
+stored. Failed deliveries are retried with exponential backoff, repeated
+alerts to the same contact within a short window are dropped, and the
+SMTP and SMS transports reuse pooled connections. Pending alerts survive
+a restart and are picked up again when the dispatcher starts.
+"""
+
+import hashlib
+import os
+import queue
+import smtplib
+import sqlite3
+import threading
+import time
+import warnings
+from collections import deque
+from email.message import EmailMessage
+from typing import Dict, List, Optional
+
+DEFAULT_QUEUE_PATH = '.cache/alerts.sqlite'
+
+PENDING = 'pending'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+
+
+class AlertDeliveryError(Exception):
+    """Raised by a transport when a message could not be delivered"""
+
+
+class AlertQueue:
+    """
+    Persistent alert queue backed by SQLite, safe to share between threads
+    and processes
+    """
+
+    def __init__(self, filepath: str = DEFAULT_QUEUE_PATH):
+        self.filepath = filepath
+        self._local = threading.local()
+
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS alerts ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " channel TEXT NOT NULL, recipient TEXT NOT NULL,"
+                " subject TEXT, body TEXT NOT NULL, dedup_key TEXT,"
+                " status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,"
+                " next_attempt_at REAL NOT NULL, created_at REAL NOT NULL,"
+                " sent_at REAL, last_error TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS alerts_due ON alerts (status, next_attempt_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS alerts_dedup ON alerts (dedup_key, created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.filepath, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, channel: str, recipient: str, body: str, subject: Optional[str] = None,
+                dedup_key: Optional[str] = None, dedup_window: float = 0.0) -> Optional[int]:
+        """
+        Add an alert; returns its id, or None when an alert with the same
+        dedup_key was queued or sent within dedup_window seconds
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if dedup_key and dedup_window > 0:
+                duplicate = conn.execute(
+                    "SELECT 1 FROM alerts WHERE dedup_key = ? AND created_at > ? AND status != ? LIMIT 1",
+                    (dedup_key, now - dedup_window, FAILED)
+                ).fetchone()
+                if duplicate:
+                    conn.execute("COMMIT")
+                    return None
+
+            cursor = conn.execute(
+                "INSERT INTO alerts (channel, recipient, subject, body, dedup_key, status,"
+                " next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (channel, recipient, subject, body, dedup_key, PENDING, now, now)
+            )
+            conn.execute("COMMIT")
+            return cursor.lastrowid
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def claim(self) -> Optional[Dict]:
+        """
+        Take the oldest due alert and mark it as being sent
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, channel, recipient, subject, body, attempts, created_at FROM alerts"
+                " WHERE status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at, id LIMIT 1",
+                (PENDING, time.time())
+            ).fetchone()
+            if row:
+                conn.execute("UPDATE alerts SET status = ?, attempts = attempts + 1 WHERE id = ?",
+                             (SENDING, row[0]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return None
+        keys = ('id', 'channel', 'recipient', 'subject', 'body', 'attempts', 'created_at')
+        alert = dict(zip(keys, row))
+        alert['attempts'] += 1
+        return alert
+
+    def mark_sent(self, alert_id: int):
+        self._connect().execute("UPDATE alerts SET status = ?, sent_at = ?, last_error = NULL WHERE id = ?",
+                                (SENT, time.time(), alert_id))
+
+    def mark_retry(self, alert_id: int, delay: float, error: str):
+        self._connect().execute("UPDATE alerts SET status = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                                (PENDING, time.time() + delay, error, alert_id))
+
+    def mark_failed(self, alert_id: int, error: str):
+        self._connect().execute("UPDATE alerts SET status = ?, last_error = ? WHERE id = ?",
+                                (FAILED, error, alert_id))
+
+    def recover(self) -> int:
+        """
+        Return alerts left 'sending' by a crashed worker to the queue
+        """
+        cursor = self._connect().execute("UPDATE alerts SET status = ? WHERE status = ?", (PENDING, SENDING))
+        return cursor.rowcount
+
+    def get(self, alert_id: int) -> Optional[Dict]:
+        cursor = self._connect().execute("SELECT * FROM alerts WHERE id = ?", (alert_id,))
+        row = cursor.fetchone()
+        return dict(zip([column[0] for column in cursor.description], row)) if row else None
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM alerts GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def next_due(self) -> Optional[float]:
+        row = self._connect().execute("SELECT MIN(next_attempt_at) FROM alerts WHERE status = ?",
+                                      (PENDING,)).fetchone()
+        return row[0]
+
+
+class SMTPTransport:
+    """
+    Email delivery over a small pool of reusable SMTP connections
+    """
+
+    channel = 'email'
+
+    def __init__(self, host: str, port: int = 587, username: Optional[str] = None,
+                 password: Optional[str] = None, sender: Optional[str] = None,
+                 use_tls: bool = True, pool_size: int = 2, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username or 'alerts@localhost'
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._pool: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue(maxsize=pool_size)
+
+    def _open(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            connection.starttls()
+        if self.username and self.password:
+            connection.login(self.username, self.password)
+        self.connections_opened += 1
+        return connection
+
+    def _acquire(self) -> smtplib.SMTP:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._open()
+
+    def _release(self, connection: smtplib.SMTP):
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.quit()
+
+    @staticmethod
+    def _discard(connection: smtplib.SMTP):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def send(self, recipient: str, body: str, subject: Optional[str] = None):
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = recipient
+        message['Subject'] = subject or 'Emergency Alert'
+        message.set_content(body)
+
+        connection = None
+        try:
+            connection = self._acquire()
+            try:
+                connection.send_message(message)
+            except smtplib.SMTPServerDisconnected:
+                # Pooled connection went stale: reconnect once
+                self._discard(connection)
+                connection = None
+                connection = self._open()
+                connection.send_message(message)
+        except Exception as e:
+            # Never return a connection in an unknown state to the pool
+            if connection is not None:
+                self._discard(connection)
+            raise AlertDeliveryError(str(e) or type(e).__name__) from e
+        self._release(connection)
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().quit()
+            except queue.Empty:
+                return
+            except smtplib.SMTPException:
+                pass
+
+
+class SMSTransport:
+    """
+    SMS delivery through a Twilio-compatible HTTP API on a pooled session
+    """
+
+    channel = 'sms'
+
+    def __init__(self, account_sid: str, auth_token: str, from_number: str,
+                 base_url: str = 'https://api.twilio.com/2010-04-01', pool_size: int = 4,
+                 timeout: float = 10.0):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.url = f"{base_url.rstrip('/')}/Accounts/{account_sid}/Messages.json"
+        self.from_number = from_number
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.auth = (account_sid, auth_token)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def send(self, recipient: str, body: str, subject: Optional[str] = None):
+        import requests
+
+        try:
+            response = self.session.post(self.url, timeout=self.timeout,
+                                         data={'From': self.from_number, 'To': recipient, 'Body': body})
+        except requests.RequestException as e:
+            raise AlertDeliveryError(str(e)) from e
+        if response.status_code >= 300:
+            raise AlertDeliveryError(f"SMS gateway returned {response.status_code}: {response.text[:200]}")
+
+    def close(self):
+        self.session.close()
+
+
+class AlertDispatcher:
+    """
+    Delivers queued alerts on background worker threads
+    """
+
+    def __init__(self, alert_queue: AlertQueue, transports: Dict[str, object], workers: int = 2,
+                 max_attempts: int = 5, base_delay: float = 1.0, max_delay: float = 300.0,
+                 dedup_window: float = 300.0, poll_interval: float = 1.0):
+        self.queue = alert_queue
+        self.transports = transports
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.dedup_window = dedup_window
+        self.poll_interval = poll_interval
+
+        self._wakeup = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._metrics_lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self._started_at = None
+        self._counters = {'enqueued': 0, 'deduplicated': 0, 'sent': 0, 'retried': 0, 'failed': 0, 'errors': 0}
+
+    def start(self):
+        if self._threads:
+            return
+        self.queue.recover()
+        self._stopping.clear()
+        self._started_at = time.time()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"alert-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        for transport in self.transports.values():
+            if hasattr(transport, 'close'):
+                transport.close()
+
+    def _count(self, name: str, latency: Optional[float] = None):
+        with self._metrics_lock:
+            self._counters[name] += 1
+            if latency is not None:
+                self._latencies.append(latency)
+
+    def enqueue(self, channel: str, recipient: str, body: str, subject: Optional[str] = None,
+                dedup_key: Optional[str] = None) -> Optional[int]:
+        """
+        Queue one message; returns its id, or None if it was a duplicate
+        """
+        if channel not in self.transports:
+            raise ValueError(f"No transport configured for channel '{channel}'")
+
+        dedup_key = dedup_key or f"{channel}:{recipient}"
+        alert_id = self.queue.enqueue(channel, recipient, body, subject, dedup_key, self.dedup_window)
+        self._count('enqueued' if alert_id is not None else 'deduplicated')
+        if alert_id is not None:
+            with self._wakeup:
+                self._wakeup.notify()
+        return alert_id
+
+    def backoff(self, attempts: int) -> float:
+        return min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+
+    def _deliver(self, alert: Dict):
+        try:
+            self.transports[alert['channel']].send(alert['recipient'], alert['body'], alert['subject'])
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if alert['attempts'] >= self.max_attempts:
+                self.queue.mark_failed(alert['id'], error)
+                self._count('failed')
+            else:
+                self.queue.mark_retry(alert['id'], self.backoff(alert['attempts']), error)
+                self._count('retried')
+            return
+
+        self.queue.mark_sent(alert['id'])
+        self._count('sent', time.time() - alert['created_at'])
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                alert = self.queue.claim()
+                if alert is not None:
+                    self._deliver(alert)
+                    continue
+
+                # Sleep until woken by enqueue(), the next retry is due, or the poll interval passes
+                next_due = self.queue.next_due()
+                wait = self.poll_interval if next_due is None else min(self.poll_interval, next_due - time.time())
+            except Exception as e:
+                # A locked or broken queue must not stop delivery for good
+                warnings.warn(f"Alert worker error, retrying in {self.poll_interval}s: {type(e).__name__}: {e}")
+                self._count('errors')
+                wait = self.poll_interval
+            if wait > 0:
+                with self._wakeup:
+                    self._wakeup.wait(wait)
+
+    def drain(self, timeout: float = 10.0) -> bool:
+        """
+        Wait until no alert is pending or being sent
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            counts = self.queue.counts()
+            if not counts.get(PENDING) and not counts.get(SENDING):
+                return True
+            time.sleep(0.01)
+        return False
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        Delivery counters, queue depth, latency percentiles and throughput
+        """
+        with self._metrics_lock:
+            metrics = dict(self._counters)
+            latencies = sorted(self._latencies)
+
+        if latencies:
+            metrics['latency_p50_ms'] = latencies[len(latencies) // 2] * 1000
+            metrics['latency_p99_ms'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        uptime = time.time() - self._started_at if self._started_at else 0.0
+        metrics['throughput_per_s'] = metrics['sent'] / uptime if uptime > 0 else 0.0
+        metrics['queue_depth'] = self.queue.counts().get(PENDING, 0)
+        return metrics
+
+
+def transports_from_env() -> Dict[str, object]:
+    """
+    SMTP and SMS transports for whichever credentials are set in the environment
+    """
+    transports = {}
+    if os.getenv('EMAIL_SMTP_SERVER') and os.getenv('EMAIL_USERNAME'):
+        transports['email'] = SMTPTransport(
+            os.getenv('EMAIL_SMTP_SERVER'), int(os.getenv('EMAIL_SMTP_PORT', '587')),
+            username=os.getenv('EMAIL_USERNAME'), password=os.getenv('EMAIL_PASSWORD')
+        )
+    if os.getenv('TWILIO_ACCOUNT_SID') and os.getenv('TWILIO_AUTH_TOKEN'):
+        transports['sms'] = SMSTransport(
+            os.getenv('TWILIO_ACCOUNT_SID'), os.getenv('TWILIO_AUTH_TOKEN'), os.getenv('TWILIO_PHONE_NUMBER', '')
+        )
+    return transports
+
+
+_dispatcher: Optional[AlertDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> AlertDispatcher:
+    """
+    The process-wide dispatcher, started on first use
+    """
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                dispatcher = AlertDispatcher(AlertQueue(os.getenv('ALERT_QUEUE_PATH', DEFAULT_QUEUE_PATH)),
+                                             transports_from_env())
+                dispatcher.start()
+                _dispatcher = dispatcher
+    return _dispatcher
+
+
+def queue_emergency_alert(message: str, phone: Optional[str] = None, email: Optional[str] = None,
+                          dispatcher: Optional[AlertDispatcher] = None) -> Dict[str, Optional[int]]:
+    """
+    Queue an emergency message to a contact on every configured channel.
+
+    Returns {channel: alert id}; the id is None when the same message was
+    already sent to that contact within the dedup window.
+    """
+    dispatcher = dispatcher or get_dispatcher()
+    # Timestamps differ between otherwise identical messages
+    fingerprint = hashlib.sha1('\n'.join(line for line in message.splitlines()
+                                         if not line.startswith('Time:')).encode('utf-8')).hexdigest()[:16]
+
+    queued = {}
+    for channel, recipient in (('sms', phone), ('email', email)):
+        if recipient and channel in dispatcher.transports:
+            queued[channel] = dispatcher.enqueue(channel, recipient, message, subject='🚨 Emergency Alert',
+                                                 dedup_key=f"{channel}:{recipient}:{fingerprint}")
+    return queued
@@ -0,0 +1,246 @@
+"""
+Packed-bit symptom x disease matrix for Smart Health Companion
+
+Each disease row stores its symptoms as bits in little-endian uint64
+words, so 64 symptoms take 8 bytes instead of 64 floats. Overlap between
+a request and every disease is an AND plus a popcount per word.
+"""
+
+import csv
+import json
+import os
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+# On-disk layout: magic, uint32 header length, JSON header, zero padding up
+# to an 8-byte boundary, then the raw (n_rows x n_words) '<u8' words
+BITSET_MAGIC = b'SHCBITS1'
+_WORD_BITS = 64
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(words: np.ndarray) -> np.ndarray:
+        """
+        Number of set bits in every uint64 word
+        """
+        return np.bitwise_count(words)
+else:
+    _BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount(words: np.ndarray) -> np.ndarray:
+        """
+        Number of set bits in every uint64 word
+        """
+        counts = _BYTE_POPCOUNT[np.ascontiguousarray(words).view(np.uint8)]
+        return counts.reshape(words.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+
+def pack_rows(dense) -> np.ndarray:
+    """
+    Pack a 0/1 (n_rows x n_bits) matrix into (n_rows x n_words) uint64 words
+    """
+    dense = np.asarray(dense) != 0
+    n_rows, n_bits = dense.shape
+    n_words = max(1, -(-n_bits // _WORD_BITS))
+
+    packed = np.packbits(dense, axis=1, bitorder='little')
+    padded = np.zeros((n_rows, n_words * 8), dtype=np.uint8)
+    padded[:, :packed.shape[1]] = packed
+    return padded.view('<u8')
+
+
+class BitsetMatrix:
+    """
+    Binary matrix with rows packed into uint64 words
+    """
+
+    def __init__(self, words: np.ndarray, n_bits: int, row_labels: Sequence[str],
+                 column_labels: Sequence[str]):
+        if words.ndim != 2 or words.shape[0] != len(row_labels):
+            raise ValueError(f"Words shape {words.shape} does not match {len(row_labels)} rows")
+        if len(column_labels) != n_bits or words.shape[1] * _WORD_BITS < n_bits:
+            raise ValueError(f"{words.shape[1]} words cannot hold {n_bits} columns")
+
+        self.words = words
+        self.n_bits = n_bits
+        self.row_labels = list(row_labels)
+        self.column_labels = list(column_labels)
+        self.row_counts = popcount(words).sum(axis=1, dtype=np.int64)
+
+    @classmethod
+    def from_dense(cls, dense, row_labels: Sequence[str], column_labels: Sequence[str]):
+        """
+        Pack a dense 0/1 (rows x columns) matrix
+        """
+        return cls(pack_rows(dense), len(column_labels), row_labels, column_labels)
+
+    @classmethod
+    def from_csv(cls, filepath: str = 'data/symptoms.csv'):
+        """
+        Pack the symptom-row / disease-column CSV into disease rows of symptom bits
+        """
+        with open(filepath, newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            rows = [row for row in reader if row]
+
+        symptoms = [row[0] for row in rows]
+        dense = np.array([row[1:] for row in rows], dtype=np.uint8).T
+        return cls.from_dense(dense, header[1:], symptoms)
+
+    @property
+    def n_rows(self) -> int:
+        return self.words.shape[0]
+
+    @property
+    def n_words(self) -> int:
+        return self.words.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.words.nbytes
+
+    def to_dense(self) -> np.ndarray:
+        """
+        Unpack into a dense uint8 (rows x columns) matrix
+        """
+        bits = np.unpackbits(np.ascontiguousarray(self.words).view(np.uint8), axis=1, bitorder='little')
+        return bits[:, :self.n_bits]
+
+    def pack_indices(self, indices: Sequence[int]) -> np.ndarray:
+        """
+        Query words with the given column indices set
+        """
+        indices = np.asarray(indices, dtype=np.uint64)
+        query = np.zeros(self.n_words, dtype=np.uint64)
+        np.bitwise_or.at(query, (indices >> np.uint64(6)).astype(np.intp),
+                         np.uint64(1) << (indices & np.uint64(63)))
+        return query
+
+    def pack_vector(self, features) -> np.ndarray:
+        """
+        Query words from a dense 0/1 feature vector
+        """
+        return pack_rows(np.asarray(features).reshape(1, -1))[0]
+
+    def pack_csr(self, features) -> np.ndarray:
+        """
+        Query words for every row of a sparse CSR (n_queries x n_columns) matrix
+        """
+        indices = features.indices.astype(np.uint64)
+        rows = np.repeat(np.arange(features.shape[0]), np.diff(features.indptr))
+        queries = np.zeros((features.shape[0], self.n_words), dtype=np.uint64)
+        np.bitwise_or.at(queries, (rows, (indices >> np.uint64(6)).astype(np.intp)),
+                         np.uint64(1) << (indices & np.uint64(63)))
+        return queries
+
+    def overlap(self, query: np.ndarray) -> np.ndarray:
+        """
+        Number of shared bits between the query and every row
+        """
+        return popcount(self.words & query).sum(axis=-1, dtype=np.int64)
+
+    def overlap_many(self, queries: np.ndarray, max_block_bytes: int = 32 * 1024 * 1024) -> np.ndarray:
+        """
+        (n_queries x n_rows) overlap counts, computed in blocks of queries
+        """
+        result = np.empty((queries.shape[0], self.n_rows), dtype=np.int64)
+        block = max(1, max_block_bytes // max(1, self.words.nbytes))
+        for start in range(0, queries.shape[0], block):
+            chunk = queries[start:start + block, None, :] & self.words[None, :, :]
+            result[start:start + block] = popcount(chunk).sum(axis=-1, dtype=np.int64)
+        return result
+
+    def jaccard(self, query: np.ndarray) -> np.ndarray:
+        """
+        Jaccard similarity |row & query| / |row | query| for every row
+        """
+        shared = self.overlap(query)
+        union = self.row_counts + int(popcount(query).sum()) - shared
+        return np.divide(shared, union, out=np.zeros(len(shared)), where=union > 0)
+
+    def save(self, filepath: str):
+        """
+        Write the compact binary file format
+        """
+        header = json.dumps({
+            'n_rows': self.n_rows,
+            'n_bits': self.n_bits,
+            'n_words': self.n_words,
+            'row_labels': self.row_labels,
+            'column_labels': self.column_labels,
+        }).encode('utf-8')
+
+        prefix = len(BITSET_MAGIC) + 4 + len(header)
+        padding = b'\0' * (-prefix % 8)
+
+        # Per-process temp file: several workers may regenerate the file at once
+        tmp_path = f"{filepath}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(BITSET_MAGIC)
+            f.write(len(header).to_bytes(4, 'little'))
+            f.write(header)
+            f.write(padding)
+            f.write(np.ascontiguousarray(self.words, dtype='<u8').tobytes())
+        os.replace(tmp_path, filepath)
+
+    @classmethod
+    def load(cls, filepath: str, mmap: bool = True):
+        """
+        Read a file written by save(); words are memory-mapped by default
+        """
+        with open(filepath, 'rb') as f:
+            if f.read(len(BITSET_MAGIC)) != BITSET_MAGIC:
+                raise ValueError(f"{filepath} is not a symptom bitset file")
+            header_length = int.from_bytes(f.read(4), 'little')
+            header = json.loads(f.read(header_length))
+
+        prefix = len(BITSET_MAGIC) + 4 + header_length
+        offset = prefix + (-prefix % 8)
+        shape = (header['n_rows'], header['n_words'])
+
+        if mmap:
+            words = np.memmap(filepath, dtype='<u8', mode='r', offset=offset, shape=shape)
+        else:
+            words = np.fromfile(filepath, dtype='<u8', offset=offset).reshape(shape)
+
+        return cls(words, header['n_bits'], header['row_labels'], header['column_labels'])
+
+
+def build_bitset_file(csv_path: str = 'data/symptoms.csv', bits_path: Optional[str] = None) -> str:
+    """
+    Generate the binary matrix file from the CSV dataset and return its path
+    """
+    bits_path = bits_path or os.path.splitext(csv_path)[0] + '.bits'
+    BitsetMatrix.from_csv(csv_path).save(bits_path)
+    return bits_path
+
+
+def load_bitset(csv_path: str = 'data/symptoms.csv', bits_path: Optional[str] = None) -> BitsetMatrix:
+    """
+    Load the binary matrix file, regenerating it when the CSV is newer
+    """
+    bits_path = bits_path or os.path.splitext(csv_path)[0] + '.bits'
+    if not os.path.exists(bits_path) or os.path.getmtime(bits_path) < os.path.getmtime(csv_path):
+        build_bitset_file(csv_path, bits_path)
+    return BitsetMatrix.load(bits_path)
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Build data/symptoms.bits from data/symptoms.csv
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate the packed symptom bitset file")
+    parser.add_argument('csv_path', nargs='?', default='data/symptoms.csv')
+    parser.add_argument('-o', '--output', help="Output path (default: <csv>.bits)")
+    args = parser.parse_args(argv)
+
+    path = build_bitset_file(args.csv_path, args.output)
+    matrix = BitsetMatrix.load(path)
+    print(f"Wrote {path}: {matrix.n_rows} diseases x {matrix.n_bits} symptoms in {matrix.nbytes} bytes")
+
+
+if __name__ == "__main__":
+    main()
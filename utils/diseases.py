@@ -0,0 +1,189 @@
+"""
+Disease content store for Smart Health Companion
+
+Every condition lives in its own JSON file under data/diseases/
+(description, symptoms, keywords, first aid, diet, emergency signs).
+A small index.json lists the conditions and maps each symptom and
+keyword to the conditions that mention it. Only the index is read at
+startup; a condition's file is opened the first time it is requested and
+kept in an LRU cache, so the size of the catalog does not affect startup
+time and every lookup is a dictionary access.
+
+Rebuild the index after adding or editing files:
+
+    python -m utils.diseases
+"""
+
+import csv
+import json
+import os
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+DISEASES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'diseases')
+SYMPTOMS_CSV_PATH = os.path.join(os.path.dirname(DISEASES_DIR), 'symptoms.csv')
+INDEX_NAME = 'index.json'
+INDEX_VERSION = 1
+
+_NON_WORD_PATTERN = re.compile(r'[^a-z0-9]+')
+
+
+def disease_key(name: str) -> str:
+    """
+    Lookup key and file stem for a condition: 'Common Cold' -> 'common_cold'
+    """
+    return _NON_WORD_PATTERN.sub('_', (name or '').lower()).strip('_')
+
+
+def normalize_term(term: str) -> str:
+    return ' '.join(_NON_WORD_PATTERN.sub(' ', (term or '').lower()).split())
+
+
+def build_index(directory: str = DISEASES_DIR, symptoms_csv: Optional[str] = SYMPTOMS_CSV_PATH) -> Dict:
+    """
+    Scan the per-disease JSON files and return the index.
+
+    Terms come from each file's 'symptoms' and 'keywords'; when the
+    training dataset is available its symptom columns are added too.
+    """
+    diseases = {}
+    terms: Dict[str, List[str]] = {}
+
+    def add_term(term: str, key: str):
+        term = normalize_term(term)
+        if term:
+            entries = terms.setdefault(term, [])
+            if key not in entries:
+                entries.append(key)
+
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.json') or filename == INDEX_NAME:
+            continue
+        with open(os.path.join(directory, filename), encoding='utf-8') as f:
+            doc = json.load(f)
+
+        key = disease_key(doc['name'])
+        diseases[key] = {'name': doc['name'], 'file': filename}
+        for term in doc.get('symptoms', []) + doc.get('keywords', []):
+            add_term(term, key)
+
+    if symptoms_csv and os.path.exists(symptoms_csv):
+        with open(symptoms_csv, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            columns = [disease_key(label) for label in next(reader)[1:]]
+            for row in reader:
+                for key, flag in zip(columns, row[1:]):
+                    if key in diseases and flag.strip() == '1':
+                        add_term(row[0].replace('_', ' '), key)
+
+    return {'version': INDEX_VERSION, 'diseases': diseases, 'terms': terms}
+
+
+def write_index(directory: str = DISEASES_DIR, symptoms_csv: Optional[str] = SYMPTOMS_CSV_PATH) -> Dict:
+    index = build_index(directory, symptoms_csv)
+    tmp_path = os.path.join(directory, f"{INDEX_NAME}.tmp-{os.getpid()}")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp_path, os.path.join(directory, INDEX_NAME))
+    return index
+
+
+class DiseaseContentStore:
+    """
+    Lazily loaded, LRU-cached access to per-disease content
+    """
+
+    def __init__(self, directory: str = DISEASES_DIR, cache_size: int = 256):
+        self.directory = directory
+        self._index = None
+        self._lock = threading.Lock()
+        self._load = lru_cache(maxsize=cache_size)(self._load_uncached)
+
+    @property
+    def index(self) -> Dict:
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    path = os.path.join(self.directory, INDEX_NAME)
+                    if os.path.exists(path):
+                        with open(path, encoding='utf-8') as f:
+                            index = json.load(f)
+                    else:
+                        index = build_index(self.directory)
+                    if index.get('version') != INDEX_VERSION:
+                        raise ValueError(f"Unsupported disease index version in {path}")
+                    self._index = index
+        return self._index
+
+    def names(self) -> List[str]:
+        """
+        Display names of every condition in the catalog
+        """
+        return [entry['name'] for entry in self.index['diseases'].values()]
+
+    def __contains__(self, name: str) -> bool:
+        return disease_key(name) in self.index['diseases']
+
+    def __len__(self) -> int:
+        return len(self.index['diseases'])
+
+    def _load_uncached(self, key: str) -> Optional[Dict]:
+        entry = self.index['diseases'].get(key)
+        if entry is None:
+            return None
+        with open(os.path.join(self.directory, entry['file']), encoding='utf-8') as f:
+            return json.load(f)
+
+    def get(self, name: str) -> Optional[Dict]:
+        """
+        Content for a condition by display name or key, or None if unknown
+        """
+        return self._load(disease_key(name))
+
+    def search(self, term: str) -> List[str]:
+        """
+        Conditions that list a symptom or keyword
+        """
+        keys = self.index['terms'].get(normalize_term(term), [])
+        return [self.index['diseases'][key]['name'] for key in keys]
+
+    def related(self, terms: Iterable[str], limit: int = 5) -> List[str]:
+        """
+        Conditions ranked by how many of the given symptoms/keywords they mention
+        """
+        counts = Counter()
+        for term in terms:
+            counts.update(self.index['terms'].get(normalize_term(term), []))
+        names = self.index['diseases']
+        return [names[key]['name'] for key, _ in counts.most_common(limit)]
+
+    def cache_info(self):
+        return self._load.cache_info()
+
+
+@lru_cache(maxsize=4)
+def get_content_store(directory: str = DISEASES_DIR) -> DiseaseContentStore:
+    """
+    The content store for a directory, shared per process
+    """
+    return DiseaseContentStore(directory)
+
+
+def get_disease_info(name: str) -> Optional[Dict]:
+    """
+    Description, symptoms, first aid, diet and emergency signs for a condition
+    """
+    return get_content_store().get(name)
+
+
+def main():
+    index = write_index()
+    print(f"Indexed {len(index['diseases'])} diseases, {len(index['terms'])} terms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Multi-process prediction for Smart Health Companion
+
+Streamlit serves every session from one process, so CPU-bound scoring
+is serialized by the GIL. A PredictionExecutor runs it on a pool of
+worker processes instead. Each worker loads the model once, in the pool
+initializer, and keeps it warm. Requests travel as lists of integer
+symptom columns: the calling process extracts symptoms from the text and
+sends only their indices, and workers send back (disease, probability)
+pairs.
+
+Enabled in the app with PREDICTION_WORKERS=<n>; the batch CLI takes
+--workers. From async code, `await executor.predict_async(text)`.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import warnings
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from utils.prediction import PredictionEngine, prediction_results, rank_features
+
+DEFAULT_DATA_PATH = 'data/symptoms.csv'
+# Streamlit and the API run threads, and forking a threaded process can deadlock
+START_METHOD = 'spawn'
+# Seconds warm_up waits for every worker to start and load its model
+WARM_UP_TIMEOUT = 120
+
+# Per-worker state, set by _init_worker: (registry or None, engine)
+_worker_state = None
+_warm_up_barrier = None
+
+
+def _init_worker(model_path: Optional[str], mapping_path: Optional[str], data_path: str,
+                 cascade_margin: Optional[float], warm_up_barrier):
+    global _worker_state, _warm_up_barrier
+    _warm_up_barrier = warm_up_barrier
+    if model_path:
+        from model.registry import DEFAULT_MAPPING_PATH, ModelRegistry
+
+        registry = ModelRegistry(model_path=model_path, mapping_path=mapping_path or DEFAULT_MAPPING_PATH,
+                                 data_path=data_path, cascade_margin=cascade_margin)
+        registry.get()
+        _worker_state = (registry, None)
+    else:
+        _worker_state = (None, PredictionEngine.from_dataset(data_path))
+
+
+def _predict_one(indices: List[int], top_k: Optional[int]):
+    registry, engine = _worker_state
+    if registry is not None:
+        bundle = registry.get()
+        return bundle.predict_indices(bundle.encoder.check_indices(indices), top_k=top_k)
+    return engine.predict(engine.encoder.row(engine.encoder.check_indices(indices)), top_k=top_k)
+
+
+def _rank_chunk(index_lists: List[List[int]], top_k: int) -> Tuple[List, Optional[List[str]]]:
+    registry, engine = _worker_state
+    if registry is not None:
+        bundle = registry.get()
+        features = bundle.encoder.transform_indices(index_lists)
+        return rank_features(features, bundle.engine, model=bundle.model, top_k=top_k,
+                             cascade_margin=bundle.cascade_margin)
+    return rank_features(engine.encoder.transform_indices(index_lists), engine, top_k=top_k)
+
+
+def _ping(timeout: float) -> int:
+    # Each worker holds its ping until all workers have one, so no worker answers two
+    _warm_up_barrier.wait(timeout)
+    return os.getpid()
+
+
+class PredictionExecutor:
+    """
+    Process pool that scores symptom index lists with a warm model per worker
+    """
+
+    def __init__(self, workers: Optional[int] = None, model_path: Optional[str] = None,
+                 mapping_path: Optional[str] = None, data_path: str = DEFAULT_DATA_PATH,
+                 cascade_margin: Optional[float] = None):
+        self.workers = workers or os.cpu_count() or 1
+        # The model is validated against this dataset, so its columns are the model's
+        self.encoder = PredictionEngine.from_dataset(data_path).encoder
+        context = multiprocessing.get_context(START_METHOD)
+        # Handed to the workers at start-up; synchronization objects cannot be sent later
+        self._warm_up_barrier = context.Barrier(self.workers)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(model_path, mapping_path, data_path, cascade_margin, self._warm_up_barrier),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+    def warm_up(self, timeout: float = WARM_UP_TIMEOUT) -> List[int]:
+        """
+        Start every worker (loading its model) now instead of on the first
+        request. Returns once all of them are up, with their distinct pids.
+        """
+        futures = [self._pool.submit(_ping, timeout) for _ in range(self.workers)]
+        wait(futures)
+        if any(future.exception() is not None for future in futures):
+            # A timed-out wait leaves the barrier broken; reset it so warm_up can be retried
+            self._warm_up_barrier.reset()
+        return [future.result() for future in futures]
+
+    def encode(self, text: str) -> List[int]:
+        """
+        Symptom columns mentioned in free text
+        """
+        return self.encoder.indices(self.encoder.extract(text)).tolist()
+
+    def submit_indices(self, indices: Sequence[int], top_k: Optional[int] = None) -> Future:
+        """
+        Future of (disease, probability), or of a ranked list when top_k is given
+        """
+        return self._pool.submit(_predict_one, list(indices), top_k)
+
+    def submit(self, text: str, top_k: Optional[int] = None) -> Future:
+        return self.submit_indices(self.encode(text), top_k)
+
+    def predict(self, text: str, top_k: Optional[int] = None):
+        """
+        Predict in a worker process and wait for the result
+        """
+        return self.submit(text, top_k).result()
+
+    async def predict_async(self, text: str, top_k: Optional[int] = None):
+        """
+        Predict in a worker process without blocking the event loop
+        """
+        return await asyncio.wrap_future(self.submit(text, top_k))
+
+    def iter_predictions(self, texts: Iterable[str], chunk_size: int = 1000, top_k: int = 1,
+                         max_pending: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Stream predictions like utils.prediction.iter_predictions, scoring
+        chunks in parallel. At most max_pending chunks (default: two per
+        worker) are in flight, and results keep the input order.
+        """
+        max_pending = max_pending or 2 * self.workers
+        pending = deque()
+        texts = iter(texts)
+        while True:
+            chunk = list(islice(texts, chunk_size))
+            if chunk:
+                symptom_lists = [self.encoder.extract(text) for text in chunk]
+                index_lists = [self.encoder.indices(symptoms).tolist() for symptoms in symptom_lists]
+                pending.append((symptom_lists, self._pool.submit(_rank_chunk, index_lists, top_k)))
+            if pending and (not chunk or len(pending) >= max_pending):
+                symptom_lists, future = pending.popleft()
+                ranked, tiers = future.result()
+                yield from prediction_results(symptom_lists, ranked, tiers)
+            if not chunk and not pending:
+                break
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+
+_executor: Optional[PredictionExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_prediction_executor() -> Optional[PredictionExecutor]:
+    """
+    The process-wide executor when PREDICTION_WORKERS is set, else None.
+    Workers serve the same model as model.registry.get_registry().
+    """
+    global _executor
+    setting = os.getenv('PREDICTION_WORKERS') or '0'
+    try:
+        workers = int(setting)
+    except ValueError:
+        warnings.warn(f"Ignoring PREDICTION_WORKERS={setting!r}: expected a number of workers, scoring in process")
+        return None
+    if workers <= 0:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                from model.registry import get_registry
+
+                registry = get_registry()
+                _executor = PredictionExecutor(
+                    workers=workers,
+                    model_path=registry.model_path,
+                    mapping_path=registry.mapping_path,
+                    data_path=registry.data_path,
+                    cascade_margin=registry.cascade_margin,
+                )
+    return _executor
@@ -0,0 +1,144 @@
+"""
+Symptom feature encoding shared by training and inference
+
+A SymptomEncoder is built from the symptom -> column mapping saved next
+to the model (model/symptom_mapping.pkl), so the training matrix, the
+forest, the matrix engine and the batch CLI all agree on column order.
+It emits multi-hot scipy CSR rows for single requests and batches alike;
+only the column indices of the reported symptoms are materialized, never
+a Python list or dense vector the width of the vocabulary.
+"""
+
+import pickle
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from utils.helpers import clean_symptoms_text
+from utils.matching import SymptomMatcher
+
+_EMPTY_INDICES = np.empty(0, dtype=np.int32)
+
+
+class SymptomEncoder:
+    """
+    Maps symptom names to feature columns and builds sparse multi-hot rows
+    """
+
+    def __init__(self, mapping: Dict[str, int]):
+        if sorted(mapping.values()) != list(range(len(mapping))):
+            raise ValueError("Symptom mapping must assign columns 0..n-1, each exactly once")
+
+        self.mapping = dict(mapping)
+        self.symptoms = sorted(self.mapping, key=self.mapping.__getitem__)
+        # Accept dataset labels ('sore_throat') and text phrases ('sore throat')
+        self._lookup = dict(self.mapping)
+        for symptom, index in self.mapping.items():
+            self._lookup.setdefault(symptom.replace('_', ' '), index)
+        self.matcher = SymptomMatcher(symptom.replace('_', ' ') for symptom in self.symptoms)
+
+    @classmethod
+    def from_symptoms(cls, symptoms: Sequence[str]):
+        """
+        Encoder whose columns follow the given symptom order
+        """
+        return cls({symptom: i for i, symptom in enumerate(symptoms)})
+
+    @classmethod
+    def load(cls, filepath: str):
+        """
+        Load a {symptom: column} mapping pickled by train_model
+        """
+        with open(filepath, 'rb') as f:
+            return cls(pickle.load(f))
+
+    def save(self, filepath: str):
+        with open(filepath, 'wb') as f:
+            pickle.dump(self.mapping, f)
+
+    @property
+    def n_features(self) -> int:
+        return len(self.mapping)
+
+    def __len__(self) -> int:
+        return len(self.mapping)
+
+    def extract(self, text: str) -> List[str]:
+        """
+        Known symptoms mentioned in free text, in column order
+        """
+        return self.matcher.extract(clean_symptoms_text(text))
+
+    def indices(self, symptoms: Iterable[str]) -> np.ndarray:
+        """
+        Sorted, unique int32 columns of the known symptoms; unknown names are ignored
+        """
+        lookup = self._lookup.get
+        columns = {lookup(symptom) for symptom in symptoms}
+        columns.discard(None)
+        if not columns:
+            return _EMPTY_INDICES
+        indices = np.fromiter(columns, dtype=np.int32, count=len(columns))
+        indices.sort()
+        return indices
+
+    def _csr(self, indices: np.ndarray, indptr: np.ndarray) -> sparse.csr_matrix:
+        data = np.ones(len(indices), dtype=np.float32)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, self.n_features), copy=False)
+
+    def _stack(self, rows: List[np.ndarray]) -> sparse.csr_matrix:
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, rows), dtype=np.int64, count=len(rows)), out=indptr[1:])
+        if indptr[-1] <= np.iinfo(np.int32).max:
+            # Matching int32 index arrays spare scipy an index dtype conversion
+            indptr = indptr.astype(np.int32)
+        indices = np.concatenate(rows) if rows else _EMPTY_INDICES
+        return self._csr(indices, indptr)
+
+    def check_indices(self, columns: Sequence[int]) -> np.ndarray:
+        """
+        Sorted, unique int32 columns from any sequence of column indices
+        """
+        columns = np.unique(np.asarray(columns, dtype=np.int32))
+        if len(columns) and (columns[0] < 0 or columns[-1] >= self.n_features):
+            raise ValueError(f"Column index out of range for {self.n_features} symptoms")
+        return columns
+
+    def row(self, indices: np.ndarray) -> sparse.csr_matrix:
+        """
+        (1 x n_features) row from sorted, unique int32 columns
+        """
+        return self._csr(indices, np.array([0, len(indices)], dtype=np.int32))
+
+    def transform_one(self, symptoms: Iterable[str]) -> sparse.csr_matrix:
+        """
+        (1 x n_features) row for one request
+        """
+        return self.row(self.indices(symptoms))
+
+    def transform(self, symptom_lists: Sequence[Iterable[str]]) -> sparse.csr_matrix:
+        """
+        (n_requests x n_features) matrix, one row per list of symptom names
+        """
+        return self._stack([self.indices(symptoms) for symptoms in symptom_lists])
+
+    def transform_indices(self, index_lists: Sequence[Sequence[int]]) -> sparse.csr_matrix:
+        """
+        (n_requests x n_features) matrix from lists of column indices
+        """
+        return self._stack([self.check_indices(columns) for columns in index_lists])
+
+    def transform_text(self, texts: Sequence[str]) -> sparse.csr_matrix:
+        """
+        (n_texts x n_features) matrix from free-text complaints
+        """
+        return self.transform([self.extract(text) for text in texts])
+
+    def dense(self, symptoms: Iterable[str]) -> np.ndarray:
+        """
+        Dense float32 0/1 vector, for callers that need one
+        """
+        features = np.zeros(self.n_features, dtype=np.float32)
+        features[self.indices(symptoms)] = 1.0
+        return features
@@ -0,0 +1,267 @@
+"""
+Geocoding for free-text locations in Smart Health Companion
+
+Locations are resolved in order: literal 'lat, lng' coordinates, an
+in-memory and on-disk cache, then each configured backend. The local
+gazetteer (data/gazetteer.csv) answers common city names offline; an
+optional HTTP backend (GEOCODER_URL) handles everything else through a
+pooled session, coalescing concurrent lookups of the same place into a
+single request. Results and misses are both cached, so repeated lookups
+never cost another remote round-trip.
+"""
+
+import csv
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from utils.cache import PersistentTTLCache, TTLCache
+from utils.instrumentation import timed
+
+GAZETTEER_CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'data', 'gazetteer.csv')
+DEFAULT_CACHE_PATH = '.cache/geocode_cache.sqlite'
+
+_COORDINATES_PATTERN = re.compile(r'^\s*\(?\s*([-+]?\d+(?:\.\d+)?)\s*[,;\s]\s*([-+]?\d+(?:\.\d+)?)\s*\)?\s*$')
+_NON_WORD_PATTERN = re.compile(r'[^\w]+')
+
+
+def parse_coordinates(location: str) -> Optional[Tuple[float, float]]:
+    """
+    Parse 'lat, lng' text into a (lat, lng) pair, or None
+    """
+    match = _COORDINATES_PATTERN.match(location or '')
+    if not match:
+        return None
+
+    lat, lng = float(match.group(1)), float(match.group(2))
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def normalize_query(text: str) -> str:
+    """
+    Cache key for a location: lowercase words separated by single spaces
+    """
+    return ' '.join(_NON_WORD_PATTERN.sub(' ', (text or '').lower()).split())
+
+
+class GeocoderBackend:
+    """
+    Interface for geocoding backends.
+
+    geocode() returns {'lat', 'lng', 'label'} or None when the place is
+    unknown, and raises on transient failures so the miss is not cached.
+    """
+
+    name = 'backend'
+
+    def geocode(self, query: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+
+class GazetteerBackend(GeocoderBackend):
+    """
+    Offline lookup of place names and aliases from a CSV gazetteer
+    """
+
+    name = 'gazetteer'
+
+    def __init__(self, filepath: str = GAZETTEER_CSV_PATH):
+        self._places = {}
+        with open(filepath, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                place = {
+                    'lat': float(row['lat']),
+                    'lng': float(row['lng']),
+                    'label': f"{row['name']}, {row['country']}" if row.get('country') else row['name']
+                }
+                names = [row['name']] + [alias for alias in (row.get('aliases') or '').split('|') if alias]
+                for name in names:
+                    self._places.setdefault(normalize_query(name), place)
+                    if row.get('country'):
+                        self._places.setdefault(normalize_query(f"{name} {row['country']}"), place)
+
+    def __len__(self) -> int:
+        return len(self._places)
+
+    def geocode(self, query: str) -> Optional[Dict]:
+        place = self._places.get(normalize_query(query))
+        if place:
+            return dict(place)
+
+        # Addresses usually end with the city: try comma-separated parts from the right
+        for part in reversed(query.split(',')):
+            place = self._places.get(normalize_query(part))
+            if place:
+                return dict(place)
+        return None
+
+
+class HTTPGeocoderBackend(GeocoderBackend):
+    """
+    Remote geocoder speaking the Nominatim-style JSON API.
+
+    Requests share one pooled requests.Session; concurrent lookups of the
+    same query wait for the first one instead of issuing their own.
+    """
+
+    name = 'http'
+
+    def __init__(self, url: str, timeout: float = 5.0, pool_size: int = 10,
+                 params: Optional[Dict] = None, headers: Optional[Dict] = None):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.url = url
+        self.timeout = timeout
+        self.params = {'format': 'json', 'limit': 1, **(params or {})}
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': 'SmartHealthCompanion/1.0', **(headers or {})})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.requests_sent = 0
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def geocode(self, query: str) -> Optional[Dict]:
+        key = normalize_query(query)
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            return future.result(timeout=self.timeout * 2)
+
+        try:
+            result = self._fetch(query)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _fetch(self, query: str) -> Optional[Dict]:
+        self.requests_sent += 1
+        response = self.session.get(self.url, params={**self.params, 'q': query}, timeout=self.timeout)
+        response.raise_for_status()
+
+        data = response.json()
+        if isinstance(data, list):
+            data = data[0] if data else None
+        if not data or 'lat' not in data:
+            return None
+
+        return {
+            'lat': float(data['lat']),
+            'lng': float(data.get('lng', data.get('lon'))),
+            'label': data.get('display_name') or data.get('label') or query
+        }
+
+    def close(self):
+        self.session.close()
+
+
+class Geocoder:
+    """
+    Resolves free-text locations through caches and a chain of backends
+    """
+
+    def __init__(self, backends: List[GeocoderBackend], cache: Optional[PersistentTTLCache] = None,
+                 memory_size: int = 1024, negative_ttl: float = 24 * 3600.0):
+        self.backends = backends
+        self.cache = cache
+        self.negative_ttl = negative_ttl
+        self._memory = TTLCache(maxsize=memory_size, ttl=None)
+
+    def geocode(self, location: str) -> Optional[Dict]:
+        """
+        Return {'lat', 'lng', 'label', 'source'} for a location, or None
+        """
+        coordinates = parse_coordinates(location)
+        if coordinates:
+            lat, lng = coordinates
+            return {'lat': lat, 'lng': lng, 'label': f"{lat:.4f}, {lng:.4f}", 'source': 'coordinates'}
+
+        key = normalize_query(location)
+        if not key:
+            return None
+
+        # An empty dict records a known miss
+        result = self._memory.get(key)
+        if result is None and self.cache is not None:
+            result = self.cache.get(key)
+            if result is not None:
+                self._memory.set(key, result)
+        if result is not None:
+            return result or None
+
+        failed = False
+        for backend in self.backends:
+            try:
+                result = backend.geocode(location)
+            except Exception:
+                # Transient backend failure: try the next one, cache nothing
+                failed = True
+                continue
+            if result:
+                result = dict(result, source=backend.name)
+                break
+
+        if result:
+            self._store(key, result)
+        elif not failed:
+            self._store(key, {}, ttl=self.negative_ttl)
+        return result or None
+
+    def _store(self, key: str, value: Dict, ttl: Optional[float] = None):
+        self._memory.set(key, value, ttl=ttl)
+        if self.cache is not None:
+            self.cache.set(key, value, ttl=ttl)
+
+
+_geocoder: Optional[Geocoder] = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder() -> Geocoder:
+    """
+    The process-wide geocoder configured from the environment
+    """
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                backends: List[GeocoderBackend] = [GazetteerBackend()]
+                if os.getenv('GEOCODER_URL'):
+                    backends.append(HTTPGeocoderBackend(os.getenv('GEOCODER_URL')))
+
+                cache_path = os.getenv('GEOCODER_CACHE_PATH', DEFAULT_CACHE_PATH)
+                try:
+                    cache = PersistentTTLCache(cache_path) if cache_path else None
+                except (OSError, sqlite3.Error):
+                    # Unwritable or locked cache file: keep only the in-memory cache
+                    cache = None
+
+                _geocoder = Geocoder(backends, cache=cache)
+    return _geocoder
+
+
+@timed('geocode')
+def geocode(location: str) -> Optional[Dict]:
+    """
+    Resolve a free-text location with the default geocoder
+    """
+    return get_geocoder().geocode(location)
@@ -2,14 +2,43 @@
 Utility functions for Smart Health Companion
 """
 
-import pandas as pd
-import numpy as np
+import csv
+import os
 import re
-import json
-from typing import List, Dict, Tuple, Optional
-import requests
+from functools import lru_cache
+from typing import List, Dict, Iterable, Iterator, Tuple
 from datetime import datetime
 
+from utils.instrumentation import timed
+from utils.matching import SymptomMatcher
+from utils.triage import get_triage_engine, split_clauses
+
+# Byte-level translation table for ASCII input: everything except a-z
+# becomes a space, so 'fever,headache' keeps its word boundary
+_ASCII_TABLE = bytes(c if ord('a') <= c <= ord('z') else ord(' ') for c in range(256))
+
+# Fallback for non-ASCII input, same rules as the ASCII table
+_NON_ALPHA_PATTERN = re.compile(r'[^a-z\s]+')
+
+# Texts longer than this are normalized but not memoized
+_CACHE_MAX_TEXT_LENGTH = 2000
+
+def _normalize_text(text: str) -> str:
+    """
+    Lowercase, turn everything but a-z into spaces and collapse whitespace
+    """
+    text = text.lower()
+    
+    if text.isascii():
+        text = text.encode('ascii').translate(_ASCII_TABLE)
+        return b' '.join(text.split()).decode('ascii')
+    
+    return ' '.join(_NON_ALPHA_PATTERN.sub(' ', text).split())
+
+@lru_cache(maxsize=4096)
+def _normalize_text_cached(text: str) -> str:
+    return _normalize_text(text)
+
 def clean_symptoms_text(text: str) -> str:
     """
     Clean and normalize symptoms text input
@@ -17,96 +46,85 @@ def clean_symptoms_text(text: str) -> str:
     if not text:
         return ""
     
-    # Convert to lowercase
-    text = text.lower()
+    # Repeated inputs (common phrases, Streamlit reruns) hit the LRU cache
+    if len(text) > _CACHE_MAX_TEXT_LENGTH:
+        return _normalize_text(text)
     
-    # Remove special characters but keep spaces
-    text = re.sub(r'[^a-z\s]', '', text)
+    return _normalize_text_cached(text)
+
+def iter_clean_symptoms_text(texts: Iterable[str]) -> Iterator[str]:
+    """
+    Lazily normalize a stream of texts, one at a time
+    """
+    for text in texts:
+        yield clean_symptoms_text(text)
+
+COMMON_SYMPTOMS = [
+    'fever', 'headache', 'fatigue', 'cough', 'sore throat', 'runny nose',
+    'body pain', 'nausea', 'vomiting', 'diarrhea', 'abdominal pain',
+    'chest pain', 'shortness of breath', 'dizziness', 'loss of appetite',
+    'muscle pain', 'joint pain', 'back pain', 'neck pain', 'eye pain',
+    'ear pain', 'tooth pain', 'skin rash', 'itching', 'swelling',
+    'numbness', 'tingling', 'weakness', 'confusion', 'memory loss',
+    'anxiety', 'depression', 'insomnia', 'excessive sleep', 'weight loss',
+    'weight gain', 'sweating', 'chills', 'hot flashes', 'cold hands',
+    'palpitations', 'irregular heartbeat', 'high blood pressure',
+    'low blood pressure', 'blurred vision', 'double vision', 'blindness',
+    'hearing loss', 'ringing in ears', 'loss of balance', 'seizures',
+    'paralysis', 'speech problems', 'swallowing problems', 'constipation',
+    'blood in stool', 'blood in urine', 'frequent urination', 'painful urination'
+]
+
+SYMPTOMS_CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 'data', 'symptoms.csv')
+
+def load_symptom_vocabulary(csv_path: str = SYMPTOMS_CSV_PATH) -> List[str]:
+    """
+    Common symptoms plus every symptom in the symptoms dataset
+    """
+    vocabulary = list(COMMON_SYMPTOMS)
     
-    # Remove extra whitespace
-    text = ' '.join(text.split())
+    if os.path.exists(csv_path):
+        with open(csv_path, newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            vocabulary.extend(row[0].replace('_', ' ') for row in reader if row)
     
-    return text
+    return vocabulary
 
+# Compiled once at import; matching cost no longer grows with the vocabulary
+SYMPTOM_MATCHER = SymptomMatcher(load_symptom_vocabulary())
+
+@timed('extract_symptoms')
 def extract_symptoms_from_text(text: str) -> List[str]:
     """
     Extract individual symptoms from text input
     """
-    common_symptoms = [
-        'fever', 'headache', 'fatigue', 'cough', 'sore throat', 'runny nose',
-        'body pain', 'nausea', 'vomiting', 'diarrhea', 'abdominal pain',
-        'chest pain', 'shortness of breath', 'dizziness', 'loss of appetite',
-        'muscle pain', 'joint pain', 'back pain', 'neck pain', 'eye pain',
-        'ear pain', 'tooth pain', 'skin rash', 'itching', 'swelling',
-        'numbness', 'tingling', 'weakness', 'confusion', 'memory loss',
-        'anxiety', 'depression', 'insomnia', 'excessive sleep', 'weight loss',
-        'weight gain', 'sweating', 'chills', 'hot flashes', 'cold hands',
-        'palpitations', 'irregular heartbeat', 'high blood pressure',
-        'low blood pressure', 'blurred vision', 'double vision', 'blindness',
-        'hearing loss', 'ringing in ears', 'loss of balance', 'seizures',
-        'paralysis', 'speech problems', 'swallowing problems', 'constipation',
-        'blood in stool', 'blood in urine', 'frequent urination', 'painful urination'
-    ]
-    
     cleaned_text = clean_symptoms_text(text)
-    found_symptoms = []
-    
-    for symptom in common_symptoms:
-        if symptom in cleaned_text:
-            found_symptoms.append(symptom)
-    
-    return found_symptoms
+    return SYMPTOM_MATCHER.extract(cleaned_text)
 
 def calculate_symptom_severity(symptoms: List[str]) -> Dict[str, str]:
     """
     Calculate severity level for each symptom
     """
-    severity_levels = {
-        'mild': ['runny nose', 'mild cough', 'slight fatigue'],
-        'moderate': ['fever', 'headache', 'body pain', 'sore throat'],
-        'severe': ['chest pain', 'shortness of breath', 'severe pain', 'paralysis']
-    }
-    
-    symptom_severity = {}
-    
-    for symptom in symptoms:
-        if any(severe in symptom for severe in severity_levels['severe']):
-            symptom_severity[symptom] = 'severe'
-        elif any(moderate in symptom for moderate in severity_levels['moderate']):
-            symptom_severity[symptom] = 'moderate'
-        else:
-            symptom_severity[symptom] = 'mild'
-    
-    return symptom_severity
+    return get_triage_engine().evaluate(symptoms)['severity']
 
 def get_emergency_priority(symptoms: List[str]) -> str:
     """
     Determine emergency priority based on symptoms
     """
-    emergency_symptoms = [
-        'chest pain', 'shortness of breath', 'severe pain', 'paralysis',
-        'seizures', 'loss of consciousness', 'severe bleeding', 'head injury'
-    ]
-    
-    urgent_symptoms = [
-        'high fever', 'severe headache', 'severe vomiting', 'severe diarrhea',
-        'severe abdominal pain', 'severe dizziness', 'severe weakness'
-    ]
-    
-    for symptom in symptoms:
-        if any(emergency in symptom for emergency in emergency_symptoms):
-            return 'immediate'
-        elif any(urgent in symptom for urgent in urgent_symptoms):
-            return 'urgent'
-    
-    return 'routine'
+    return get_triage_engine().priority(symptoms)
 
-def format_emergency_message(patient_info: Dict, symptoms: List[str], location: str) -> str:
+def format_emergency_message(patient_info: Dict, symptoms: List[str], location: str,
+                             description: str = '') -> str:
     """
     Format emergency alert message
+
+    When the patient's own description is given, severity is triaged from
+    its clauses so negations and modifiers count; symptoms are only listed.
     """
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    severity = get_emergency_priority(symptoms)
+    severity = get_emergency_priority(split_clauses(description) if description else symptoms)
     
     message = f"""
 🚨 EMERGENCY ALERT 🚨
@@ -0,0 +1,138 @@
+"""
+Hospital lookup for Smart Health Companion
+
+Hospitals are loaded from data/hospitals.csv into a ball tree on the
+haversine metric, which answers k-nearest and within-radius queries in
+logarithmic time. Distances are then computed exactly with a vectorized
+haversine formula and results are ranked by distance and rating.
+Search locations are resolved by utils.geocoding.
+"""
+
+import csv
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from utils.geocoding import geocode
+from utils.instrumentation import timed
+
+EARTH_RADIUS_KM = 6371.0088
+
+HOSPITALS_CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'data', 'hospitals.csv')
+
+def haversine_km(lat: float, lng: float, lats, lngs) -> np.ndarray:
+    """
+    Great-circle distance in km from one point to arrays of points (degrees)
+    """
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def format_distance(distance_km: float) -> str:
+    """
+    Format a distance for display
+    """
+    if distance_km < 10:
+        return f"{distance_km:.1f} km"
+    return f"{distance_km:.0f} km"
+
+class HospitalIndex:
+    """
+    Spatial index over a list of hospital records with 'lat' and 'lng'
+    """
+
+    def __init__(self, hospitals: List[Dict]):
+        from sklearn.neighbors import BallTree
+
+        self.hospitals = hospitals
+        self.lats = np.array([h['lat'] for h in hospitals], dtype=np.float64)
+        self.lngs = np.array([h['lng'] for h in hospitals], dtype=np.float64)
+        self.ratings = np.array([h.get('rating', 0) or 0 for h in hospitals], dtype=np.float64)
+        self._tree = BallTree(np.radians(np.column_stack([self.lats, self.lngs])), metric='haversine')
+
+    @classmethod
+    def from_csv(cls, filepath: str = HOSPITALS_CSV_PATH):
+        """
+        Load hospitals from a CSV with name, address, city, phone, rating, lat, lng columns
+        """
+        with open(filepath, newline='', encoding='utf-8') as f:
+            hospitals = [
+                {
+                    'name': row['name'],
+                    'address': row.get('address', ''),
+                    'city': row.get('city', ''),
+                    'phone': row.get('phone', ''),
+                    'rating': float(row['rating']) if row.get('rating') else 0.0,
+                    'lat': float(row['lat']),
+                    'lng': float(row['lng'])
+                }
+                for row in csv.DictReader(f)
+            ]
+        return cls(hospitals)
+
+    def __len__(self) -> int:
+        return len(self.hospitals)
+
+    def _results(self, indices: np.ndarray, lat: float, lng: float, sort_by: str) -> List[Dict]:
+        distances = haversine_km(lat, lng, self.lats[indices], self.lngs[indices])
+        ratings = self.ratings[indices]
+
+        if sort_by == 'rating':
+            order = np.lexsort((distances, -ratings))
+        else:
+            # Nearest first; equally distant hospitals by rating
+            order = np.lexsort((-ratings, np.round(distances, 2)))
+
+        results = []
+        for i in order:
+            hospital = dict(self.hospitals[indices[i]])
+            hospital['distance_km'] = round(float(distances[i]), 3)
+            hospital['distance'] = format_distance(distances[i])
+            results.append(hospital)
+        return results
+
+    def nearest(self, lat: float, lng: float, k: int = 5, sort_by: str = 'distance') -> List[Dict]:
+        """
+        The k hospitals closest to (lat, lng)
+        """
+        k = min(k, len(self))
+        if k <= 0:
+            return []
+        indices = self._tree.query(np.radians([[lat, lng]]), k=k, return_distance=False)[0]
+        return self._results(indices, lat, lng, sort_by)
+
+    def within_radius(self, lat: float, lng: float, radius_km: float, limit: Optional[int] = None,
+                      sort_by: str = 'distance') -> List[Dict]:
+        """
+        All hospitals within radius_km of (lat, lng)
+        """
+        indices = self._tree.query_radius(np.radians([[lat, lng]]), r=radius_km / EARTH_RADIUS_KM)[0]
+        results = self._results(indices, lat, lng, sort_by)
+        return results[:limit] if limit else results
+
+@lru_cache(maxsize=4)
+def get_hospital_index(filepath: str = HOSPITALS_CSV_PATH) -> HospitalIndex:
+    """
+    Build the hospital index once per process
+    """
+    return HospitalIndex.from_csv(filepath)
+
+@timed('hospital_lookup')
+def get_nearby_hospitals(location: str, k: int = 5, radius_km: Optional[float] = None,
+                         sort_by: str = 'distance') -> List[Dict]:
+    """
+    Get nearby hospitals for a location
+    """
+    place = geocode(location)
+    if place is None:
+        return []
+
+    index = get_hospital_index()
+    lat, lng = place['lat'], place['lng']
+    if radius_km is not None:
+        return index.within_radius(lat, lng, radius_km, limit=k, sort_by=sort_by)
+    return index.nearest(lat, lng, k=k, sort_by=sort_by)
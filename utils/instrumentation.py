@@ -0,0 +1,309 @@
+"""
+Timing and profiling hooks for Smart Health Companion
+
+Hot-path functions are wrapped with @timed('stage') or a `with span('stage'):`
+block. Each stage keeps a latency histogram, a call count and an error
+count that can be exported in Prometheus text format (GET /metrics on the
+API) or appended to a JSONL file. Instrumentation is off unless
+INSTRUMENTATION=1; when off, a wrapped call costs one flag check.
+
+Slow calls can also be profiled: with PROFILE_SAMPLE_RATE set, that
+fraction of calls runs under cProfile and, when a call takes longer than
+PROFILE_SLOW_MS, its top functions are kept in `slow_calls()`.
+"""
+
+import bisect
+import functools
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+# Upper bounds in milliseconds; anything slower lands in the overflow bucket
+BUCKETS_MS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0,
+              1000.0, 2500.0, 5000.0, 10000.0)
+METRIC_NAME = 'shc_stage_latency_seconds'
+MAX_SLOW_CALLS = 50
+PROFILE_TOP_FUNCTIONS = 15
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram for one stage
+    """
+
+    def __init__(self, buckets_ms=BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.errors = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, elapsed_ms: float, error: bool = False):
+        index = bisect.bisect_left(self.buckets_ms, elapsed_ms)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum_ms += elapsed_ms
+            if elapsed_ms > self.max_ms:
+                self.max_ms = elapsed_ms
+            if error:
+                self.errors += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q-th observation
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets_ms, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'count': self.count,
+                'errors': self.errors,
+                'sum_ms': round(self.sum_ms, 4),
+                'mean_ms': round(self.sum_ms / self.count, 4) if self.count else 0.0,
+                'p50_ms': round(self.quantile(0.5), 4),
+                'p99_ms': round(self.quantile(0.99), 4),
+                'max_ms': round(self.max_ms, 4),
+                'buckets': dict(zip([str(bound) for bound in self.buckets_ms] + ['+Inf'], self.counts)),
+            }
+
+
+class Metrics:
+    """
+    Per-stage histograms plus a bounded log of profiled slow calls
+    """
+
+    def __init__(self, buckets_ms=BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._stages: Dict[str, Histogram] = {}
+        self._slow_calls = deque(maxlen=MAX_SLOW_CALLS)
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str) -> Histogram:
+        histogram = self._stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(stage, Histogram(self.buckets_ms))
+        return histogram
+
+    def observe(self, stage: str, elapsed_ms: float, error: bool = False):
+        self.histogram(stage).observe(elapsed_ms, error)
+
+    def record_slow_call(self, stage: str, elapsed_ms: float, profile: List[Dict]):
+        self._slow_calls.append({'ts': time.time(), 'stage': stage,
+                                 'elapsed_ms': round(elapsed_ms, 3), 'profile': profile})
+
+    def slow_calls(self) -> List[Dict]:
+        return list(self._slow_calls)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {stage: histogram.snapshot() for stage, histogram in sorted(self._stages.items())}
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._slow_calls.clear()
+
+    def prometheus(self) -> str:
+        """
+        All stages in the Prometheus text exposition format
+        """
+        lines = [
+            f"# HELP {METRIC_NAME} Latency of instrumented stages",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        errors = []
+        for stage, snapshot in self.snapshot().items():
+            cumulative = 0
+            for bound, count in zip(self.buckets_ms, snapshot['buckets'].values()):
+                cumulative += count
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}",le="{bound / 1000:g}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}",le="+Inf"}} {snapshot["count"]}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{stage}"}} {snapshot["sum_ms"] / 1000:.6f}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{stage}"}} {snapshot["count"]}')
+            errors.append(f'shc_stage_errors_total{{stage="{stage}"}} {snapshot["errors"]}')
+
+        if errors:
+            lines.append("# HELP shc_stage_errors_total Calls that raised an exception")
+            lines.append("# TYPE shc_stage_errors_total counter")
+            lines.extend(errors)
+        return '\n'.join(lines) + '\n'
+
+    def write_jsonl(self, filepath: str, include_slow_calls: bool = True) -> int:
+        """
+        Append one line per stage (and per profiled slow call); returns lines written
+        """
+        now = time.time()
+        rows = [{'ts': now, 'stage': stage, **snapshot} for stage, snapshot in self.snapshot().items()]
+        if include_slow_calls:
+            rows.extend({'type': 'slow_call', **call} for call in self.slow_calls())
+
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(filepath, 'a', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(row) + '\n')
+        return len(rows)
+
+
+class _Config:
+    def __init__(self):
+        self.load_env()
+
+    def load_env(self):
+        self.enabled = _env_flag('INSTRUMENTATION')
+        self.profile_sample_rate = float(os.getenv('PROFILE_SAMPLE_RATE') or 0.0)
+        self.profile_slow_ms = float(os.getenv('PROFILE_SLOW_MS') or 500.0)
+
+
+_config = _Config()
+_metrics = Metrics()
+# cProfile cannot nest, so at most one call is profiled at a time
+_profile_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """
+    The process-wide metrics collected by @timed and span()
+    """
+    return _metrics
+
+
+def is_enabled() -> bool:
+    return _config.enabled
+
+
+def configure(enabled: Optional[bool] = None, profile_sample_rate: Optional[float] = None,
+              profile_slow_ms: Optional[float] = None):
+    """
+    Override the INSTRUMENTATION / PROFILE_* environment settings at runtime
+    """
+    if enabled is not None:
+        _config.enabled = enabled
+    if profile_sample_rate is not None:
+        _config.profile_sample_rate = profile_sample_rate
+    if profile_slow_ms is not None:
+        _config.profile_slow_ms = profile_slow_ms
+
+
+def configure_from_env():
+    """
+    Re-read INSTRUMENTATION / PROFILE_* after the environment changed, e.g. after load_dotenv()
+    """
+    _config.load_env()
+
+
+def _profile_rows(profiler) -> List[Dict]:
+    import pstats
+
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, name), (_, calls, _, cumulative, _) in stats.stats.items():
+        rows.append({'function': f"{os.path.basename(filename)}:{line}({name})",
+                     'calls': calls, 'cumulative_ms': round(cumulative * 1000, 3)})
+    rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+    return rows[:PROFILE_TOP_FUNCTIONS]
+
+
+class _Span:
+    __slots__ = ('stage', 'start', 'profiler')
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.profiler = None
+
+    def __enter__(self):
+        if _config.profile_sample_rate and random.random() < _config.profile_sample_rate \
+                and _profile_lock.acquire(blocking=False):
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Another profiler (e.g. a debugger) is already active
+                self.profiler = None
+                _profile_lock.release()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed_ms = (time.perf_counter() - self.start) * 1000
+        _metrics.observe(self.stage, elapsed_ms, error=exc_type is not None)
+        if self.profiler is not None:
+            self.profiler.disable()
+            _profile_lock.release()
+            if elapsed_ms >= _config.profile_slow_ms:
+                _metrics.record_slow_call(self.stage, elapsed_ms, _profile_rows(self.profiler))
+            self.profiler = None
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(stage: str):
+    """
+    Context manager timing a block as `stage`; a shared no-op when disabled
+    """
+    return _Span(stage) if _config.enabled else _NOOP_SPAN
+
+
+def timed(stage: Optional[str] = None) -> Callable:
+    """
+    Decorator timing every call of a function, named after it by default
+    """
+    def decorator(func):
+        name = stage or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _config.enabled:
+                return func(*args, **kwargs)
+            with _Span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def export_on_exit(filepath: Optional[str] = None):
+    """
+    Append the metrics to INSTRUMENTATION_JSONL (or filepath) when the process exits
+    """
+    filepath = filepath or os.getenv('INSTRUMENTATION_JSONL')
+    if filepath:
+        import atexit
+
+        atexit.register(lambda: _config.enabled and _metrics.write_jsonl(filepath))
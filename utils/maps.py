@@ -0,0 +1,198 @@
+"""
+Server-side rendering and caching of the hospital map
+
+Maps are rendered to standalone HTML once per (center, zoom, result set)
+and reused from an in-memory cache, optionally backed by a directory of
+HTML files shared between processes. Result sets above a threshold are
+drawn with a FastMarkerCluster, which ships the markers as one compact
+JSON array clustered in the browser instead of one Leaflet object per
+hospital. Renders can also be started on a background thread so the
+page keeps drawing while the map is built.
+"""
+
+import hashlib
+import html
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from utils.cache import TTLCache
+
+CLUSTER_THRESHOLD = 25
+DEFAULT_ZOOM = 12
+MAP_HEIGHT = 500
+
+# Popup content travels in the data array; Leaflet builds the markers client-side
+_CLUSTER_CALLBACK = """
+var callback = function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    marker.bindPopup(row[2]);
+    return marker;
+};
+"""
+
+
+def hospital_popup(hospital: Dict) -> str:
+    """
+    Popup HTML for one hospital marker
+    """
+    return (f"<b>{html.escape(str(hospital.get('name', '')))}</b><br>"
+            f"{html.escape(str(hospital.get('address', '')))}<br>"
+            f"Phone: {html.escape(str(hospital.get('phone', '')))}")
+
+
+def map_cache_key(hospitals: Sequence[Dict], center: Sequence[float], zoom: int) -> str:
+    """
+    Stable hash of the map center, zoom level and hospitals shown
+    """
+    payload = {
+        'center': [round(float(center[0]), 5), round(float(center[1]), 5)],
+        'zoom': zoom,
+        'hospitals': [
+            [hospital.get('name'), round(float(hospital['lat']), 6), round(float(hospital['lng']), 6),
+             hospital.get('address'), hospital.get('phone')]
+            for hospital in hospitals
+        ],
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def build_hospital_map(hospitals: Sequence[Dict], center: Optional[Sequence[float]] = None,
+                       zoom: int = DEFAULT_ZOOM, cluster_threshold: int = CLUSTER_THRESHOLD):
+    """
+    Build a folium map of hospitals, clustering large result sets
+    """
+    import folium
+    from folium.plugins import FastMarkerCluster
+
+    if center is None:
+        center = [hospitals[0]['lat'], hospitals[0]['lng']] if hospitals else [0.0, 0.0]
+    m = folium.Map(location=list(center), zoom_start=zoom)
+
+    if len(hospitals) > cluster_threshold:
+        data = [[hospital['lat'], hospital['lng'], hospital_popup(hospital)] for hospital in hospitals]
+        FastMarkerCluster(data, callback=_CLUSTER_CALLBACK).add_to(m)
+    else:
+        for hospital in hospitals:
+            folium.Marker(
+                location=[hospital['lat'], hospital['lng']],
+                popup=hospital_popup(hospital),
+                icon=folium.Icon(color='red', icon='info-sign')
+            ).add_to(m)
+    return m
+
+
+class MapRenderer:
+    """
+    Renders hospital maps to HTML with in-memory and on-disk caching
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, maxsize: int = 256, ttl: Optional[float] = 3600.0,
+                 cluster_threshold: int = CLUSTER_THRESHOLD, max_workers: int = 2):
+        self.cache_dir = cache_dir
+        self.cluster_threshold = cluster_threshold
+        self.renders = 0
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='map-render')
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> Optional[str]:
+        return os.path.join(self.cache_dir, f"{key}.html") if self.cache_dir else None
+
+    def _cached(self, key: str) -> Optional[str]:
+        rendered = self._cache.get(key)
+        if rendered is not None:
+            return rendered
+
+        path = self._disk_path(key)
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                rendered = f.read()
+            self._cache.set(key, rendered)
+        return rendered
+
+    def _render(self, key: str, hospitals: Sequence[Dict], center: Sequence[float], zoom: int) -> str:
+        m = build_hospital_map(hospitals, center, zoom, self.cluster_threshold)
+        rendered = m.get_root().render()
+        self.renders += 1
+
+        self._cache.set(key, rendered)
+        path = self._disk_path(key)
+        if path:
+            tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(rendered)
+            os.replace(tmp_path, path)
+        return rendered
+
+    def submit(self, hospitals: Sequence[Dict], center: Optional[Sequence[float]] = None,
+               zoom: int = DEFAULT_ZOOM) -> Future:
+        """
+        Start rendering in the background; returns a Future of the HTML.
+        Requests for a map that is already being rendered share its Future.
+        """
+        hospitals = list(hospitals)
+        if center is None:
+            center = [hospitals[0]['lat'], hospitals[0]['lng']] if hospitals else [0.0, 0.0]
+        key = map_cache_key(hospitals, center, zoom)
+
+        rendered = self._cached(key)
+        if rendered is not None:
+            future = Future()
+            future.set_result(rendered)
+            return future
+
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._executor.submit(self._render, key, hospitals, center, zoom)
+                self._pending[key] = future
+                future.add_done_callback(lambda _, key=key: self._forget(key))
+        return future
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def render(self, hospitals: Sequence[Dict], center: Optional[Sequence[float]] = None,
+               zoom: int = DEFAULT_ZOOM) -> str:
+        """
+        HTML for the map, rendered now or taken from the cache
+        """
+        return self.submit(hospitals, center, zoom).result()
+
+    def stats(self) -> Dict[str, float]:
+        return dict(self._cache.stats(), renders=self.renders)
+
+    def clear(self):
+        self._cache.clear()
+
+
+_renderer: Optional[MapRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_map_renderer() -> MapRenderer:
+    """
+    The process-wide map renderer; MAP_CACHE_DIR enables the on-disk cache
+    """
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = MapRenderer(cache_dir=os.getenv('MAP_CACHE_DIR') or None)
+    return _renderer
+
+
+def render_hospital_map(hospitals: List[Dict], center: Optional[Sequence[float]] = None,
+                        zoom: int = DEFAULT_ZOOM) -> str:
+    """
+    Cached HTML for a map of hospitals
+    """
+    return get_map_renderer().render(hospitals, center, zoom)
@@ -0,0 +1,109 @@
+"""
+Multi-pattern symptom matching for Smart Health Companion
+"""
+
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+# Trie key marking the end of a complete term
+_END = ''
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """
+    Fold simple plurals and a trailing 'e' so that 'pains', 'headaches',
+    'seizures' and 'allergies' meet 'pain', 'headache', 'seizure' and
+    'allergy'. Only ever compared with other stems, never shown.
+    """
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+    if len(word) > 2 and word.endswith('e'):
+        word = word[:-1]
+    return word
+
+
+class SymptomMatcher:
+    """
+    Word-level trie over a symptom vocabulary.
+
+    Terms are matched on whole words in a single left-to-right pass, so
+    'pain' never matches inside 'painful'; words are compared by stem(),
+    so 'chest pains' still matches 'chest pain'. When terms overlap, the
+    leftmost-longest one wins ('chest pain' over 'pain'). The cost of a
+    scan depends on the text length and the longest term, not on the
+    vocabulary size.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self._root = {}
+        self._rank = {}
+        self.max_words = 0
+
+        for term in terms:
+            words = term.lower().replace('_', ' ').split()
+            if not words:
+                continue
+            term = ' '.join(words)
+            if term in self._rank:
+                continue
+
+            node = self._root
+            for word in words:
+                node = node.setdefault(stem(word), {})
+            # 'seizure' and 'seizures' share a path; the first term listed keeps it
+            node.setdefault(_END, term)
+            self._rank[term] = len(self._rank)
+            self.max_words = max(self.max_words, len(words))
+
+    def __len__(self) -> int:
+        return len(self._rank)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._rank
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        Return (start_word, end_word, term) for every non-overlapping match.
+
+        The text is expected to be normalized already (lowercase words
+        separated by whitespace).
+        """
+        words = [stem(word) for word in text.split()]
+        n_words = len(words)
+        root = self._root
+        matches = []
+
+        i = 0
+        while i < n_words:
+            node = root.get(words[i])
+            if node is None:
+                i += 1
+                continue
+
+            end, term = (i + 1, node[_END]) if _END in node else (0, None)
+            j = i + 1
+            while j < n_words:
+                node = node.get(words[j])
+                if node is None:
+                    break
+                j += 1
+                if _END in node:
+                    end, term = j, node[_END]
+
+            if term is None:
+                i += 1
+            else:
+                matches.append((i, end, term))
+                i = end
+
+        return matches
+
+    def extract(self, text: str) -> List[str]:
+        """
+        Unique matched terms, in vocabulary order
+        """
+        found = {term for _, _, term in self.find(text)}
+        return sorted(found, key=self._rank.__getitem__)
@@ -0,0 +1,388 @@
+"""
+Vectorized disease scoring for Smart Health Companion
+
+Diseases are ranked by a Bernoulli naive Bayes posterior over the
+symptom x disease matrix. Each disease's symptoms are reported with
+probability `sensitivity` and any other symptom with probability
+`false_positive_rate`. The log-likelihood then depends only on the
+overlap between the reported and the disease's symptoms and the
+disease's symptom count, so it is computed from the same overlap scores
+for the dense and the packed-bit backends.
+"""
+
+import csv
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from utils.bitset import BitsetMatrix, load_bitset
+from utils.features import SymptomEncoder
+
+DEFAULT_SENSITIVITY = 0.3
+DEFAULT_FALSE_POSITIVE_RATE = 0.01
+
+
+def format_disease_name(label: str) -> str:
+    """
+    Convert a dataset column label (e.g. 'common_cold') into a display name
+    """
+    return label.replace('_', ' ').title()
+
+
+class PredictionEngine:
+    """
+    Symptom x disease incidence held as a dense NumPy matrix or a packed
+    BitsetMatrix.
+
+    Rows are diseases and columns are symptoms, so scoring a request is a
+    single matrix-vector product (or an AND + popcount per word) instead
+    of a Python loop per disease.
+    """
+
+    def __init__(self, symptoms: Sequence[str], diseases: Sequence[str], incidence,
+                 sensitivity: float = DEFAULT_SENSITIVITY,
+                 false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE,
+                 priors: Optional[Sequence[float]] = None):
+        if isinstance(incidence, BitsetMatrix):
+            self.bitset = incidence
+            self.incidence = None
+            shape = (incidence.n_rows, incidence.n_bits)
+            self.row_counts = incidence.row_counts.astype(np.float64)
+        else:
+            self.bitset = None
+            self.incidence = np.ascontiguousarray(np.asarray(incidence, dtype=np.float32))
+            shape = self.incidence.shape
+            self.row_counts = self.incidence.sum(axis=1, dtype=np.float64)
+
+        if shape != (len(diseases), len(symptoms)):
+            raise ValueError(
+                f"Incidence shape {shape} does not match "
+                f"{len(diseases)} diseases x {len(symptoms)} symptoms"
+            )
+
+        self.symptoms = list(symptoms)
+        self.diseases = list(diseases)
+        self.encoder = SymptomEncoder.from_symptoms(self.symptoms)
+        self.symptom_index = self.encoder.mapping
+        self.matcher = self.encoder.matcher
+        self.set_likelihood(sensitivity, false_positive_rate, priors)
+
+    def set_likelihood(self, sensitivity: float, false_positive_rate: float,
+                       priors: Optional[Sequence[float]] = None):
+        """
+        Set the naive Bayes symptom model and (optionally) disease priors
+        """
+        if not (0 < false_positive_rate < sensitivity < 1):
+            raise ValueError("Expected 0 < false_positive_rate < sensitivity < 1")
+
+        self.sensitivity = sensitivity
+        self.false_positive_rate = false_positive_rate
+        # Weight of each shared symptom and of each disease symptom overall
+        self._match_weight = (np.log(sensitivity / (1 - sensitivity))
+                              - np.log(false_positive_rate / (1 - false_positive_rate)))
+        self._size_weight = np.log((1 - sensitivity) / (1 - false_positive_rate))
+
+        if priors is None:
+            self.log_priors = np.zeros(self.n_diseases)
+        else:
+            priors = np.asarray(priors, dtype=np.float64)
+            if priors.shape != (self.n_diseases,) or (priors <= 0).any():
+                raise ValueError(f"Expected {self.n_diseases} positive disease priors")
+            self.log_priors = np.log(priors / priors.sum())
+        self._log_offset = self.log_priors + self.row_counts * self._size_weight
+
+    @classmethod
+    def from_symptom_table(cls, symptoms_data: Dict[str, List[int]], diseases: Sequence[str]):
+        """
+        Build an engine from a {symptom: [0/1 per disease]} mapping
+        """
+        symptoms = list(symptoms_data.keys())
+        incidence = np.array([symptoms_data[symptom] for symptom in symptoms], dtype=np.float32).T
+        return cls(symptoms, diseases, incidence)
+
+    @classmethod
+    def from_csv(cls, filepath: str = 'data/symptoms.csv'):
+        """
+        Build an engine from the symptom-row / disease-column CSV dataset
+        """
+        with open(filepath, newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            rows = [row for row in reader if row]
+
+        symptoms = [row[0] for row in rows]
+        diseases = [format_disease_name(label) for label in header[1:]]
+        incidence = np.array([row[1:] for row in rows], dtype=np.float32).T
+        return cls(symptoms, diseases, incidence)
+
+    @classmethod
+    def from_bitset(cls, bitset: BitsetMatrix):
+        """
+        Build an engine over a packed matrix (see utils.bitset.load_bitset)
+        """
+        return cls(bitset.column_labels, [format_disease_name(label) for label in bitset.row_labels], bitset)
+
+    @classmethod
+    def from_dataset(cls, filepath: str = 'data/symptoms.csv'):
+        """
+        Build the served engine over the packed, memory-mapped matrix file
+        next to the CSV (regenerated when the CSV is newer), or from the
+        CSV itself when that file cannot be written or read
+        """
+        try:
+            return cls.from_bitset(load_bitset(filepath))
+        except (OSError, ValueError):
+            return cls.from_csv(filepath)
+
+    @property
+    def n_symptoms(self) -> int:
+        return len(self.symptoms)
+
+    @property
+    def n_diseases(self) -> int:
+        return len(self.diseases)
+
+    def extract_symptoms(self, text: str) -> List[str]:
+        """
+        Known symptoms mentioned in free text, in dataset order
+        """
+        return self.encoder.extract(text)
+
+    def encode_text(self, text: str) -> np.ndarray:
+        """
+        Build a binary feature vector from free text
+        """
+        return self.encoder.dense(self.extract_symptoms(text))
+
+    def encode_symptoms(self, symptoms: Sequence[str]) -> np.ndarray:
+        """
+        Build a binary feature vector from symptom names ('sore throat' or 'sore_throat')
+        """
+        return self.encoder.dense(symptoms)
+
+    def encode_sparse(self, symptoms: Sequence[str]) -> sparse.csr_matrix:
+        """
+        Build a sparse (1 x n_symptoms) feature row from symptom names
+        """
+        return self.encoder.transform_one(symptoms)
+
+    def encode_batch(self, symptom_lists: Sequence[Sequence[str]]) -> sparse.csr_matrix:
+        """
+        Build a sparse (n_texts x n_symptoms) feature matrix from lists of symptom names
+        """
+        return self.encoder.transform(symptom_lists)
+
+    def score_matrix(self, features) -> np.ndarray:
+        """
+        Overlap scores for a batch: (n_texts x n_symptoms) -> (n_texts x n_diseases)
+        """
+        if self.bitset is not None:
+            features = sparse.csr_matrix(features)
+            return self.bitset.overlap_many(self.bitset.pack_csr(features)).astype(np.float32)
+        return np.asarray(features @ self.incidence.T)
+
+    def score(self, features) -> np.ndarray:
+        """
+        Overlap score of every disease with a dense feature vector or a sparse (1 x n_symptoms) row
+        """
+        if sparse.issparse(features):
+            if self.bitset is not None:
+                return self.bitset.overlap_many(self.bitset.pack_csr(features))[0].astype(np.float32)
+            # Only the reported symptoms' columns are touched
+            return self.incidence[:, features.indices].sum(axis=1)
+        if self.bitset is not None:
+            return self.bitset.overlap(self.bitset.pack_vector(features)).astype(np.float32)
+        return self.incidence @ features
+
+    def jaccard(self, features: np.ndarray) -> np.ndarray:
+        """
+        Jaccard similarity between the feature vector and every disease's symptom set
+        """
+        if self.bitset is not None:
+            return self.bitset.jaccard(self.bitset.pack_vector(features))
+
+        shared = self.incidence @ features
+        union = self.incidence.sum(axis=1) + features.sum() - shared
+        return np.divide(shared, union, out=np.zeros(len(shared)), where=union > 0)
+
+    def posterior_from_scores(self, scores: np.ndarray) -> np.ndarray:
+        """
+        Naive Bayes posterior over diseases from overlap scores (1-D or one row per text)
+        """
+        log_joint = scores * self._match_weight + self._log_offset
+        log_joint -= log_joint.max(axis=-1, keepdims=True)
+        joint = np.exp(log_joint)
+        return joint / joint.sum(axis=-1, keepdims=True)
+
+    def posterior(self, features) -> np.ndarray:
+        """
+        Probability of every disease given the feature vector
+        """
+        return self.posterior_from_scores(self.score(features).astype(np.float64))
+
+    def posterior_matrix(self, features) -> np.ndarray:
+        """
+        Posteriors for a batch: (n_texts x n_symptoms) -> (n_texts x n_diseases)
+        """
+        return self.posterior_from_scores(self.score_matrix(features).astype(np.float64))
+
+    def top_k(self, features: np.ndarray, k: int = 3) -> List[Tuple[str, float]]:
+        """
+        Return the k best scoring diseases as (disease, score) pairs
+        """
+        scores = self.score(features)
+        return [(self.diseases[i], float(scores[i])) for i in top_k_indices(scores, k)]
+
+    def predict(self, features, top_k: Optional[int] = None):
+        """
+        Predict the most likely disease and its posterior probability from
+        a dense feature vector or a sparse row.
+
+        Returns (disease, probability), or a ranked differential of
+        (disease, probability) pairs when top_k is given. With no known
+        symptom there is nothing to rank: None, or an empty differential.
+        """
+        n_matched = features.nnz if sparse.issparse(features) else float(features.sum())
+        if n_matched == 0:
+            return [] if top_k is not None else None
+
+        proba = self.posterior(features)
+        ranked = [(self.diseases[i], float(proba[i])) for i in top_k_indices(proba, top_k or 1)]
+
+        if top_k is None:
+            return ranked[0]
+        return ranked
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first, for a vector or for every
+    row of a matrix.
+
+    Uses a partial sort (argpartition) so only the k winners are ordered;
+    ties are broken by index, exactly like a stable full sort.
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[-1]
+    k = max(0, min(k, n))
+    if k == 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+
+    if k == n:
+        return np.argsort(-scores, axis=-1, kind='stable')
+
+    # Everything above the k-th best value, then the lowest-index ties at that value
+    kth = -np.partition(-scores, k - 1, axis=-1)[..., k - 1:k]
+    above = scores > kth
+    tied = scores == kth
+    room = k - above.sum(axis=-1, keepdims=True)
+    selected = above | (tied & (np.cumsum(tied, axis=-1) <= room))
+
+    indices = np.nonzero(selected)[-1].reshape(scores.shape[:-1] + (k,))
+    values = np.take_along_axis(scores, indices, axis=-1)
+    order = np.lexsort((indices, -values), axis=-1)
+    return np.take_along_axis(indices, order, axis=-1)
+
+
+def _rank_rows(scores: np.ndarray, labels: Sequence[str], k: int) -> List[List[Tuple[str, float]]]:
+    """
+    Top-k (label, score) pairs for every row of a score matrix
+    """
+    order = top_k_indices(scores, k)
+    return [
+        [(labels[j], float(row_scores[j])) for j in row_order]
+        for row_scores, row_order in zip(scores, order)
+    ]
+
+
+def rank_features(features: sparse.csr_matrix, engine: PredictionEngine, model=None, top_k: int = 1,
+                  cascade_margin: Optional[float] = None) -> Tuple[List[List[Tuple[str, float]]], Optional[List[str]]]:
+    """
+    Ranked (disease, probability) pairs for every row of a sparse feature
+    matrix, scored with one matrix multiply or one model.predict_proba call.
+
+    With a model and cascade_margin, the engine ranks the rows first and
+    only rows whose top two posteriors are closer than cascade_margin go
+    to the model. The second value then names the tier that answered each
+    row ('engine', 'model', or 'fallback' for rows without a known
+    symptom, as in ModelBundle.predict_cascade); otherwise it is None.
+    Rows without a known symptom get an empty ranking.
+    """
+    n_matched = np.diff(features.indptr)
+    if model is not None:
+        labels = [format_disease_name(label) for label in model.classes_]
+
+    tiers = None
+    if model is not None and cascade_margin is not None:
+        proba = engine.posterior_matrix(features)
+        ranked = _rank_rows(proba, engine.diseases, top_k)
+        best_two = np.take_along_axis(proba, top_k_indices(proba, 2), axis=-1)
+        ambiguous = np.flatnonzero((best_two[:, 0] - best_two[:, 1] < cascade_margin) & (n_matched > 0))
+        if len(ambiguous):
+            for i, row in zip(ambiguous, _rank_rows(model.predict_proba(features[ambiguous]), labels, top_k)):
+                ranked[i] = row
+        tiers = ['engine'] * len(ranked)
+        for i in ambiguous:
+            tiers[i] = 'model'
+        for i in np.flatnonzero(n_matched == 0):
+            tiers[i] = 'fallback'
+    elif model is not None:
+        ranked = _rank_rows(model.predict_proba(features), labels, top_k)
+    else:
+        ranked = _rank_rows(engine.posterior_matrix(features), engine.diseases, top_k)
+
+    for i in np.flatnonzero(n_matched == 0):
+        ranked[i] = []
+    return ranked, tiers
+
+
+def prediction_results(symptom_lists: Sequence[List[str]], ranked: Sequence[List[Tuple[str, float]]],
+                       tiers: Optional[Sequence[str]] = None) -> Iterator[Dict]:
+    """
+    Result records as produced by iter_predictions
+    """
+    for i, (symptoms, row) in enumerate(zip(symptom_lists, ranked)):
+        result = {
+            'symptoms': symptoms,
+            # No recognized symptom: no diagnosis rather than a guess
+            'predicted_disease': row[0][0] if row else None,
+            'confidence': row[0][1] if row else None,
+            'top_k': row,
+        }
+        if tiers is not None:
+            result['tier'] = tiers[i]
+        yield result
+
+
+def iter_predictions(texts: Iterable[str], engine: PredictionEngine, model=None,
+                     chunk_size: int = 1000, top_k: int = 1,
+                     cascade_margin: Optional[float] = None) -> Iterator[Dict]:
+    """
+    Stream predictions for an iterable of free-text complaints.
+
+    Texts are consumed chunk_size at a time and each chunk is ranked as
+    one sparse feature matrix (see rank_features), so memory stays
+    bounded by the chunk size. Results carry a 'tier' when cascading.
+    """
+    texts = iter(texts)
+    while True:
+        chunk = list(islice(texts, chunk_size))
+        if not chunk:
+            break
+
+        symptom_lists = [engine.extract_symptoms(text) for text in chunk]
+        ranked, tiers = rank_features(engine.encode_batch(symptom_lists), engine, model=model, top_k=top_k,
+                                      cascade_margin=cascade_margin)
+        yield from prediction_results(symptom_lists, ranked, tiers)
+
+
+def predict_batch(texts: Iterable[str], engine: Optional[PredictionEngine] = None, model=None,
+                  chunk_size: int = 1000, top_k: int = 1) -> List[Dict]:
+    """
+    Predict diseases for many symptom descriptions at once
+    """
+    if engine is None:
+        engine = PredictionEngine.from_dataset()
+    return list(iter_predictions(texts, engine, model=model, chunk_size=chunk_size, top_k=top_k))
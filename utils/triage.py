@@ -0,0 +1,162 @@
+"""
+Rule-based triage for Smart Health Companion
+
+Triage rules are a declarative table of keywords with a severity and an
+emergency priority. The table is compiled once into a word-level trie
+(SymptomMatcher), so every symptom is scanned in a single pass whose
+cost does not grow with the number of rules, and both the per-symptom
+severity and the overall priority come out of that same pass. Keywords
+preceded by a negation cue ("no chest pain", "denies fever") are
+ignored. Free text is scored clause by clause (split_clauses), so
+negations and severity modifiers ("high fever") are seen by the rules.
+"""
+
+import csv
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from utils.instrumentation import timed
+from utils.matching import SymptomMatcher
+
+SEVERITY_LEVELS = ('mild', 'moderate', 'severe')
+PRIORITY_LEVELS = ('routine', 'urgent', 'immediate')
+
+TRIAGE_RULES = [
+    {'severity': 'severe', 'priority': 'immediate',
+     'keywords': ['chest pain', 'shortness of breath', 'severe pain', 'paralysis', 'seizures',
+                  'loss of consciousness', 'severe bleeding', 'head injury']},
+    {'severity': 'moderate', 'priority': 'urgent',
+     'keywords': ['high fever', 'severe headache', 'severe vomiting', 'severe diarrhea',
+                  'severe abdominal pain', 'severe dizziness', 'severe weakness']},
+    {'severity': 'moderate', 'priority': 'routine',
+     'keywords': ['fever', 'headache', 'body pain', 'sore throat']},
+    {'severity': 'mild', 'priority': 'routine',
+     'keywords': ['runny nose', 'mild cough', 'slight fatigue']},
+]
+
+NEGATION_CUES = frozenset(['no', 'not', 'denies', 'denied', 'deny', 'without', 'never', 'negative', 'absent'])
+# Words and punctuation that end the scope of a negation cue
+NEGATION_TERMINATORS = frozenset([',', '.', ';', ':', 'but', 'however', 'although', 'except', 'yet'])
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[,.;:]")
+_CLAUSE_PATTERN = re.compile(r"[,.;:!?\n]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase words, keeping clause punctuation as separate tokens
+    """
+    return _TOKEN_PATTERN.findall((text or '').lower().replace('_', ' '))
+
+
+def split_clauses(text: str) -> List[str]:
+    """
+    Free text as a list of non-empty clauses, ready for TriageEngine.evaluate
+    """
+    return [clause.strip() for clause in _CLAUSE_PATTERN.split((text or '').lower()) if clause.strip()]
+
+
+class TriageEngine:
+    """
+    Compiled triage rule table
+    """
+
+    def __init__(self, rules: Sequence[Dict] = TRIAGE_RULES, negation_window: int = 4,
+                 cache_size: int = 8192):
+        self.negation_window = negation_window
+        self._levels = {}
+
+        keywords = []
+        for rule in rules:
+            severity = SEVERITY_LEVELS.index(rule['severity'])
+            priority = PRIORITY_LEVELS.index(rule['priority'])
+            for keyword in rule['keywords']:
+                keyword = ' '.join(tokenize(keyword))
+                if keyword and keyword not in self._levels:
+                    self._levels[keyword] = (severity, priority)
+                    keywords.append(keyword)
+
+        self.matcher = SymptomMatcher(keywords)
+        self._scan = lru_cache(maxsize=cache_size)(self._scan_uncached)
+
+    @classmethod
+    def from_csv(cls, filepath: str, **kwargs):
+        """
+        Load rules from a CSV with keyword, severity, priority columns
+        """
+        with open(filepath, newline='', encoding='utf-8') as f:
+            rules = [{'keywords': [row['keyword']], 'severity': row['severity'], 'priority': row['priority']}
+                     for row in csv.DictReader(f)]
+        return cls(rules, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+    def _negated(self, tokens: List[str], start: int) -> bool:
+        for i in range(start - 1, max(-1, start - 1 - self.negation_window), -1):
+            if tokens[i] in NEGATION_TERMINATORS:
+                return False
+            if tokens[i] in NEGATION_CUES:
+                return True
+        return False
+
+    def _scan_uncached(self, text: str) -> Tuple[int, int, Tuple[str, ...]]:
+        tokens = tokenize(text)
+        severity, priority = 0, 0
+        matched = []
+        for start, _, keyword in self.matcher.find(' '.join(tokens)):
+            if self._negated(tokens, start):
+                continue
+            keyword_severity, keyword_priority = self._levels[keyword]
+            severity = max(severity, keyword_severity)
+            priority = max(priority, keyword_priority)
+            matched.append(keyword)
+        return severity, priority, tuple(matched)
+
+    def symptom_severity(self, symptom: str) -> str:
+        """
+        Severity of a single symptom description
+        """
+        return SEVERITY_LEVELS[self._scan(symptom)[0]]
+
+    @timed('triage')
+    def evaluate(self, symptoms: Union[str, Iterable[str]]) -> Dict:
+        """
+        Severity per symptom, overall priority and the rule keywords that fired
+        """
+        if isinstance(symptoms, str):
+            symptoms = [symptoms]
+
+        severity, priority, matched = {}, 0, []
+        for symptom in symptoms:
+            symptom_severity, symptom_priority, keywords = self._scan(symptom)
+            severity[symptom] = SEVERITY_LEVELS[symptom_severity]
+            priority = max(priority, symptom_priority)
+            matched.extend(keywords)
+
+        return {'severity': severity, 'priority': PRIORITY_LEVELS[priority], 'matched': matched}
+
+    def evaluate_batch(self, patients: Iterable[Union[str, Iterable[str]]]) -> List[Dict]:
+        """
+        Evaluate many patients; repeated symptoms are scanned only once
+        """
+        return [self.evaluate(symptoms) for symptoms in patients]
+
+    def priority(self, symptoms: Union[str, Iterable[str]]) -> str:
+        if isinstance(symptoms, str):
+            symptoms = [symptoms]
+        return PRIORITY_LEVELS[max((self._scan(symptom)[1] for symptom in symptoms), default=0)]
+
+
+_engine: Optional[TriageEngine] = None
+
+
+def get_triage_engine() -> TriageEngine:
+    """
+    The default engine, compiled from TRIAGE_RULES on first use
+    """
+    global _engine
+    if _engine is None:
+        _engine = TriageEngine()
+    return _engine